@@ -0,0 +1,80 @@
+"""
+半精度存储精度报告 (float32 vs float16 工作帧)
+
+在合成的 ProPhoto 线性图像上，分别以 float32 和 float16 存储的工作帧运行 render_look，
+按输出格式比较量化结果:
+    TIFF  16-bit (uint16)
+    HEIF  10-bit (uint16 输出的高 10 位，即编码器实际写入的码值)
+    JPEG   8-bit (uint8)
+报告最大差异 (LSB)、99.9 百分位差异、平均绝对差异、有差异的通道值比例，以及渲染耗时和工作帧大小。
+最大差异出现在高饱和色: 饱和度增强和色域矩阵相减抵消后接近 0 的通道，
+输入的 float16 舍入误差 (相对 2^-12) 被放大，再经 Log 曲线在暗部放大。
+
+用法:
+    python benchmarks/bench_half_precision.py [--megapixels 24] [--log-space F-Log2] [--lut look.cube] [--pipeline fused]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import colour
+
+from raw_alchemy import core
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_pipeline import make_linear_image, NullLogger  # noqa: E402
+
+
+def render(src, args, lut, output_dtype):
+    img = src.copy()
+    start = time.perf_counter()
+    out = core.render_look(img, args.gain, args.log_space, lut, output_dtype=output_dtype, pipeline=args.pipeline,
+                           logger=NullLogger())
+    if out.dtype != output_dtype:
+        # 参考管线的裁剪与量化在 file_io 中完成
+        np.clip(out, 0.0, 1.0, out=out)
+        out = (out * np.iinfo(output_dtype).max).astype(output_dtype)
+    return time.perf_counter() - start, out
+
+
+def report(name, full, half):
+    diff = np.abs(full.astype(np.int32) - half.astype(np.int32))
+    print(f"{name:<12} {int(diff.max()):>8} {np.percentile(diff, 99.9):>8.0f} {diff.mean():>10.4f} "
+          f"{np.count_nonzero(diff) / diff.size * 100:>9.3f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=24.0)
+    parser.add_argument("--log-space", default="F-Log2")
+    parser.add_argument("--lut", default=None)
+    parser.add_argument("--gain", type=float, default=1.5)
+    parser.add_argument("--pipeline", default="fused", choices=["fused", "reference"])
+    args = parser.parse_args()
+
+    full = make_linear_image(args.megapixels)
+    half = full.astype(np.float16)
+    lut = colour.read_LUT(args.lut) if args.lut else None
+    h, w, _ = full.shape
+    print(f"{w}x{h} ({h * w / 1e6:.1f} MP), {args.pipeline} pipeline, log space {args.log_space}, "
+          f"LUT {args.lut or 'none'}")
+    print(f"working frame: float32 {full.nbytes / 1024**2:.0f} MB, float16 {half.nbytes / 1024**2:.0f} MB")
+
+    outputs = {}
+    print(f"{'storage':<10} {'out':<8} {'seconds':>10}")
+    for dtype in (np.uint16, np.uint8):
+        for storage, src in (('float32', full), ('float16', half)):
+            render(src[:64, :64], args, lut, dtype)  # 预热 Numba JIT
+            seconds, outputs[storage, dtype] = render(src, args, lut, dtype)
+            print(f"{storage:<10} {np.dtype(dtype).name:<8} {seconds:>10.3f}")
+
+    print(f"\n{'format':<12} {'max LSB':>8} {'p99.9':>8} {'mean LSB':>10} {'differing':>10}")
+    report('TIFF 16-bit', outputs['float32', np.uint16], outputs['float16', np.uint16])
+    report('HEIF 10-bit', outputs['float32', np.uint16] >> 6, outputs['float16', np.uint16] >> 6)
+    report('JPEG 8-bit', outputs['float32', np.uint8], outputs['float16', np.uint8])
+
+
+if __name__ == "__main__":
+    main()
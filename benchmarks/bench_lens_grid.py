@@ -0,0 +1,98 @@
+"""
+镜头坐标稀疏网格误差报告 (逐像素坐标 vs 网格插值)
+
+对每个网格间距报告: 网格插值出的坐标与逐像素坐标的最大误差 (像素)、坐标存储大小、
+坐标计算 + 重映射的耗时，以及输出与逐像素坐标结果的最大差异。
+
+坐标来源:
+    默认使用合成的桶形畸变 + 横向色差映射 (不需要 Lensfun)；
+    指定 --camera / --lens / --focal 时使用 Lensfun 数据库中的真实镜头配置。
+
+用法:
+    python benchmarks/bench_lens_grid.py [--megapixels 24] [--steps 8 16 32] [--interpolation bicubic]
+    python benchmarks/bench_lens_grid.py --camera "SONY" "ILCE-7M3" --lens "Sony" "FE 24-70mm F2.8 GM" --focal 24
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+from raw_alchemy import lensfun_wrapper as lf
+from raw_alchemy.remap import INTERPOLATIONS
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_pipeline import make_linear_image  # noqa: E402
+from bench_remap import make_coords  # noqa: E402
+
+
+class SyntheticModifier:
+    """与 LensfunModifier.apply_subpixel_geometry_distortion 接口相同的合成坐标映射"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def apply_subpixel_geometry_distortion(self, xu, yu, width, height):
+        return make_coords(self.width, self.height, int(yu), int(yu) + height, x1=width)
+
+
+def make_corrector(args, width, height, grid_step):
+    if args.lens is None:
+        return lf.LensCorrector(None, SyntheticModifier(width, height), width, height,
+                                correct_distortion=True, correct_tca=True, correct_vignetting=False,
+                                interpolation=args.interpolation, grid_step=grid_step)
+    return lf.create_lens_corrector(
+        width, height, args.camera[0], args.camera[1], args.lens[0], args.lens[1], args.focal, args.aperture,
+        correct_vignetting=False, interpolation=args.interpolation, grid_step=grid_step,
+        logger=lambda message: None,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=24.0)
+    parser.add_argument("--steps", type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument("--interpolation", default='bicubic', choices=INTERPOLATIONS)
+    parser.add_argument("--camera", nargs=2, metavar=('MAKER', 'MODEL'), default=[None, ''])
+    parser.add_argument("--lens", nargs=2, metavar=('MAKER', 'MODEL'), default=None)
+    parser.add_argument("--focal", type=float, default=24.0)
+    parser.add_argument("--aperture", type=float, default=8.0)
+    args = parser.parse_args()
+
+    image = make_linear_image(args.megapixels)
+    height, width = image.shape[:2]
+    source = f"Lensfun {args.lens[0]} {args.lens[1]} @ {args.focal:g}mm" if args.lens else "synthetic map"
+    print(f"{width}x{height} ({height * width / 1e6:.1f} MP), {source}, {args.interpolation}")
+
+    # 预热 Numba JIT
+    for step in [0] + args.steps:
+        warm = make_corrector(args, width, height, step)
+        if warm is None:
+            print("Lens not found (or Lensfun not loaded)")
+            return
+        warm.remap_rows(image, 0, 8)
+
+    dense = make_corrector(args, width, height, 0)
+    dense.map_key = None  # 不经缓存，每次都向坐标来源请求
+    start = time.perf_counter()
+    reference = dense.remap_rows(image, 0, height)
+    seconds = time.perf_counter() - start
+    print(f"{'coordinates':<14} {'max err px':>11} {'coord MB':>9} {'seconds':>8} {'max out diff':>13}")
+    print(f"{'per pixel':<14} {0.0:>11.5f} {height * width * 24 / 1024**2:>9.1f} {seconds:>8.2f} {0.0:>13.2e}")
+
+    for step in args.steps:
+        corrector = make_corrector(args, width, height, step)
+        corrector.map_key = None
+        start = time.perf_counter()
+        output = corrector.remap_rows(image, 0, height)
+        seconds = time.perf_counter() - start
+        error = corrector.grid_error()
+        diff = float(np.abs(output - reference).max())
+        print(f"{f'grid {step} px':<14} {error:>11.5f} {corrector._lens_map().nbytes / 1024**2:>9.1f} "
+              f"{seconds:>8.2f} {diff:>13.2e}")
+
+
+if __name__ == "__main__":
+    main()
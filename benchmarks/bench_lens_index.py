@@ -0,0 +1,111 @@
+"""
+Lensfun XML 索引基准测试 (全部 XML 解析 vs 索引读取)
+
+报告: 解析目录中全部 XML 的耗时、首次构建索引的耗时、索引文件大小、
+从磁盘读取索引的耗时 (新进程的首次读取) 以及按厂商选出文件的耗时。
+Lensfun 库可用时另外报告加载整个数据库与只加载索引选出文件的耗时。
+
+数据库来源:
+    默认生成合成 XML 数据库 (--files 个文件，每个文件一个相机厂商和一个镜头厂商)；
+    指定 --db 时使用真实的 Lensfun XML 目录 (例如 .../share/lensfun/version_2)。
+
+用法:
+    python benchmarks/bench_lens_index.py [--files 40] [--cameras 30] [--lenses 40] [--repeat 100]
+    python benchmarks/bench_lens_index.py --db /usr/share/lensfun/version_2 --camera-maker Sony --lens-maker Sony
+"""
+import os
+import time
+import tempfile
+import argparse
+import xml.etree.ElementTree as ET
+
+from raw_alchemy import lensfun_wrapper as lf
+
+
+def write_synthetic_db(db_path, files, cameras, lenses):
+    """每个文件写入 cameras 台相机和 lenses 支镜头 (带畸变、TCA、暗角标定)，每 10 个文件定义一次卡口"""
+    for i in range(files):
+        lines = ['<lensdatabase version="2">']
+        if i % 10 == 0:
+            lines.append(f'  <mount><name>Mount {i}</name><compat>M42</compat></mount>')
+        for c in range(cameras):
+            lines.append(f'  <camera><maker>Maker {i}</maker><model>Camera {c}</model>'
+                         f'<mount>Mount {i - i % 10}</mount><cropfactor>1.5</cropfactor></camera>')
+        for n in range(lenses):
+            lines.append(
+                f'  <lens><maker>Maker {i}</maker><model>Lens {n} 18-55mm f/3.5-5.6</model>'
+                f'<mount>Mount {i - i % 10}</mount><cropfactor>1.5</cropfactor><calibration>'
+                + ''.join(f'<distortion model="ptlens" focal="{f}" a="0.01" b="-0.03" c="0.02"/>'
+                          f'<tca model="poly3" focal="{f}" vr="1.0001" vb="0.9998"/>'
+                          f'<vignetting model="pa" focal="{f}" aperture="5.6" distance="10" '
+                          f'k1="-0.3" k2="0.1" k3="-0.05"/>' for f in (18, 24, 35, 55))
+                + '</calibration></lens>')
+        lines.append('</lensdatabase>')
+        with open(os.path.join(db_path, f"synthetic-{i:02d}.xml"), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+
+def timed(function, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=None, help="Lensfun XML 数据库目录 (默认生成合成数据库)")
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--cameras", type=int, default=30)
+    parser.add_argument("--lenses", type=int, default=40)
+    parser.add_argument("--camera-maker", default=None)
+    parser.add_argument("--lens-maker", default=None)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        camera_maker, lens_maker = args.camera_maker, args.lens_maker
+        if db_path is None:
+            db_path = os.path.join(tmp, "db")
+            os.makedirs(db_path)
+            write_synthetic_db(db_path, args.files, args.cameras, args.lenses)
+            camera_maker, lens_maker = camera_maker or "Maker 1", lens_maker or "Maker 1"
+        cache_dir = os.path.join(tmp, "cache")
+        names = sorted(name for name in os.listdir(db_path) if name.endswith('.xml'))
+        db_bytes = sum(os.path.getsize(os.path.join(db_path, name)) for name in names)
+        print(f"{'synthetic' if args.db is None else 'Lensfun'} database: {len(names)} XML files, "
+              f"{db_bytes / 1024:.0f} KB")
+
+        _, parse_all = timed(lambda: [ET.parse(os.path.join(db_path, name)) for name in names])
+        index, build = timed(lambda: lf.load_lens_index(db_path, cache_dir))
+        index_bytes = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+
+        def load_from_disk():
+            lf._index_cache.clear()
+            return lf.load_lens_index(db_path, cache_dir)
+
+        _, load = timed(load_from_disk, args.repeat)
+        _, cached = timed(lambda: lf.load_lens_index(db_path, cache_dir), args.repeat)
+        selected, select = timed(lambda: lf.select_xml_files(index, camera_maker, lens_maker), args.repeat)
+
+        print(f"{'step':<34} {'ms':>9}")
+        print(f"{'parse all XML (ElementTree)':<34} {parse_all * 1e3:>9.3f}")
+        print(f"{'build index (first run)':<34} {build * 1e3:>9.3f}")
+        print(f"{'load index from disk':<34} {load * 1e3:>9.3f}")
+        print(f"{'load index (in-process cache)':<34} {cached * 1e3:>9.3f}")
+        print(f"{'select files':<34} {select * 1e3:>9.3f}")
+        print(f"index file: {index_bytes} bytes; {camera_maker!r} / {lens_maker!r} -> "
+              f"{'all' if selected is None else len(selected)} of {len(names)} files")
+
+        if lf._lensfun and args.db is not None:
+            all_files = [os.path.join(db_path, name) for name in names]
+            _, full = timed(lambda: lf.LensfunDatabase(logger=lambda message: None, xml_files=all_files))
+            xml_files = all_files if selected is None else [os.path.join(db_path, name) for name in selected]
+            _, subset = timed(lambda: lf.LensfunDatabase(logger=lambda message: None, xml_files=xml_files))
+            print(f"{'Lensfun load (whole database)':<34} {full * 1e3:>9.3f}")
+            print(f"{'Lensfun load (indexed files)':<34} {subset * 1e3:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+创意 LUT 基准测试 (colour vs Numba 查表链)
+
+对 LUT1D、LUT3x1D、LUT3D 以及 1D shaper + 3D 序列，在合成 Log 编码图像上分别计时
+colour 的 lut.apply 和 luts.apply_lut，并报告最大误差。
+3D 部分以 colour 的四面体插值为参照 (与 Numba 核函数插值方式相同)。
+
+--formats 时改为比较 3D 表格的各存储格式 (luts.CUBE_FORMATS)：对 17/33/65/129 的 cube
+分别报告打包耗时、表格大小、核函数耗时 (不含打包) 和相对 rgb32 的最大误差，
+并标出 select_cube_format 的自动选择。输入分别为随机取值 (最差的访存局部性)
+和平滑的合成照片。
+
+用法:
+    python benchmarks/bench_luts.py [--megapixels 24] [--cube-size 33] [--repeat 3]
+    python benchmarks/bench_luts.py --formats [--megapixels 24] [--repeat 3]
+"""
+import time
+import argparse
+
+import numpy as np
+import colour
+from colour.algebra import table_interpolation_tetrahedral
+
+from raw_alchemy.luts import (
+    CUBE_FORMATS, apply_lut, apply_lut_chain_inplace, compile_lut, select_cube_format,
+)
+
+
+def make_luts(cube_size, shaper_size=4096):
+    """合成测试 LUT: 伽马曲线 1D / 逐通道 3x1D / 带色彩串扰的 3D / shaper + 3D 序列"""
+    lut_1d = colour.LUT1D(colour.LUT1D.linear_table(shaper_size) ** 0.8, name='1D')
+    lut_3x1d = colour.LUT3x1D(colour.LUT3x1D.linear_table(shaper_size) ** np.array([0.8, 0.9, 1.1]), name='3x1D')
+
+    grid = colour.LUT3D.linear_table(cube_size)
+    luma = grid @ np.array([0.3, 0.6, 0.1])
+    table = np.clip(luma[..., None] + (grid - luma[..., None]) * 1.3, 0, 1) ** 1.1
+    lut_3d = colour.LUT3D(table, name='3D')
+
+    shaper = colour.LUT3x1D(colour.LUT3x1D.linear_table(shaper_size) ** 0.5, name='shaper')
+    sequence = colour.LUTSequence(shaper, lut_3d)
+    return {'LUT1D': lut_1d, 'LUT3x1D': lut_3x1d, 'LUT3D': lut_3d, 'shaper+3D': sequence}
+
+
+def colour_apply(img, lut):
+    """colour 参照实现: 3D LUT 使用四面体插值"""
+    if isinstance(lut, colour.LUTSequence):
+        for op in lut:
+            img = colour_apply(img, op)
+        return img
+    if isinstance(lut, colour.LUT3D):
+        return lut.apply(img, interpolator=table_interpolation_tetrahedral)
+    return lut.apply(img)
+
+
+def timed(func, img, lut, repeat):
+    best, out = None, None
+    for _ in range(repeat):
+        src = img.copy()
+        start = time.perf_counter()
+        out = func(src, lut)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, out
+
+
+def bench_formats(inputs, repeat):
+    print(f"{'input':<7} {'cube':>5} {'format':<8} {'pack ms':>8} {'MB':>6} {'kernel s':>9} {'max err':>9}")
+    for size in (17, 33, 65, 129):
+        lut = make_luts(size)['LUT3D']
+        auto = select_cube_format(size)
+        for name, img in inputs.items():
+            expected = None
+            for cube_format in CUBE_FORMATS:
+                start = time.perf_counter()
+                chain = compile_lut(colour.LUT3D(lut.table, lut.name), cube_format)  # 新对象，绕过编译缓存
+                pack_ms = (time.perf_counter() - start) * 1000
+                cube = chain.kernel_args[3]
+                apply_lut_chain_inplace(img[:8].reshape(-1, 3).copy(), chain.kernel_args)  # 预热 Numba JIT
+
+                best = None
+                for _ in range(repeat):
+                    out = img.copy()
+                    start = time.perf_counter()
+                    apply_lut_chain_inplace(out.reshape(-1, 3), chain.kernel_args)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                if expected is None:
+                    expected = out
+                err = float(np.max(np.abs(out - expected)))
+                mark = ' (auto)' if cube_format == auto else ''
+                print(f"{name:<7} {size:>5} {cube_format:<8} {pack_ms:>8.1f} {cube.nbytes / 1024**2:>6.1f} "
+                      f"{best:>9.3f} {err:>9.2e}{mark}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=24.0)
+    parser.add_argument("--cube-size", type=int, default=33)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--formats", action="store_true", help="compare 3D table storage formats")
+    args = parser.parse_args()
+
+    n_pixels = int(args.megapixels * 1e6)
+    rng = np.random.default_rng(0)
+    # Log 编码后的典型取值范围，两端略超出 [0, 1] 以覆盖定义域外的行为
+    img = rng.uniform(-0.02, 1.02, (n_pixels // 1000, 1000, 3)).astype(np.float32)
+
+    if args.formats:
+        from bench_pipeline import make_linear_image
+        # 平滑的合成照片经 log2 映射到 [0, 1]，相邻像素落在相近的格点上
+        photo = np.log2(make_linear_image(args.megapixels) * 4 + 1e-3) / 12 + 0.6
+        bench_formats({'random': img, 'photo': np.clip(photo, 0, 1).astype(np.float32)}, args.repeat)
+        return
+
+    print(f"{img.shape[0] * img.shape[1] / 1e6:.1f} MP, 3D cube {args.cube_size}³")
+    print(f"{'LUT':<10} {'colour s':>9} {'numba s':>9} {'max abs err':>12} {'LSB16':>7}")
+    for name, lut in make_luts(args.cube_size).items():
+        apply_lut(img[:8].copy(), lut)  # 预热 Numba JIT
+        colour_time, expected = timed(colour_apply, img, lut, args.repeat)
+        numba_time, actual = timed(apply_lut, img, lut, args.repeat)
+        err = float(np.max(np.abs(actual.astype(np.float64) - expected)))
+        print(f"{name:<10} {colour_time:>9.3f} {numba_time:>9.3f} {err:>12.2e} {err * 65535:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
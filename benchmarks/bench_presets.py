@@ -0,0 +1,71 @@
+"""
+质量预设吞吐量基准测试
+
+对给定的 RAW 文件依次使用每个质量预设完整处理一遍，输出每个预设的耗时与吞吐量 (MP/s)。
+
+用法:
+    python benchmarks/bench_presets.py <RAW 文件或目录> [--log-space F-Log2] [--lut look.cube] [--lens-correct]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import rawpy
+
+from raw_alchemy import config, core
+from raw_alchemy.orchestrator import SUPPORTED_RAW_EXTENSIONS
+
+
+def collect_raw_files(path):
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, f) for f in os.listdir(path)
+            if os.path.splitext(f)[1].lower() in SUPPORTED_RAW_EXTENSIONS
+        )
+    return [path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_path")
+    parser.add_argument("--log-space", default="F-Log2")
+    parser.add_argument("--lut", default=None)
+    parser.add_argument("--lens-correct", action="store_true")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    files = collect_raw_files(args.input_path)
+    if not files:
+        sys.exit("No RAW files found.")
+
+    # 传感器像素数 (与预设无关，统一用于计算 MP/s)
+    megapixels = 0.0
+    for f in files:
+        with rawpy.imread(f) as raw:
+            megapixels += raw.sizes.width * raw.sizes.height / 1e6
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        # 预热 Numba JIT，避免首次编译时间计入第一个预设
+        core.process_image(files[0], os.path.join(out_dir, "warmup.tif"), args.log_space, args.lut,
+                           exposure=0.0, lens_correct=False, log_queue=lambda msg: None)
+
+        print(f"{len(files)} file(s), {megapixels:.1f} MP total, repeat={args.repeat}")
+        print(f"{'preset':<10} {'seconds':>10} {'MP/s':>8} {'output MB':>10}")
+        for preset in config.QUALITY_PRESETS:
+            output_bytes = 0
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for f in files:
+                    out_path = os.path.join(out_dir, f"{preset}_{os.path.basename(f)}.tif")
+                    core.process_image(f, out_path, args.log_space, args.lut,
+                                       lens_correct=args.lens_correct, metering_mode='matrix',
+                                       preset=preset, log_queue=lambda msg: None)
+                    output_bytes += os.path.getsize(out_path)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            print(f"{preset:<10} {elapsed:>10.2f} {megapixels / elapsed:>8.2f} {output_bytes / args.repeat / 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
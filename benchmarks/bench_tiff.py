@@ -0,0 +1,78 @@
+"""
+TIFF 写入基准测试 (strip vs 分块，整幅写入 vs 分块渲染的流式写入)
+
+在合成图像 (线性图像经 1/2.2 伽马量化为 uint16，与渲染输出相近的平滑照片内容) 上
+计时 file_io 的 TIFF 写入，报告吞吐 (MP/s) 和文件大小，并检查读回的数据与输入一致。
+每种布局按 --workers 中的线程数各测一次 (0=全部 CPU 核心)。
+
+用法:
+    python benchmarks/bench_tiff.py [--megapixels 45] [--tiles 128 256 512] [--tile-rows 512]
+                                    [--level 8] [--workers 1 0] [--repeat 1]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+import tifffile
+
+from raw_alchemy import file_io
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_pipeline import NullLogger, make_linear_image  # noqa: E402
+
+
+def make_output_image(megapixels):
+    img = make_linear_image(megapixels)
+    np.clip(img, 0.0, 1.0, out=img)
+    np.power(img, 1 / 2.2, out=img)
+    return (img * 65535).astype(np.uint16)
+
+
+def write(image, path, args, tile, workers, streamed):
+    if streamed:
+        bands = (image[y0:y0 + args.tile_rows] for y0 in range(0, image.shape[0], args.tile_rows))
+        file_io.save_image_bands(bands, path, image.shape, args.tile_rows, NullLogger(),
+                                 compression_level=args.level, tiff_tile=tile, tiff_workers=workers)
+    else:
+        file_io.save_image(image, path, NullLogger(), compression_level=args.level,
+                           tiff_tile=tile, tiff_workers=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=45.0)
+    parser.add_argument("--tiles", type=int, nargs='+', default=[128, 256, 512])
+    parser.add_argument("--tile-rows", type=int, default=512)
+    parser.add_argument("--level", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 0])
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    image = make_output_image(args.megapixels)
+    h, w, _ = image.shape
+    print(f"{w}x{h} ({h * w / 1e6:.1f} MP) uint16, ZLIB level {args.level}, {os.cpu_count()} CPUs")
+    print(f"{'layout':<26} {'threads':>7} {'seconds':>8} {'MP/s':>7} {'size MB':>8} {'ok':>3}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.tif")
+        for streamed in (False, True):
+            mode = f"streamed {args.tile_rows}" if streamed else "whole frame"
+            for tile in [0] + args.tiles:
+                layout = f"{mode}, {f'tile {tile}' if tile else 'strips'}"
+                for workers in args.workers:
+                    seconds = float('inf')
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        write(image, path, args, tile, workers, streamed)
+                        seconds = min(seconds, time.perf_counter() - start)
+                    ok = np.array_equal(tifffile.imread(path), image)
+                    threads = workers or os.cpu_count()
+                    print(f"{layout:<26} {threads:>7} {seconds:>8.2f} {h * w / 1e6 / seconds:>7.1f} "
+                          f"{os.path.getsize(path) / 1024**2:>8.1f} {'yes' if ok else 'NO':>3}")
+
+
+if __name__ == "__main__":
+    main()
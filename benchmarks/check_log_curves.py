@@ -0,0 +1,54 @@
+"""
+Log 曲线精度与速度检查
+
+将 log_curves 中每条曲线的 Numba float32 实现与 colour.cctf_encoding (float64) 对比，
+输入在 log2 域均匀覆盖 1e-6 ~ 2^10，报告最大绝对误差 (及 16-bit LSB) 和单次编码耗时。
+
+用法:
+    python benchmarks/check_log_curves.py [--megapixels 24]
+"""
+import sys
+import time
+import argparse
+
+import numpy as np
+import colour
+
+from raw_alchemy import config
+from raw_alchemy.log_curves import encode_log, LOG_CURVE_TOLERANCE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, default=24.0)
+    args = parser.parse_args()
+
+    x = np.exp2(np.linspace(np.log2(1e-6), 10.0, 3 * 200_000)).astype(np.float32).reshape(-1, 1000, 3)
+    bench = np.random.default_rng(0).lognormal(-2.5, 1.2, (int(args.megapixels * 1e6 / 4000), 4000, 3)).astype(np.float32)
+
+    curves = sorted({config.LOG_ENCODING_MAP.get(name, name) for name in config.LOG_TO_WORKING_SPACE})
+    print(f"tolerance {LOG_CURVE_TOLERANCE:g}")
+    print(f"{'curve':<14} {'max abs err':>12} {'LSB16':>7} {'colour s':>9} {'numba s':>8}")
+    failed = False
+    for curve in curves:
+        expected = colour.cctf_encoding(x.astype(np.float64), function=curve)
+        actual = encode_log(x.copy(), curve)
+        err = float(np.max(np.abs(actual - expected)))
+        failed |= err > LOG_CURVE_TOLERANCE
+
+        encode_log(bench[:8].copy(), curve)  # 预热 Numba JIT
+        img = bench.copy()
+        start = time.perf_counter()
+        colour.cctf_encoding(np.maximum(img, 1e-6), function=curve)
+        t_colour = time.perf_counter() - start
+        start = time.perf_counter()
+        encode_log(img, curve)
+        t_numba = time.perf_counter() - start
+
+        print(f"{curve:<14} {err:>12.2e} {err * 65535:>7.3f} {t_colour:>9.3f} {t_numba:>8.3f}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import click
 from raw_alchemy import lensfun_wrapper as lf
 from raw_alchemy import config, orchestrator
+from raw_alchemy.remap import INTERPOLATIONS
 
 @click.command()
 @click.argument("input_path", type=click.Path(exists=True))
@@ -40,6 +41,12 @@ from raw_alchemy import config, orchestrator
     type=click.Choice(config.METERING_MODES, case_sensitive=False),
     help="Auto exposure metering mode: hybrid (default), average, center-weighted, highlight-safe.",
 )
+@click.option(
+    "--metering-source",
+    default="image",
+    type=click.Choice(config.METERING_SOURCES, case_sensitive=False),
+    help="Data used for auto exposure: image (after demosaic, default) or bayer (sampled from the raw sensor data before demosaic; faster, applies the gain during decode).",
+)
 @click.option(
     "--jobs",
     type=int,
@@ -53,7 +60,103 @@ from raw_alchemy import config, orchestrator
     default='tif',
     help="Output file format. Default is 'tif'.",
 )
-def main(input_path, output_path, log_space, lut_path, exposure, lens_correct, custom_lensfun_db_path, metering, jobs, output_format):
+@click.option(
+    "--preset",
+    type=click.Choice(list(config.QUALITY_PRESETS.keys()), case_sensitive=False),
+    default=config.DEFAULT_QUALITY_PRESET,
+    help="Quality preset: draft (fast proxies), standard, or final (default). Selects demosaic algorithm, lens resampling, TIFF compression and metering sample size together.",
+)
+@click.option(
+    "--interpolation",
+    type=click.Choice(INTERPOLATIONS, case_sensitive=False),
+    default=None,
+    help="Lens correction resampling, overriding the preset: bilinear, bicubic or lanczos (Lanczos-3: sharper, about 1.8x slower than bicubic). Default follows --preset.",
+)
+@click.option(
+    "--decode-cache",
+    "decode_cache_dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory for caching decoded RAW data. Re-rendering a cached file skips demosaicing.",
+)
+@click.option(
+    "--decode-cache-size",
+    "decode_cache_size_gb",
+    type=float,
+    default=config.DEFAULT_DECODE_CACHE_SIZE_GB,
+    help=f"Decode cache size limit in GB (least recently used entries are evicted). Default is {config.DEFAULT_DECODE_CACHE_SIZE_GB:g}.",
+)
+@click.option(
+    "--decode-cache-compress",
+    is_flag=True,
+    default=False,
+    help="Store decode cache entries compressed. Saves disk space but entries can no longer be memory-mapped.",
+)
+@click.option(
+    "--read-ahead",
+    type=int,
+    default=config.DEFAULT_READ_AHEAD,
+    help="Batch mode: number of RAW files to read into memory ahead of the workers (0 disables). Useful on NAS or card readers.",
+)
+@click.option(
+    "--io-concurrency",
+    type=int,
+    default=config.DEFAULT_IO_CONCURRENCY,
+    help=f"Maximum concurrent read-ahead reads per storage device. Default is {config.DEFAULT_IO_CONCURRENCY}.",
+)
+@click.option(
+    "--max-memory",
+    "max_memory_gb",
+    type=float,
+    default=None,
+    help="Batch mode: memory budget in GB. Jobs are admitted only while their estimated peak memory fits; crashed jobs are rerun one at a time and the pool restarts at lower concurrency, recovering after a run of successes.",
+)
+@click.option(
+    "--deflicker",
+    "deflicker_window",
+    type=int,
+    default=0,
+    help="Batch mode: meter all files first and smooth the exposure over a window of this many frames (in filename order) to remove time-lapse flicker. 0 disables. Ignored with --exposure.",
+)
+@click.option(
+    "--pipeline",
+    type=click.Choice(config.PIPELINES, case_sensitive=False),
+    default=config.DEFAULT_PIPELINE,
+    help="Render pipeline after decode: fused (single-pass Numba kernel, default) or reference (step-by-step, for comparison and debugging).",
+)
+@click.option(
+    "--tile-rows",
+    type=int,
+    default=config.DEFAULT_TILE_ROWS,
+    help="Render in bands of this many rows and stream them to the output file, so peak memory is about the decoded frame plus a few bands (useful for 100MP+ files). 0 (default) processes the whole frame at once.",
+)
+@click.option(
+    "--half-precision/--full-precision",
+    default=config.DEFAULT_HALF_PRECISION,
+    help="For 8-bit output (JPEG), store the decoded working frame as float16 (all math still runs in float32). Halves the post-decode frame (and decode-cache entries), so --max-memory admits more parallel jobs. Ignored for 16-bit TIFF/HEIF output, which keeps float32; see benchmarks/bench_half_precision.py for the accuracy per output format.",
+)
+@click.option(
+    "--lens-map-cache",
+    "lens_map_cache_dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="Directory for caching lens distortion/TCA coordinate maps across runs (also kept in memory per worker); files shot with the same lens, focal length and size skip the Lensfun computation. Cached maps are float16 offsets. Without this option, coordinates are computed per band in float32 and no full-frame map is built.",
+)
+@click.option(
+    "--lens-grid-step",
+    type=int,
+    default=config.DEFAULT_LENS_GRID_STEP,
+    help="Compute lens distortion/TCA coordinates only every N pixels and interpolate them inside the remap kernel (e.g. 16), instead of storing a full per-pixel coordinate map. 0 (default) computes every pixel. See benchmarks/bench_lens_grid.py for the coordinate error.",
+)
+@click.option(
+    "--tiff-tile",
+    type=int,
+    default=config.DEFAULT_TIFF_TILE,
+    help="Write TIFF output as N x N pixel tiles (a multiple of 16, e.g. 256) compressed concurrently on all cores, also when streaming with --tile-rows. 0 (default) writes strips. See benchmarks/bench_tiff.py for throughput and file size.",
+)
+def main(input_path, output_path, log_space, lut_path, exposure, lens_correct, custom_lensfun_db_path, metering, metering_source, jobs, output_format,
+         preset, interpolation, decode_cache_dir, decode_cache_size_gb, decode_cache_compress, read_ahead, io_concurrency, max_memory_gb, deflicker_window,
+         pipeline, tile_rows, half_precision, lens_map_cache_dir, lens_grid_step, tiff_tile):
     """
     Converts RAW image(s) to high-quality image files (TIFF, HEIF, or JPG).
 
@@ -70,9 +173,25 @@ def main(input_path, output_path, log_space, lut_path, exposure, lens_correct, c
             lens_correct=lens_correct,
             custom_db_path=custom_lensfun_db_path,
             metering_mode=metering,
+            metering_source=metering_source,
             jobs=jobs,
             logger_func=click.echo, # Use click.echo for robust Unicode support
             output_format=output_format,
+            decode_cache_dir=decode_cache_dir,
+            decode_cache_size_gb=decode_cache_size_gb,
+            decode_cache_compress=decode_cache_compress,
+            preset=preset,
+            interpolation=interpolation,
+            read_ahead=read_ahead,
+            io_concurrency=io_concurrency,
+            max_memory_gb=max_memory_gb,
+            deflicker=deflicker_window,
+            pipeline=pipeline,
+            tile_rows=tile_rows,
+            half_precision=half_precision,
+            lens_map_cache_dir=lens_map_cache_dir,
+            lens_grid_step=lens_grid_step,
+            tiff_tile=tiff_tile,
         )
     except Exception as e:
         # The orchestrator will log specifics, but we can catch fatal errors here.
@@ -40,6 +40,50 @@ METERING_MODES = [
     'matrix',         # 矩阵/评价测光
 ]
 
+# 质量预设: 在速度与画质之间整体取舍
+#   demosaic:            rawpy 去马赛克算法名称 (rawpy.DemosaicAlgorithm)
+#   half_size:           半尺寸解码 (跳过去马赛克，分辨率减半)
+#   interpolation:       镜头校正重采样的插值方式 (bilinear / bicubic / lanczos，见 remap 模块；可单独覆盖)
+#   compression_level:   TIFF ZLIB 压缩级别
+#   metering_size:       测光缩略图长边像素数
+QUALITY_PRESETS = {
+    'draft': {
+        'demosaic': 'LINEAR',
+        'half_size': True,
+        'interpolation': 'bilinear',
+        'compression_level': 1,
+        'metering_size': 512,
+    },
+    'standard': {
+        'demosaic': 'AHD',
+        'half_size': False,
+        'interpolation': 'bicubic',
+        'compression_level': 6,
+        'metering_size': 1024,
+    },
+    'final': {
+        'demosaic': 'AAHD',
+        'half_size': False,
+        'interpolation': 'bicubic',  # Lanczos-3 需显式选择 (--interpolation lanczos)
+        'compression_level': 8,
+        'metering_size': 1024,
+    },
+}
+DEFAULT_QUALITY_PRESET = 'final'
+
+# 解码缓存默认容量上限 (GB)，超出后按 LRU 淘汰
+DEFAULT_DECODE_CACHE_SIZE_GB = 20.0
+
+# 批处理预读: 提前读入内存的文件数 (0=关闭)，以及每个存储设备的并发读取数
+DEFAULT_READ_AHEAD = 0
+DEFAULT_IO_CONCURRENCY = 2
+
+# 测光数据来源
+METERING_SOURCES = [
+    'image',          # 去马赛克后的图像 (默认)
+    'bayer',          # 去马赛克前的 Bayer 数据 (更快，增益合并到解码转换中)
+]
+
 # ==========================================
 #           GUI 配置
 # ==========================================
@@ -71,3 +115,47 @@ LOG_FONT_SIZE = 9
 # 进度条配置
 PROGRESS_BAR_LENGTH = 400
 PROGRESS_LABEL_WIDTH = 16
+
+# 渲染管线 (解码后的 增益 -> 饱和度/对比度 -> 矩阵 -> Log -> LUT -> 量化)
+PIPELINES = [
+    'fused',          # 单个 Numba 核一次完成全部步骤 (默认)
+    'reference',      # 逐步调用 (参考实现，便于对比和调试)
+]
+DEFAULT_PIPELINE = 'fused'
+
+# Camera-Match Boost: Log 转换前稍微增加饱和度和对比度，为 LUT 转换打底
+BOOST_SATURATION = 1.25
+BOOST_CONTRAST = 1.1
+BOOST_PIVOT = 0.18
+
+# LUT 解析缓存: 解析后的 LUT 以 .npz sidecar 缓存在缓存目录的 luts 子目录下 (65³ 的 3D LUT 约 6.6 MB)。
+# 磁盘容量上限 (MB)，超出后按最近使用时间淘汰 (LUT 文件修改后旧 sidecar 不再命中，由淘汰清理)
+DEFAULT_LUT_CACHE_SIZE_MB = 256
+
+# 分块渲染: 解码后的各阶段 (镜头校正、渲染、量化) 按行带执行，完成的行带直接写入输出文件。
+# 每个行带的行数 (0=整幅处理)。
+DEFAULT_TILE_ROWS = 0
+
+# 半精度存储: 工作帧 (解码结果、镜头校正输出、预览缓存) 以 float16 存储，每像素内存减半；
+# Numba 核函数读取后在寄存器中以 float32 计算。只用于 8-bit 输出 (16-bit 输出保持 float32，见 core.supports_half_precision)。
+# 精度报告见 benchmarks/bench_half_precision.py
+DEFAULT_HALF_PRECISION = False
+
+# 镜头坐标映射缓存: 指定 --lens-map-cache 时畸变/TCA 坐标映射以 float16 偏移量按镜头几何缓存，
+# 同一镜头/焦距/尺寸的图像跳过 Lensfun 计算 (未指定时按行带计算 float32 坐标，不缓存)；稀疏网格总是缓存。
+# 每个工作进程的内存缓存上限 (MB，0=关闭；24MP 映射约 288 MB)，以及磁盘缓存的容量上限 (GB)
+DEFAULT_LENS_MAP_CACHE_MB = 512
+DEFAULT_LENS_MAP_DISK_CACHE_GB = 4.0
+
+# 镜头坐标稀疏网格: 只在每隔 N 像素的网格点上向 Lensfun 请求坐标，重映射核函数内插值 (0=逐像素计算)。
+# 坐标数组从 width*height*24 字节降到几 MB；与逐像素坐标的误差报告见 benchmarks/bench_lens_grid.py
+DEFAULT_LENS_GRID_STEP = 0
+
+# 镜头坐标计算线程数: 按行带在线程池中并行调用 Lensfun (ctypes 调用期间释放 GIL)；0=使用全部 CPU 核心
+DEFAULT_LENS_THREADS = 0
+
+# TIFF 输出布局: 0=按 strip 写入 (默认)；>0 时写入 N x N 像素的分块 (须为 16 的倍数，如 256)，
+# 分块在线程池中并行压缩 (分块渲染的流式写入也可并行)。压缩线程数 0=全部 CPU 核心。
+# strip 与分块的吞吐和体积对比见 benchmarks/bench_tiff.py
+DEFAULT_TIFF_TILE = 0
+DEFAULT_TIFF_WORKERS = 0
@@ -1,16 +1,303 @@
 import gc
+import math
 import rawpy
 import numpy as np
 import colour
+import io
 import os
 from typing import Optional
 
 # 尝试导入同级目录下的模块，如果失败则尝试绝对导入 (方便不同运行环境调试)
 from raw_alchemy import utils
-from raw_alchemy.config import LOG_TO_WORKING_SPACE, LOG_ENCODING_MAP
+from raw_alchemy.config import (
+    LOG_TO_WORKING_SPACE, LOG_ENCODING_MAP, QUALITY_PRESETS,
+    DEFAULT_QUALITY_PRESET, DEFAULT_DECODE_CACHE_SIZE_GB, DEFAULT_PIPELINE,
+    BOOST_SATURATION, BOOST_CONTRAST, BOOST_PIVOT, DEFAULT_TILE_ROWS, DEFAULT_HALF_PRECISION,
+    DEFAULT_LENS_MAP_CACHE_MB, DEFAULT_LENS_GRID_STEP, DEFAULT_LENS_THREADS, DEFAULT_TIFF_TILE,
+)
 from raw_alchemy.logger import create_logger
-from raw_alchemy.metering import apply_auto_exposure
-from raw_alchemy.file_io import save_image
+from raw_alchemy.metering import calculate_auto_exposure_gain, extract_bayer_sample
+from raw_alchemy.file_io import save_image, save_image_bands, get_output_dtype
+from raw_alchemy.log_curves import encode_log, get_log_curve_params
+from raw_alchemy.luts import LUTChain, apply_lut, compile_lut
+from raw_alchemy.lut_cache import load_lut, attach_shared_lut
+from raw_alchemy.half_float import storage_dtype, storage_view
+from raw_alchemy.decode_cache import DecodeCache, hash_file_content, hash_bytes, make_cache_key
+
+
+def get_quality_preset(preset: str) -> dict:
+    """获取质量预设参数"""
+    settings = QUALITY_PRESETS.get(preset)
+    if settings is None:
+        raise ValueError(f"Unknown quality preset: {preset}")
+    return settings
+
+
+def get_decode_params(preset: str = DEFAULT_QUALITY_PRESET) -> dict:
+    """RAW 解码参数 (统一至 ProPhoto RGB / 16-bit Linear)，同时用于生成解码缓存键"""
+    settings = get_quality_preset(preset)
+    return dict(
+        gamma=(1, 1),
+        no_auto_bright=True,
+        use_camera_wb=True,
+        output_bps=16,
+        output_color=rawpy.ColorSpace.ProPhoto,
+        bright=1.0,
+        highlight_mode=2, # 2=Blend (防止高光死白)
+        demosaic_algorithm=getattr(rawpy.DemosaicAlgorithm, settings['demosaic']),
+        half_size=settings['half_size'],
+    )
+
+
+# 峰值内存估算 (字节/像素)，用于批处理的内存准入控制
+MEM_RAW_BYTES_PER_PIXEL = 2          # LibRaw 未解码的 Bayer 数据 (uint16)
+MEM_DECODE_BYTES_PER_PIXEL = 26      # LibRaw 4 通道 uint16 工作缓冲 + uint16 输出 + float32 结果
+MEM_FRAME_BYTES_PER_PIXEL = 12       # float32 RGB 工作帧
+MEM_HALF_SAVING_BYTES_PER_PIXEL = 6  # 半精度存储时工作帧和校正输出各少 6 字节
+MEM_LENS_BYTES_PER_PIXEL = 12        # 校正输出副本
+MEM_LENS_COORD_BYTES_PER_PIXEL = 24  # 逐像素坐标 (6 个 float32)，只计同时在内存中的行带
+MEM_LENS_COORD_BAND_ROWS = 256       # 与 lensfun_wrapper.LENS_BAND_ROWS 一致
+MEM_LENS_GRID_BYTES_PER_PIXEL = 12   # 稀疏网格模式: 只有校正输出副本 (坐标在核函数内插值)
+MEM_LENS_MAP_BYTES_PER_PIXEL = 12    # 磁盘缓存模式下整幅 float16 坐标偏移映射
+MEM_OUTPUT_BYTES_PER_PIXEL = 6       # uint16 量化输出
+MEM_WORKER_OVERHEAD_BYTES = 400 * 1024**2  # Python / Numba / colour 等常驻开销
+
+
+def estimate_peak_memory(
+    width: int,
+    height: int,
+    lens_correct: bool = True,
+    preset: str = DEFAULT_QUALITY_PRESET,
+    tile_rows: int = DEFAULT_TILE_ROWS,
+    half_precision: bool = DEFAULT_HALF_PRECISION,
+    lens_grid_step: int = DEFAULT_LENS_GRID_STEP,
+    lens_map_cache: bool = False,
+) -> int:
+    """
+    根据 RAW 尺寸和启用的处理步骤估算单个任务的峰值内存 (字节)
+
+    峰值取 "解码阶段" 与 "解码后处理阶段" 中较大者。
+    分块渲染时镜头校正的缓冲区只按行带计 (源行带按输出行带的 2 倍估计，覆盖畸变弯曲和余量)。
+    半精度存储时工作帧和校正输出减半；解码阶段的峰值在 LibRaw 内部，不受影响。
+    逐像素坐标按行带并行生成，最多 (线程数 + 1) 个行带的坐标同时在内存中。
+    指定磁盘坐标映射缓存 (lens_map_cache) 时还有整幅 float16 偏移映射: 不超过进程内缓存上限的映射
+    在任务间常驻 (两个阶段都计入)，超过上限的映射只在解码后处理阶段临时存在。稀疏网格模式下可忽略。
+    """
+    sensor_pixels = width * height
+    half_size = get_quality_preset(preset)['half_size']
+    # 半尺寸解码时输出像素数为 1/4
+    pixels = sensor_pixels // 4 if half_size else sensor_pixels
+    out_width = width // 2 if half_size else width
+    band_pixels = min(pixels, 2 * tile_rows * out_width) if tile_rows > 0 else pixels
+
+    saving = MEM_HALF_SAVING_BYTES_PER_PIXEL if half_precision else 0
+    decode_phase = MEM_DECODE_BYTES_PER_PIXEL * pixels
+    post_phase = (MEM_FRAME_BYTES_PER_PIXEL - saving) * pixels + MEM_OUTPUT_BYTES_PER_PIXEL * pixels
+    lens_map = 0
+    if lens_correct and lens_grid_step > 0:
+        post_phase += (MEM_LENS_GRID_BYTES_PER_PIXEL - saving) * band_pixels
+    elif lens_correct:
+        coord_threads = DEFAULT_LENS_THREADS or os.cpu_count() or 1
+        coord_pixels = min(band_pixels, (coord_threads + 1) * MEM_LENS_COORD_BAND_ROWS * out_width)
+        post_phase += (MEM_LENS_BYTES_PER_PIXEL - saving) * band_pixels + MEM_LENS_COORD_BYTES_PER_PIXEL * coord_pixels
+        if lens_map_cache:
+            map_bytes = MEM_LENS_MAP_BYTES_PER_PIXEL * pixels
+            if map_bytes <= DEFAULT_LENS_MAP_CACHE_MB * 1024**2:
+                lens_map = map_bytes
+            else:
+                post_phase += map_bytes
+
+    return (
+        MEM_WORKER_OVERHEAD_BYTES
+        + MEM_RAW_BYTES_PER_PIXEL * sensor_pixels
+        + lens_map
+        + max(decode_phase, post_phase)
+    )
+
+
+def measure_exposure_gain(
+    raw_path: str,
+    metering_mode: str = 'hybrid',
+    preset: str = DEFAULT_QUALITY_PRESET,
+    raw_buffer: Optional[bytes] = None,
+) -> float:
+    """
+    仅测光，不渲染 (用于批处理去闪烁的第一阶段)
+
+    优先使用去马赛克前的 Bayer 采样；非拜耳传感器 (如 X-Trans) 回退到半尺寸线性解码。
+    两种路径都只生成测光缩略图，耗时远小于完整渲染。
+
+    Returns:
+        float: 自动曝光增益
+    """
+    settings = get_quality_preset(preset)
+    source_cs = colour.RGB_COLOURSPACES['ProPhoto RGB']
+
+    raw_source = io.BytesIO(raw_buffer) if raw_buffer is not None else raw_path
+    with rawpy.imread(raw_source) as raw:
+        sample = extract_bayer_sample(raw, settings['metering_size'])
+        if sample is None:
+            decode_params = get_decode_params('draft')
+            prophoto_linear = raw.postprocess(**decode_params)
+            _, sample = utils.decode_to_float32(prophoto_linear, settings['metering_size'])
+            del prophoto_linear
+
+    return calculate_auto_exposure_gain(sample, source_cs, metering_mode, target_gray=0.18)
+
+
+def apply_creative_lut(img: np.ndarray, lut) -> np.ndarray:
+    """应用 colour 读取的 LUT (1D / 3x1D / 3D / shaper+3D 序列均使用 Numba 原位单次遍历，见 luts.apply_lut)"""
+    return apply_lut(img, lut)
+
+
+def render_look(
+    img: np.ndarray,
+    gain: float,
+    log_space: str,
+    lut=None,
+    output_dtype=np.uint16,
+    pipeline: str = DEFAULT_PIPELINE,
+    logger=None,
+    lut_name: Optional[str] = None,
+) -> np.ndarray:
+    """
+    解码后的渲染阶段: 增益 -> 饱和度/对比度 -> Gamut 矩阵 -> Log 编码 -> LUT
+
+    Args:
+        img: ProPhoto 线性图像 (float32 或 float16 半精度存储)，参考管线会原位修改
+             (参考管线先转为 float32；融合管线直接读取 float16，在寄存器中以 float32 计算)
+        gain: 尚未应用的曝光增益 (已应用时传 1.0)
+        log_space: 目标 Log 空间
+        lut: colour 读取的 LUT 对象 (None=不应用)
+        output_dtype: 融合管线的量化类型 (np.uint16 / np.uint8)
+        pipeline: 'fused' 或 'reference'
+        logger: 日志处理器
+        lut_name: 日志中显示的 LUT 名称
+
+    Returns:
+        np.ndarray: 融合管线返回已量化的 output_dtype 数组；
+                    参考管线返回 float32 (由 save_image 裁剪和量化)
+    """
+    if logger is None:
+        logger = create_logger()
+
+    if lut is not None and lut_name is None:
+        lut_name = getattr(lut, 'name', type(lut).__name__)  # LUTSequence 没有 name 属性
+
+    source_cs = colour.RGB_COLOURSPACES['ProPhoto RGB']
+
+    log_color_space_name = LOG_TO_WORKING_SPACE.get(log_space)
+    log_curve_name = LOG_ENCODING_MAP.get(log_space, log_space)
+    
+    if not log_color_space_name:
+         raise ValueError(f"Unknown Log Space: {log_space}")
+
+    # Gamut 变换矩阵 (ProPhoto Linear -> Log 工作空间)
+    M = colour.matrix_RGB_to_RGB(
+        colour.RGB_COLOURSPACES['ProPhoto RGB'],
+        colour.RGB_COLOURSPACES[log_color_space_name],
+    )
+
+    if not img.flags['C_CONTIGUOUS']:
+        img = np.ascontiguousarray(img)
+    if img.dtype not in (np.float32, np.float16):
+        img = img.astype(np.float32)
+
+    # 创意 LUT 整理为 "前置 1D -> 3D -> 后置 1D" 查表链 (None=无法整理，融合渲染不可用)
+    lut_chain = compile_lut(lut) if lut is not None else LUTChain()
+
+    if pipeline == 'fused' and lut_chain is not None:
+        # --- Step 3.5 - 5: 融合渲染 (单次读写) ---
+        logger.info(f"  ⚡ [Step 3.5-5] Fused render (Boost -> {log_color_space_name} -> {log_curve_name}"
+                    f"{' -> LUT ' + lut_name if lut is not None else ''})")
+        out = np.empty(img.shape, dtype=output_dtype)
+        utils.render_fused(
+            storage_view(img), out,
+            np.float32(gain), np.float32(BOOST_SATURATION), np.float32(BOOST_CONTRAST), np.float32(BOOST_PIVOT),
+            utils.get_luminance_coeffs(source_cs).astype(np.float32),
+            M.astype(np.float32),
+            get_log_curve_params(log_curve_name),
+            lut_chain.kernel_args,
+            np.float32(np.iinfo(output_dtype).max),
+        )
+        return out
+    else:
+        if pipeline == 'fused':
+            logger.info("  ℹ️  Fused render does not support this LUT structure, using the reference pipeline.")
+        if img.dtype != np.float32:
+            img = img.astype(np.float32)
+        if gain != 1.0:
+            utils.apply_gain_inplace(img, float(gain))
+
+        # 稍微增加饱和度和对比度，为 LUT 转换打底
+        logger.info("  🔹 [Step 3.5] Applying Camera-Match Boost...")
+        img = utils.apply_saturation_and_contrast(img, saturation=BOOST_SATURATION, contrast=BOOST_CONTRAST, colourspace=source_cs)
+
+        # --- Step 4: 色彩空间转换 (ProPhoto Linear -> Log) ---
+        logger.info(f"  🔹 [Step 4] Color Transform (ProPhoto -> {log_color_space_name} -> {log_curve_name})")
+
+        # 4.1 Gamut 变换 (矩阵运算)
+        utils.apply_matrix_inplace(img, M)
+        
+        # 4.2 Log 编码 (float32 原位 Numba 实现)
+        # Log 函数无法处理负值，需裁剪微小底噪 (1e-6)
+        img = encode_log(img, log_curve_name, floor=1e-6)
+
+        # --- Step 5: 应用 LUT ---
+        if lut is not None:
+            logger.info(f"  🔹 [Step 5] Applying LUT {lut_name}...")
+            try:
+                img = apply_creative_lut(img, lut)
+            except Exception as e:
+                logger.error(f"  ❌ applying LUT: {e}")
+
+    return img
+
+
+def render_bands(
+    img: np.ndarray,
+    tile_rows: int,
+    corrector,
+    gain: float,
+    log_space: str,
+    lut,
+    output_dtype,
+    pipeline: str = DEFAULT_PIPELINE,
+    logger=None,
+    lut_name: Optional[str] = None,
+):
+    """
+    分块渲染: 逐行带执行镜头几何校正 (corrector 为 None 时跳过) 和 render_look
+
+    每个行带的坐标、校正结果和渲染输出只在处理该行带期间存在，
+    峰值内存约为解码帧加上少数几个行带。渲染步骤的日志只在第一个行带输出。
+
+    Yields:
+        np.ndarray: 按行顺序的渲染结果行带 (除最后一个外均为 tile_rows 行)
+    """
+    quiet = create_logger(lambda message: None)
+    height = img.shape[0]
+    for y0 in range(0, height, tile_rows):
+        y1 = min(y0 + tile_rows, height)
+        band = corrector.remap_rows(img, y0, y1) if corrector is not None else img[y0:y1]
+        yield render_look(
+            band, gain, log_space, lut,
+            output_dtype=output_dtype,
+            pipeline=pipeline,
+            logger=logger if y0 == 0 else quiet,
+            lut_name=lut_name,
+        )
+
+
+def supports_half_precision(output_path: str) -> bool:
+    """
+    半精度存储只用于 8-bit 输出 (JPEG 等)
+
+    核函数虽以 float32 计算，float16 存储的线性工作帧只有 11 位有效数字，误差经 Log 曲线和 LUT 放大后
+    在 16-bit 输出 (TIFF / HEIF) 中可见 (合成数据上最多约 200 LSB，见 benchmarks/bench_half_precision.py)，
+    因此 16-bit 输出总是以 float32 存储工作帧。
+    """
+    return get_output_dtype(output_path) == np.uint8
 
 
 # ==========================================
@@ -27,117 +314,187 @@ def process_image(
     metering_mode: str = 'hybrid',
     custom_db_path: Optional[str] = None,
     log_queue: Optional[object] = None, # 多进程通信队列
+    decode_cache_dir: Optional[str] = None, # None=不使用解码缓存
+    decode_cache_size_gb: float = DEFAULT_DECODE_CACHE_SIZE_GB,
+    decode_cache_compress: bool = False,
+    preset: str = DEFAULT_QUALITY_PRESET, # 质量预设 (draft/standard/final)
+    raw_buffer: Optional[bytes] = None, # 预读阶段已读入内存的文件内容 (None=从 raw_path 读取)
+    metering_source: str = 'image', # 'image'=解码后测光, 'bayer'=去马赛克前在 Bayer 数据上测光
+    pipeline: str = DEFAULT_PIPELINE, # 'fused'=融合渲染核, 'reference'=逐步调用
+    tile_rows: int = DEFAULT_TILE_ROWS, # >0 时解码后的各阶段按该行数的行带执行并流式写入 (0=整幅)
+    half_precision: bool = DEFAULT_HALF_PRECISION, # 工作帧以 float16 存储 (计算仍为 float32)
+    shared_lut: Optional[dict] = None, # 主进程发布的 lut_path 查表链 (lut_cache.share_lut 的 descriptor)
+    lens_map_cache_dir: Optional[str] = None, # 镜头坐标映射的磁盘缓存目录 (None=稠密坐标按行带计算，不缓存)
+    lens_grid_step: int = DEFAULT_LENS_GRID_STEP, # >0 时镜头坐标只在该间距的网格上计算，重映射时插值
+    tiff_tile: int = DEFAULT_TIFF_TILE, # >0 时 TIFF 输出为该尺寸的分块 (并行压缩)，0=strip
+    interpolation: Optional[str] = None, # 镜头校正重采样的插值方式 (None=使用预设)
 ):
     filename = os.path.basename(raw_path)
     
     # 创建统一的日志处理器
     logger = create_logger(log_queue, filename)
     
-    logger.info(f"🧪 [Raw Alchemy] Processing: {raw_path}")
+    logger.info(f"🧪 [Raw Alchemy] Processing: {raw_path} (preset: {preset})")
+    settings = get_quality_preset(preset)
+    interpolation = interpolation or settings['interpolation']
+    if half_precision and not supports_half_precision(output_path):
+        logger.warning("  ⚠️  [Half Precision] 16-bit output keeps the float32 working frame, ignoring half precision.")
+        half_precision = False
+
+    source_cs = colour.RGB_COLOURSPACES['ProPhoto RGB']
+
+    # 曝光增益: 手动曝光时已知；自动曝光时为 None，待测光后确定
+    gain = 2.0 ** exposure if exposure is not None else None
+    gain_applied = False
 
     # --- Step 1: 解码 RAW (统一至 ProPhoto RGB / 16-bit Linear) ---
-    logger.info(f"  🔹 [Step 1] Decoding RAW...")
-    with rawpy.imread(raw_path) as raw:
-        # 提取 EXIF (用于镜头校正)
-        exif_data = utils.extract_lens_exif(raw, logger=logger.log)
-
-        # 解码: 必须使用 16-bit 以保留 Log 转换所需的动态范围
-        prophoto_linear = raw.postprocess(
-            gamma=(1, 1),
-            no_auto_bright=True,
-            use_camera_wb=True,
-            output_bps=16,
-            output_color=rawpy.ColorSpace.ProPhoto,
-            bright=1.0,
-            highlight_mode=2, # 2=Blend (防止高光死白)
-            demosaic_algorithm=rawpy.DemosaicAlgorithm.AAHD,
+    decode_params = get_decode_params(preset)
+    cache = None
+    cache_key = None
+    cached = None
+    metering_sample = None # 测光缩略图 (None 时测光直接对全图跨步采样)
+    if decode_cache_dir:
+        cache = DecodeCache(
+            decode_cache_dir,
+            max_bytes=int(decode_cache_size_gb * 1024**3),
+            compress=decode_cache_compress,
         )
-        # 转为 Float32 (0.0 - 1.0) 进行数学运算
-        img = prophoto_linear.astype(np.float32) / 65535.0
-        
-        # 立即释放内存
-        del prophoto_linear 
-        gc.collect()
+        content_hash = hash_bytes(raw_buffer) if raw_buffer is not None else hash_file_content(raw_path)
+        # 半精度存储的条目单独缓存 (float16 数据不能当作 float32 结果复用)
+        cache_key = make_cache_key(content_hash, dict(decode_params, storage='float16') if half_precision else decode_params)
+        cached = cache.load(cache_key)
 
-    source_cs = colour.RGB_COLOURSPACES['ProPhoto RGB']
+    if cached is not None:
+        logger.info(f"  🔹 [Step 1] Decode cache hit, skipping demosaic.")
+        img, exif_data = cached
+        metering_sample = utils.get_subsampled_view(img, settings['metering_size']).astype(np.float32)
+    else:
+        logger.info(f"  🔹 [Step 1] Decoding RAW...")
+        # 有预读数据时通过 open_buffer 解码，避免在计算进程中阻塞等待 I/O
+        raw_source = io.BytesIO(raw_buffer) if raw_buffer is not None else raw_path
+        with rawpy.imread(raw_source) as raw:
+            # 提取 EXIF (用于镜头校正)
+            exif_data = utils.extract_lens_exif(raw, logger=logger.log)
+
+            # Bayer 测光: 在去马赛克之前用 CFA 数据的跨步采样计算增益
+            if gain is None and metering_source == 'bayer':
+                bayer_sample = extract_bayer_sample(raw, settings['metering_size'])
+                if bayer_sample is None:
+                    logger.info("  ℹ️  [Auto Exposure] Not a Bayer sensor, falling back to image metering.")
+                else:
+                    logger.info(f"  🔹 [Step 2] Auto Exposure ({metering_mode}, pre-demosaic Bayer sample)")
+                    gain = calculate_auto_exposure_gain(bayer_sample, source_cs, metering_mode, target_gray=0.18, logger=logger)
+                    del bayer_sample
+
+            # 解码: 必须使用 16-bit 以保留 Log 转换所需的动态范围
+            prophoto_linear = raw.postprocess(**decode_params)
+
+            # 增益已知时直接在转换中应用，省去一次全图读写。
+            # 写入解码缓存时除外: 缓存必须保存未加增益的数据。
+            fold_gain = gain is not None and cache is None
+            # 转为 Float32 (0.0 - 1.0) 进行数学运算，同时抽取测光缩略图 (单次并行遍历)
+            # 半精度模式下工作帧以 float16 存储，内存减半
+            img, metering_sample = utils.decode_to_float32(
+                prophoto_linear, settings['metering_size'], gain=gain if fold_gain else 1.0,
+                dtype=storage_dtype(half_precision),
+            )
+            gain_applied = fold_gain
+            
+            # 立即释放内存
+            del prophoto_linear 
+            gc.collect()
+
+        if cache is not None:
+            try:
+                cache.store(cache_key, img, exif_data)
+            except OSError as e:
+                logger.warning(f"  ⚠️  [Decode Cache] Failed to store entry: {e}")
 
     # --- Step 2: 曝光控制 ---
     if exposure is not None:
         # 路径 A: 手动曝光
         logger.info(f"  🔹 [Step 2] Manual Exposure Override ({exposure:+.2f} stops)")
-        gain = 2.0 ** exposure
-        utils.apply_gain_inplace(img, gain)
-    else:
+
+    if gain_applied:
+        logger.info(f"  ⚡ [Step 2] Exposure gain {gain:.4f} applied during decode conversion")
+        gain = 1.0
+    elif gain is None:
         # 路径 B: 自动测光（使用策略模式）
         logger.info(f"  🔹 [Step 2] Auto Exposure ({metering_mode})")
-        img = apply_auto_exposure(img, source_cs, metering_mode, target_gray=0.18, logger=logger)
-
-    # --- Step 3: 镜头校正 & 风格化 ---
-    if lens_correct:
-        logger.info("  🔹 [Step 3] Applying Lens Correction...")
-        img = utils.apply_lens_correction(
-            img,
-            exif_data=exif_data,
-            custom_db_path=custom_db_path,
-            logger=logger.log
+        gain = calculate_auto_exposure_gain(
+            img if metering_sample is None else metering_sample,
+            source_cs, metering_mode, target_gray=0.18, logger=logger,
         )
-    else:
-        logger.info("  🔹 [Step 3] Skipping Lens Correction.")
 
-    # 稍微增加饱和度和对比度，为 LUT 转换打底
-    logger.info("  🔹 [Step 3.5] Applying Camera-Match Boost...")
-    img = utils.apply_saturation_and_contrast(img, saturation=1.25, contrast=1.1, colourspace=source_cs)
+    # 增益是线性缩放，与镜头校正的插值重映射可交换: 只校正暗角时并入暗角的遍历，
+    # 否则由渲染阶段应用 (融合管线并入渲染核，参考管线在 render_look 中单独一步)
 
-    # --- Step 4: 色彩空间转换 (ProPhoto Linear -> Log) ---
-    log_color_space_name = LOG_TO_WORKING_SPACE.get(log_space)
-    log_curve_name = LOG_ENCODING_MAP.get(log_space, log_space)
-    
-    if not log_color_space_name:
-         raise ValueError(f"Unknown Log Space: {log_space}")
-
-    logger.info(f"  🔹 [Step 4] Color Transform (ProPhoto -> {log_color_space_name} -> {log_curve_name})")
-
-    # 4.1 Gamut 变换 (矩阵运算)
-    M = colour.matrix_RGB_to_RGB(
-        colour.RGB_COLOURSPACES['ProPhoto RGB'],
-        colour.RGB_COLOURSPACES[log_color_space_name],
-    )
-    if not img.flags['C_CONTIGUOUS']:
-        img = np.ascontiguousarray(img)
-    if img.dtype != np.float32:
-        img = img.astype(np.float32)
-    utils.apply_matrix_inplace(img, M)
-    
-    # 4.2 Log 编码
-    # Log 函数无法处理负值，需裁剪微小底噪
-    np.maximum(img, 1e-6, out=img) 
-    img = colour.cctf_encoding(img, function=log_curve_name)
-
-    # --- Step 5: 应用 LUT ---
-    if lut_path:
-        logger.info(f"  🔹 [Step 5] Applying LUT {os.path.basename(lut_path)}...")
+    lut = None
+    if shared_lut is not None:
+        # 批处理: 挂载主进程编译好的查表链 (只读共享，不重复解析和打包)
+        lut = attach_shared_lut(shared_lut)
+    elif lut_path:
         try:
-            lut = colour.read_LUT(lut_path)
-            
-            # 3D LUT 使用 Numba 加速
-            if isinstance(lut, colour.LUT3D):
-                if not img.flags['C_CONTIGUOUS']:
-                    img = np.ascontiguousarray(img)
-                if img.dtype != np.float32:
-                    img = img.astype(np.float32)
-                if lut.table.dtype != np.float32:
-                    lut.table = lut.table.astype(np.float32)
-                utils.apply_lut_inplace(img, lut.table, lut.domain[0], lut.domain[1])
-            else:
-                # 1D LUT 使用 colour 库默认方法
-                img = lut.apply(img)
-            
+            lut = load_lut(lut_path, logger=logger)
         except Exception as e:
             logger.error(f"  ❌ applying LUT: {e}")
+    lut_name = os.path.basename(lut_path) if lut_path else None
+    output_dtype = get_output_dtype(output_path)
+
+    height, width = img.shape[:2]
+    if 0 < tile_rows < height:
+        # --- Step 3 - 6: 分块渲染，逐行带校正、渲染并流式写入 ---
+        logger.info(f"  🧩 [Tiled] {math.ceil(height / tile_rows)} bands of {tile_rows} rows")
+        corrector = None
+        if lens_correct:
+            logger.info("  🔹 [Step 3] Applying Lens Correction (per band)...")
+            corrector = utils.create_lens_corrector(
+                width, height,
+                exif_data=exif_data,
+                custom_db_path=custom_db_path,
+                logger=logger.log,
+                interpolation=interpolation,
+                lens_map_cache_dir=lens_map_cache_dir,
+                grid_step=lens_grid_step,
+            )
+            # 暗角: 几何校正时在重映射核函数内完成；否则与曝光增益在同一次遍历中相乘
+            if corrector is not None and corrector.apply_vignetting(img, gain):
+                gain = 1.0
+        else:
+            logger.info("  🔹 [Step 3] Skipping Lens Correction.")
+
+        bands = render_bands(img, tile_rows, corrector, gain, log_space, lut, output_dtype, pipeline, logger, lut_name)
+        logger.info(f"  💾 Streaming to {os.path.basename(output_path)}...")
+        save_image_bands(bands, output_path, img.shape, tile_rows, logger, compression_level=settings['compression_level'],
+                         tiff_tile=tiff_tile)
+    else:
+        # --- Step 3: 镜头校正 & 风格化 ---
+        if lens_correct:
+            logger.info("  🔹 [Step 3] Applying Lens Correction...")
+            img, gain = utils.apply_lens_correction(
+                img,
+                gain=gain,
+                exif_data=exif_data,
+                custom_db_path=custom_db_path,
+                logger=logger.log,
+                interpolation=interpolation,
+                lens_map_cache_dir=lens_map_cache_dir,
+                grid_step=lens_grid_step,
+            )
+        else:
+            logger.info("  🔹 [Step 3] Skipping Lens Correction.")
+
+        img = render_look(
+            img, gain, log_space, lut,
+            output_dtype=output_dtype,
+            pipeline=pipeline,
+            logger=logger,
+            lut_name=lut_name,
+        )
 
-    # --- Step 6: 保存（使用模块化的文件保存功能）---
-    logger.info(f"  💾 Saving to {os.path.basename(output_path)}...")
-    save_image(img, output_path, logger)
+        # --- Step 6: 保存（使用模块化的文件保存功能）---
+        logger.info(f"  💾 Saving to {os.path.basename(output_path)}...")
+        save_image(img, output_path, logger, compression_level=settings['compression_level'], tiff_tile=tiff_tile)
     
     # --- 最终清理 ---
     del img
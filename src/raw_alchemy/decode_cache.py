@@ -0,0 +1,168 @@
+"""
+解码缓存模块
+将 RAW 解码后的 ProPhoto 线性缓冲区 (float32, 0.0-1.0) 持久化到磁盘。
+只更换 LUT / Log 空间重新渲染时，直接内存映射 (mmap) 读取，跳过最慢的去马赛克步骤。
+"""
+import os
+import json
+import hashlib
+import numpy as np
+from typing import Optional, Tuple
+
+# 缓存格式版本，修改存储布局时递增，使旧缓存自动失效
+CACHE_VERSION = 1
+
+# 计算文件哈希时的读取块大小
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def hash_file_content(path: str) -> str:
+    """计算文件内容哈希 (BLAKE2b，比 SHA-256 更快)"""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_bytes(data: bytes) -> str:
+    """计算内存中文件内容的哈希 (预读阶段已将文件读入内存时使用，避免再次读盘)"""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def make_cache_key(content_hash: str, decode_params: dict) -> str:
+    """
+    由文件内容哈希和解码参数生成缓存键
+
+    解码参数中可能包含 rawpy 枚举，统一转为字符串后再序列化。
+    """
+    params = {k: str(v) for k, v in sorted(decode_params.items())}
+    payload = json.dumps({'v': CACHE_VERSION, 'file': content_hash, 'params': params}, sort_keys=True)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+
+class DecodeCache:
+    """
+    基于目录的解码缓存，带容量上限和 LRU 淘汰
+
+    每个条目由两个文件组成:
+        <key>.npy / <key>.npz : 解码后的 float32 图像
+        <key>.json            : 元数据 (EXIF 等)
+    条目的修改时间 (mtime) 作为 LRU 时间戳，命中时刷新。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, compress: bool = False):
+        """
+        Args:
+            cache_dir: 缓存目录，不存在时自动创建
+            max_bytes: 缓存总容量上限 (字节)
+            compress: 是否压缩存储 (更省空间，但无法内存映射)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_bytes)
+        self.compress = compress
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _data_path(self, key: str, compressed: bool) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz" if compressed else f"{key}.npy")
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def load(self, key: str) -> Optional[Tuple[np.ndarray, dict]]:
+        """
+        读取缓存条目
+
+        未压缩条目以写时复制 (copy-on-write) 方式内存映射:
+        后续的原位处理只会修改私有页，不会改动磁盘上的缓存文件。
+
+        Returns:
+            (图像, 元数据) 或 None (未命中/条目损坏)
+        """
+        meta_path = self._meta_path(key)
+        if not os.path.exists(meta_path):
+            return None
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+
+            if meta.get('compressed'):
+                data_path = self._data_path(key, True)
+                with np.load(data_path) as npz:
+                    img = npz['img']
+            else:
+                data_path = self._data_path(key, False)
+                # mmap_mode='c': 写时复制，np.asarray 去掉 memmap 子类以便 Numba 直接处理
+                img = np.asarray(np.load(data_path, mmap_mode='c'))
+
+            # 刷新 LRU 时间戳
+            os.utime(data_path)
+            return img, meta.get('exif', {})
+
+        except (OSError, ValueError, KeyError):
+            # 条目损坏或正在被其他进程淘汰，视为未命中
+            return None
+
+    def store(self, key: str, img: np.ndarray, exif_data: dict):
+        """
+        写入缓存条目，随后按容量上限淘汰最久未使用的条目
+
+        先写临时文件再原子重命名，避免多个工作进程同时读写时读到半截文件。
+        """
+        data_path = self._data_path(key, self.compress)
+        tmp_path = f"{data_path}.{os.getpid()}.tmp"
+
+        with open(tmp_path, 'wb') as f:
+            if self.compress:
+                np.savez_compressed(f, img=img)
+            else:
+                np.save(f, img)
+        os.replace(tmp_path, data_path)
+
+        meta = {
+            'version': CACHE_VERSION,
+            'compressed': self.compress,
+            'shape': list(img.shape),
+            'exif': exif_data,
+        }
+        meta_tmp_path = f"{self._meta_path(key)}.{os.getpid()}.tmp"
+        with open(meta_tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_tmp_path, self._meta_path(key))
+
+        self.evict()
+
+    def evict(self):
+        """按 LRU 顺序删除条目，直到总大小不超过上限"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(('.npy', '.npz')):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        # 最旧的在前
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            key = os.path.splitext(os.path.basename(path))[0]
+            for p in (path, self._meta_path(key)):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            total -= size
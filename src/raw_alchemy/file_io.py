@@ -5,23 +5,31 @@
 import os
 import numpy as np
 import tifffile
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import pillow_heif
-from typing import Optional
+from typing import Iterable, Optional
+from raw_alchemy.config import DEFAULT_TIFF_TILE, DEFAULT_TIFF_WORKERS
 from raw_alchemy.logger import Logger
 
 def save_image(
     img: np.ndarray,
     output_path: str,
-    logger: Optional[Logger] = None
+    logger: Optional[Logger] = None,
+    compression_level: int = 8,
+    tiff_tile: int = DEFAULT_TIFF_TILE,
+    tiff_workers: int = DEFAULT_TIFF_WORKERS,
 ) -> bool:
     """
     保存图像到指定路径，根据扩展名自动选择格式
     
     Args:
-        img: 图像数据 (float32, 0.0-1.0)
+        img: 图像数据 (float32, 0.0-1.0)，或已量化的 uint16 / uint8 数据 (融合管线输出)
         output_path: 输出路径
         logger: 日志处理器
+        compression_level: TIFF ZLIB 压缩级别 (1-9)
+        tiff_tile: >0 时 TIFF 写入 tiff_tile x tiff_tile 的分块 (16 的倍数)，0 为 strip
+        tiff_workers: TIFF 压缩线程数 (0=全部 CPU 核心)
     
     Returns:
         bool: 是否保存成功
@@ -30,14 +38,15 @@ def save_image(
         from .logger import create_logger
         logger = create_logger()
     
-    # 确保数据在有效范围内
-    np.clip(img, 0.0, 1.0, out=img)
+    # 确保数据在有效范围内 (已量化的整数数据无需裁剪)
+    if img.dtype.kind == 'f':
+        np.clip(img, 0.0, 1.0, out=img)
     
     file_ext = os.path.splitext(output_path)[1].lower()
     
     try:
         if file_ext in ['.tif', '.tiff']:
-            _save_tiff(img, output_path, logger)
+            _save_tiff(img, output_path, logger, compression_level, tiff_tile, tiff_workers)
         elif file_ext in ['.heic', '.heif']:
             _save_heif(img, output_path, logger)
         else:
@@ -53,25 +62,228 @@ def save_image(
         return False
 
 
-def _save_tiff(img: np.ndarray, output_path: str, logger: Logger):
-    """保存为 16-bit TIFF 格式"""
-    logger.info("    Format: TIFF (16-bit, ZLIB Optimized)")
-    output_image_uint16 = (img * 65535).astype(np.uint16)
-    
+def save_image_bands(
+    bands: Iterable[np.ndarray],
+    output_path: str,
+    shape: tuple,
+    band_rows: int,
+    logger: Optional[Logger] = None,
+    compression_level: int = 8,
+    tiff_tile: int = DEFAULT_TIFF_TILE,
+    tiff_workers: int = DEFAULT_TIFF_WORKERS,
+) -> bool:
+    """
+    流式保存按行带渲染的图像 (分块渲染模式)
+
+    TIFF: 每个行带编码为一个 strip (水平差分 + ZLIB) 后立即写入文件，整幅输出不驻留内存。
+          tiff_tile > 0 时行带重新切分为一行行分块，每行分块在线程池中并行编码后写入。
+    HEIF / JPEG: 编码器需要完整图像，行带拼入已量化的整幅缓冲区后再编码
+    (uint16 每像素 6 字节 / uint8 每像素 3 字节，远小于 float32 工作帧)。
+
+    Args:
+        bands: 按行顺序产出行带的迭代器，除最后一个外均为 band_rows 行；
+               行带为已量化的 uint16 / uint8 数据 (见 get_output_dtype)，或 float32 (0.0-1.0)
+        output_path: 输出路径
+        shape: 整幅图像形状 (height, width, 3)
+        band_rows: 行带行数 (即 TIFF 的 RowsPerStrip)
+        logger: 日志处理器
+        compression_level: TIFF ZLIB 压缩级别 (1-9)
+        tiff_tile: >0 时 TIFF 写入 tiff_tile x tiff_tile 的分块 (16 的倍数)，0 为 strip
+        tiff_workers: TIFF 分块压缩线程数 (0=全部 CPU 核心)
+
+    Returns:
+        bool: 是否保存成功
+    """
+    if logger is None:
+        from .logger import create_logger
+        logger = create_logger()
+
+    file_ext = os.path.splitext(output_path)[1].lower()
+
+    try:
+        if file_ext in ['.tif', '.tiff']:
+            if tiff_tile > 0:
+                _save_tiff_tiled_bands(bands, output_path, shape, logger, compression_level, tiff_tile, tiff_workers)
+            else:
+                _save_tiff_bands(bands, output_path, shape, band_rows, logger, compression_level)
+        else:
+            # 拼接为已量化的整幅图像，再交给对应格式的编码器
+            output = np.empty(shape, dtype=get_output_dtype(output_path))
+            y = 0
+            for band in bands:
+                output[y:y + band.shape[0]] = _quantize(band, output.dtype)
+                y += band.shape[0]
+            if file_ext in ['.heic', '.heif']:
+                _save_heif(output, output_path, logger)
+            else:
+                _save_jpeg_or_other(output, output_path, file_ext, logger)
+
+        logger.info(f"  ✅ Saved: {output_path}")
+        return True
+
+    except Exception as e:
+        logger.error(f"  ❌ Failed to save file: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def get_output_dtype(output_path: str) -> type:
+    """按扩展名返回输出格式所需的量化类型 (TIFF / HEIF: uint16，其他: uint8)"""
+    file_ext = os.path.splitext(output_path)[1].lower()
+    if file_ext in ['.tif', '.tiff', '.heic', '.heif']:
+        return np.uint16
+    return np.uint8
+
+
+def _to_uint16(img: np.ndarray) -> np.ndarray:
+    """float32 (已裁剪) -> uint16；已是 uint16 时直接返回"""
+    if img.dtype == np.uint16:
+        return img
+    return (img * 65535).astype(np.uint16)
+
+
+def _to_uint8(img: np.ndarray) -> np.ndarray:
+    """float32 (已裁剪) -> uint8；已是 uint8 时直接返回"""
+    if img.dtype == np.uint8:
+        return img
+    return (img * 255).astype(np.uint8)
+
+
+def _quantize(img: np.ndarray, dtype) -> np.ndarray:
+    """float32 行带裁剪后量化为 dtype；已量化的数据直接返回"""
+    if img.dtype.kind == 'f':
+        img = np.clip(img, 0.0, 1.0)
+    return _to_uint16(img) if dtype == np.uint16 else _to_uint8(img)
+
+
+def _tiff_workers(workers: int) -> int:
+    """TIFF 压缩线程数 (0=全部 CPU 核心)"""
+    return workers or os.cpu_count() or 1
+
+
+def _check_tiff_tile(tile: int):
+    if tile % 16:
+        raise ValueError(f"TIFF tile size must be a multiple of 16, got {tile}")
+
+
+def _save_tiff(img: np.ndarray, output_path: str, logger: Logger, compression_level: int = 8,
+               tile: int = DEFAULT_TIFF_TILE, workers: int = DEFAULT_TIFF_WORKERS):
+    """保存为 16-bit TIFF 格式 (tile > 0 时为分块 TIFF；strip 和分块都由 tifffile 多线程压缩)"""
+    workers = _tiff_workers(workers)
+    layout = f"{tile}x{tile} tiles" if tile > 0 else "strips"
+    logger.info(f"    Format: TIFF (16-bit, ZLIB level {compression_level}, {layout}, {workers} threads)")
+    output_image_uint16 = _to_uint16(img)
+    layout_args = {}
+    if tile > 0:
+        _check_tiff_tile(tile)
+        layout_args['tile'] = (tile, tile)
+
     tifffile.imwrite(
         output_path,
         output_image_uint16,
         photometric='rgb',
         compression='zlib',
         predictor=2,  # 水平差分，提升压缩率
-        compressionargs={'level': 8}  # 平衡速度和体积
+        compressionargs={'level': compression_level},  # 默认 8: 平衡速度和体积
+        maxworkers=workers,
+        **layout_args
+    )
+
+
+def _save_tiff_bands(bands: Iterable[np.ndarray], output_path: str, shape: tuple, band_rows: int,
+                     logger: Logger, compression_level: int = 8):
+    """流式保存为 16-bit TIFF: 每个行带即一个 strip，编码方式与 _save_tiff 相同"""
+    logger.info(f"    Format: TIFF (16-bit, ZLIB level {compression_level}, streamed in {band_rows}-row strips)")
+    predictor = tifffile.TIFF.PREDICTORS[2]
+    compressor = tifffile.TIFF.COMPRESSORS[8]
+
+    def encoded_strips():
+        for band in bands:
+            strip = np.ascontiguousarray(_quantize(band, np.uint16))
+            yield compressor(predictor(strip, axis=-2), level=compression_level)
+
+    # 迭代器产出已编码的 strip 字节时，tifffile 按 rowsperstrip 直接写入
+    tifffile.imwrite(
+        output_path,
+        data=encoded_strips(),
+        shape=shape,
+        dtype=np.uint16,
+        photometric='rgb',
+        compression='zlib',
+        predictor=2,
+        rowsperstrip=band_rows,
+        compressionargs={'level': compression_level}
     )
 
 
+def _tile_row_blocks(bands: Iterable[np.ndarray], shape: tuple, tile: int):
+    """
+    把任意行数的行带重新切分为 tile 行的块 (uint16，宽度补零到 tile 的倍数，最后一块在底部补零)
+
+    产出的块在下一次迭代时被覆盖，调用方须在继续迭代前处理完毕。
+    """
+    height, width = shape[:2]
+    block = np.zeros((tile, -(-width // tile) * tile, 3), dtype=np.uint16)
+    filled = 0
+    for band in bands:
+        band = _quantize(band, np.uint16)
+        pos = 0
+        while pos < band.shape[0]:
+            n = min(tile - filled, band.shape[0] - pos)
+            block[filled:filled + n, :width] = band[pos:pos + n]
+            filled += n
+            pos += n
+            if filled == tile:
+                yield block
+                filled = 0
+    if filled:
+        block[filled:] = 0
+        yield block
+
+
+def _save_tiff_tiled_bands(bands: Iterable[np.ndarray], output_path: str, shape: tuple, logger: Logger,
+                           compression_level: int = 8, tile: int = DEFAULT_TIFF_TILE,
+                           workers: int = DEFAULT_TIFF_WORKERS):
+    """
+    流式保存为分块 16-bit TIFF: 行带切分为一行行 tile x tile 分块，每行分块在线程池中并行编码
+    (水平差分 + ZLIB，zlib 压缩期间释放 GIL)，按顺序写入。只有一行分块驻留内存。
+    """
+    _check_tiff_tile(tile)
+    workers = _tiff_workers(workers)
+    logger.info(f"    Format: TIFF (16-bit, ZLIB level {compression_level}, streamed in {tile}x{tile} tiles, "
+                f"{workers} threads)")
+    predictor = tifffile.TIFF.PREDICTORS[2]
+    compressor = tifffile.TIFF.COMPRESSORS[8]
+
+    def encode(block, x0):
+        data = np.ascontiguousarray(block[:, x0:x0 + tile])
+        return compressor(predictor(data, axis=-2), level=compression_level)
+
+    def encoded_tiles(executor):
+        for block in _tile_row_blocks(bands, shape, tile):
+            # 同一行分块全部编码完成后才继续迭代 (块缓冲区会被复用)
+            yield from list(executor.map(lambda x0: encode(block, x0), range(0, block.shape[1], tile)))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # 迭代器产出已编码的分块字节时，tifffile 按 tile 形状直接写入
+        tifffile.imwrite(
+            output_path,
+            data=encoded_tiles(executor),
+            shape=shape,
+            dtype=np.uint16,
+            photometric='rgb',
+            compression='zlib',
+            predictor=2,
+            tile=(tile, tile),
+            compressionargs={'level': compression_level}
+        )
+
+
 def _save_heif(img: np.ndarray, output_path: str, logger: Logger):
     """保存为 10-bit HEIF 格式"""
     logger.info("    Format: HEIF (10-bit, High Quality)")
-    output_image_uint16 = (img * 65535).astype(np.uint16)
+    output_image_uint16 = _to_uint16(img)
     
     heif_file = pillow_heif.from_bytes(
         mode='RGB;16',
@@ -86,7 +298,7 @@ def _save_jpeg_or_other(img: np.ndarray, output_path: str, file_ext: str, logger
     logger.info(f"    Format: {file_ext.upper()} (8-bit High Quality)")
     
     # 转换为 8-bit（img 已经在 save_image 中被 clip 过了）
-    output_image_uint8 = (img * 255).astype(np.uint8)
+    output_image_uint8 = _to_uint8(img)
     
     # JPEG 特殊优化参数
     save_params = {}
@@ -104,6 +104,17 @@ class GuiApplication(tk.Frame):
         self.jobs_var = tk.IntVar(value=min(4, multiprocessing.cpu_count()))
         ttk.Spinbox(settings_frame, from_=1, to=multiprocessing.cpu_count(), textvariable=self.jobs_var, width=5).grid(row=3, column=1, sticky="w", padx=5)
 
+        # Row 3 (右侧): 质量预设
+        ttk.Label(settings_frame, text="Quality Preset:").grid(row=3, column=2, sticky="e", pady=5)
+        self.preset_var = tk.StringVar(value=config.DEFAULT_QUALITY_PRESET)
+        ttk.OptionMenu(settings_frame, self.preset_var, config.DEFAULT_QUALITY_PRESET, *config.QUALITY_PRESETS.keys()).grid(row=3, column=3, sticky="w", padx=5)
+
+        # Row 4: Decode Cache (可选，重复渲染时跳过去马赛克)
+        ttk.Label(settings_frame, text="Decode Cache:").grid(row=4, column=0, sticky="w", pady=5)
+        self.decode_cache_dir_var = tk.StringVar()
+        ttk.Entry(settings_frame, textvariable=self.decode_cache_dir_var).grid(row=4, column=1, columnspan=2, sticky="ew", padx=5)
+        ttk.Button(settings_frame, text="Browse...", command=self.browse_decode_cache_dir).grid(row=4, column=3, sticky="ew", padx=5)
+
         settings_frame.columnconfigure(1, weight=1)
         settings_frame.columnconfigure(2, weight=1)
 
@@ -288,6 +299,10 @@ class GuiApplication(tk.Frame):
                 return full_path
         return None
     
+    def browse_decode_cache_dir(self):
+        path = filedialog.askdirectory(title="Select Decode Cache Folder")
+        if path: self.decode_cache_dir_var.set(path)
+
     def browse_lensfun_db(self):
         path = filedialog.askopenfilename(filetypes=[("Lensfun XML", "*.xml")])
         if path: self.custom_lensfun_db_path_var.set(path)
@@ -397,7 +412,9 @@ class GuiApplication(tk.Frame):
             'lut_path': self.get_selected_lut_path(),
             'custom_db_path': self.custom_lensfun_db_path_var.get() or None,
             'jobs': self.jobs_var.get(),
-            'lens_correct': self.lens_correction_var.get()
+            'lens_correct': self.lens_correction_var.get(),
+            'decode_cache_dir': self.decode_cache_dir_var.get() or None,
+            'preset': self.preset_var.get(),
         }
         
         if self.exposure_mode_var.get() == "Manual":
@@ -0,0 +1,76 @@
+"""
+半精度 (float16) 存储模块
+工作帧以 float16 存储时每像素只占 6 字节 (float32 为 12 字节)。
+Numba 的 CPU 后端不支持 float16 运算，因此 float16 数组以 uint16 位模式视图 (storage_view) 传入核函数，
+读写时在寄存器中与 float32 互转。核函数通过 load_float32 / to_storage 读写像素，
+float32 与 float16 存储共用同一份代码 (Numba 按参数类型分别编译)。
+"""
+import math
+import numpy as np
+from numba import njit, types
+from numba.extending import overload
+
+# float16 位模式 -> float32 查找表 (65536 项，256 KB)，解码即一次查表，结果精确
+_HALF_TO_FLOAT32 = np.arange(65536, dtype=np.uint16).view(np.float16).astype(np.float32)
+
+
+def storage_dtype(half_precision: bool):
+    """工作帧的存储类型"""
+    return np.float16 if half_precision else np.float32
+
+
+def storage_view(img: np.ndarray) -> np.ndarray:
+    """传给核函数的视图: float16 数组转为 uint16 位模式视图 (零拷贝)，其他数组原样返回"""
+    return img.view(np.uint16) if img.dtype == np.float16 else img
+
+
+@njit(inline='always', cache=True)
+def half_bits_to_float32(bits):
+    """float16 位模式 -> float32"""
+    return _HALF_TO_FLOAT32[bits]
+
+
+@njit(inline='always', cache=True)
+def float32_to_half_bits(value):
+    """
+    float32 -> float16 位模式 (就近舍入、偶数优先，与 numpy 的 astype(np.float16) 一致)
+
+    超出 float16 范围 (>= 65520) 的值为 inf，NaN 保持为 NaN。
+    """
+    sign = np.uint16(0x8000) if math.copysign(1.0, value) < 0 else np.uint16(0)
+    a = abs(value)
+    if a != a:
+        return np.uint16(0x7e00)
+    if a >= 65520.0:
+        return sign | np.uint16(0x7c00)
+    if a < 6.103515625e-05:
+        # 次正规数: 以 2^-24 为单位取整 (取整到 1024 时恰好进位为最小正规数)
+        return sign | np.uint16(np.rint(a * 16777216.0))
+    mantissa, exponent = math.frexp(a)
+    # a = mantissa * 2^exponent, mantissa ∈ [0.5, 1): 有效位 11 位，尾数进位时自然进入指数域
+    return sign | np.uint16(((exponent + 14) << 10) + np.int64(np.rint(mantissa * 2048.0)) - 1024)
+
+
+def load_float32(value):
+    """读取像素值为 float32 (Numba 内使用，见 overload)"""
+    raise NotImplementedError
+
+
+@overload(load_float32, inline='always')
+def _load_float32(value):
+    if isinstance(value, types.Integer):
+        # float16 存储 (uint16 位模式视图)
+        return lambda value: half_bits_to_float32(value)
+    return lambda value: np.float32(value)
+
+
+def to_storage(value, dst):
+    """将 float32 值转为 dst 的存储表示 (Numba 内使用，见 overload)"""
+    raise NotImplementedError
+
+
+@overload(to_storage, inline='always')
+def _to_storage(value, dst):
+    if isinstance(dst.dtype, types.Integer):
+        return lambda value, dst: float32_to_half_bits(value)
+    return lambda value, dst: value
@@ -0,0 +1,168 @@
+"""
+镜头坐标映射缓存模块
+畸变/TCA 校正的坐标映射只取决于镜头、焦距、裁剪系数、图像尺寸和启用的校正，
+同一场拍摄中只有少数几种组合。这里把映射保存在进程内 LRU 缓存中，并可选写入磁盘，
+命中时完全跳过 Lensfun 调用。稠密偏移量只在指定磁盘缓存时使用 (见 create_lens_corrector)，
+未指定时 LensCorrector 按行带计算 float32 坐标，不构建整幅映射。映射为整幅 float16 偏移量 (源坐标 - 像素坐标)，
+或稀疏网格模式下的 float32 网格点坐标 (见 remap.remap_rgb_grid，只有几 MB)。
+暗角校正的径向增益曲线 (vignetting.radial_profile，几 KB) 也按镜头配置缓存在这里。
+
+磁盘条目存储 float16 位模式沿 x 方向的差分 (平滑的偏移场相邻像素的位模式只差几个 LSB)，
+再以 zlib 1 级压缩为 .npz: 24MP 映射由 288 MB 压缩到约 37 MB，读取时累加还原，无损。
+
+float16 偏移量的舍入误差不超过 |偏移量| * 2^-11 像素 (偏移 128 px 时为 1/16 px 的一半)。
+启用缓存时未命中的映射同样先量化再使用，命中与否输出完全一致。
+"""
+import os
+import json
+import hashlib
+import zipfile
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+# 缓存格式版本，修改存储方式时递增，使旧缓存自动失效
+LENS_MAP_CACHE_VERSION = 1
+
+# 进程内 LRU: 键 -> 映射数组 (float16 偏移量或 float32 网格)
+_memory_cache = OrderedDict()
+
+
+def make_lens_map_key(geometry: dict) -> str:
+    """由镜头几何参数 (镜头、焦距、裁剪系数、尺寸、启用的校正、数据库签名) 生成缓存键"""
+    payload = json.dumps({'v': LENS_MAP_CACHE_VERSION, 'geometry': geometry}, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+
+def offsets_to_coords(offsets: np.ndarray, y0: int) -> np.ndarray:
+    """第 y0 行起的偏移量行块 -> float32 源坐标 (rows, w, 3, 2)，最后一维为 (x, y)"""
+    rows, width = offsets.shape[:2]
+    coords = offsets.astype(np.float32)
+    coords[..., 0] += np.arange(width, dtype=np.float32)[None, :, None]
+    coords[..., 1] += np.arange(y0, y0 + rows, dtype=np.float32)[:, None, None]
+    return coords
+
+
+def coords_to_offsets(coords: np.ndarray, y0: int, out: np.ndarray):
+    """float32 源坐标行块 -> float16 偏移量 (写入 out)"""
+    rows, width = coords.shape[:2]
+    offsets = coords.copy()
+    offsets[..., 0] -= np.arange(width, dtype=np.float32)[None, :, None]
+    offsets[..., 1] -= np.arange(y0, y0 + rows, dtype=np.float32)[:, None, None]
+    out[...] = offsets
+
+
+def _write_map(path: str, lens_map: np.ndarray):
+    """
+    写入 .npz: float16 偏移量以差分 + zlib 1 级压缩 (np.savez_compressed 的默认级别对 24MP 映射要十余秒)，
+    网格直接压缩存储
+    """
+    if lens_map.dtype != np.float16:
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, grid=lens_map)
+        return
+    dx = np.diff(lens_map.view(np.int16), axis=1, prepend=np.int16(0))
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        with zf.open('offsets_dx.npy', 'w', force_zip64=True) as f:
+            np.lib.format.write_array(f, dx)
+
+
+def _read_map(path: str) -> np.ndarray:
+    with np.load(path) as data:
+        if 'grid' in data:
+            return data['grid']
+        dx = data['offsets_dx']
+    # int16 累加按位回绕，与写入时的差分互逆
+    return np.cumsum(dx, axis=1, dtype=np.int16).view(np.float16)
+
+
+def _evict_memory(max_bytes: int):
+    total = sum(entry.nbytes for entry in _memory_cache.values())
+    while _memory_cache and total > max_bytes:
+        _, entry = _memory_cache.popitem(last=False)
+        total -= entry.nbytes
+
+
+def _evict_disk(cache_dir: str, max_bytes: int):
+    """按 LRU 顺序 (修改时间) 删除磁盘条目，直到总大小不超过上限"""
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.npz'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def get_lens_map(
+    key: str,
+    compute: Callable[[], np.ndarray],
+    memory_bytes: int,
+    cache_dir: Optional[str] = None,
+    disk_bytes: int = 0,
+    logger: callable = print,
+    label: str = "Coordinate map",
+) -> np.ndarray:
+    """
+    读取坐标映射: 进程内 LRU -> 磁盘 (cache_dir) -> compute() 计算 (并写回缓存)
+
+    Args:
+        key: make_lens_map_key 生成的缓存键
+        compute: 计算映射的函数 (整幅 float16 偏移量或 float32 网格)
+        memory_bytes: 进程内缓存容量上限 (字节，超出后淘汰最久未使用的映射)
+        cache_dir: 磁盘缓存目录 (None=不使用磁盘缓存)
+        disk_bytes: 磁盘缓存容量上限 (字节)
+        label: 日志中的条目名称
+
+    Returns:
+        np.ndarray: 映射数组，在多次调用间共享，调用方不应修改
+    """
+    lens_map = _memory_cache.get(key)
+    if lens_map is not None:
+        _memory_cache.move_to_end(key)
+        logger(f"  ♻️ [Lensfun] {label} cache hit (memory)")
+        return lens_map
+
+    path = os.path.join(cache_dir, f"{key}.npz") if cache_dir else None
+    if path is not None:
+        try:
+            lens_map = _read_map(path)
+            # 刷新 LRU 时间戳
+            os.utime(path)
+            logger(f"  ♻️ [Lensfun] {label} cache hit (disk)")
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            lens_map = None
+
+    if lens_map is None:
+        lens_map = compute()
+        if path is not None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                # 先写临时文件再原子重命名，避免并行的工作进程读到半截文件
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                _write_map(tmp_path, lens_map)
+                os.replace(tmp_path, path)
+                _evict_disk(cache_dir, disk_bytes)
+            except OSError as e:
+                logger(f"  ⚠️ [Lensfun] Failed to store {label.lower()}: {e}")
+
+    if lens_map.nbytes <= memory_bytes:
+        _memory_cache[key] = lens_map
+        _evict_memory(memory_bytes)
+    return lens_map
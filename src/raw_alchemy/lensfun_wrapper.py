@@ -5,10 +5,26 @@ Lensfun库的Python包装器
 
 import ctypes
 import numpy as np
-from typing import Optional
+from typing import Optional, Tuple
 import platform
 import os
 import sys
+import json
+import hashlib
+import queue
+import concurrent.futures
+import xml.etree.ElementTree as ET
+
+from raw_alchemy import config
+from raw_alchemy.half_float import storage_view
+from raw_alchemy.vignetting import PROFILE_VERSION, apply_vignetting_gain, profile_center, radial_profile
+from raw_alchemy.remap import grid_shape, grid_to_coords, interpolation_index, remap_rgb, remap_rgb_grid
+from raw_alchemy.lens_map_cache import (
+    coords_to_offsets,
+    get_lens_map,
+    make_lens_map_key,
+    offsets_to_coords,
+)
 
 def _get_base_path():
     """
@@ -256,22 +272,42 @@ if _lensfun:
 # Python包装类
 # ============================================================================
 
+def _local_db_path() -> str:
+    """随程序分发的 Lensfun XML 数据库目录"""
+    return os.path.join(_get_base_path(), "vendor", "lensfun", "share", "lensfun", "version_2")
+
+
 class LensfunDatabase:
-    """Lensfun数据库包装器"""
+    """Lensfun数据库包装器
+
+    xml_files 不为 None 时只加载这些 XML 文件 (见 get_lens_database 的索引)，否则加载整个数据库。
+    相机 / 镜头查询结果按 (厂商, 型号) 缓存在实例上。
+    """
     
-    def __init__(self, custom_db_path: Optional[str] = None, logger: callable = print):
+    def __init__(self, custom_db_path: Optional[str] = None, logger: callable = print,
+                 xml_files: Optional[list] = None):
         if not _lensfun:
             raise RuntimeError("Lensfun library not loaded")
         self.db = _lensfun.lf_db_create()
         if not self.db:
             raise RuntimeError("Could not create lensfun database")
+        self.xml_files = xml_files
+        self._cameras = {}
+        self._lenses = {}
         
         # 检查本地数据库路径
-        base_path = _get_base_path()
-        db_path = os.path.join(base_path, "vendor", "lensfun", "share", "lensfun", "version_2")
+        db_path = _local_db_path()
         
         result = -1
-        if os.path.isdir(db_path):
+        if xml_files is not None:
+            logger(f"  ✨ [Lensfun] Loading {len(xml_files)} indexed database file(s) from: {db_path}")
+            for xml_file in xml_files:
+                with open(xml_file, 'rb') as f:
+                    xml_data = f.read()
+                result = _lensfun.lf_db_load_str(self.db, xml_data, len(xml_data))
+                if result != 0:
+                    break
+        elif os.path.isdir(db_path):
             logger(f"  ✨ [Lensfun] Found local database, loading from: {db_path}")
             result = _lensfun.lf_db_load_path(self.db, db_path.encode('utf-8'))
         else:
@@ -312,25 +348,196 @@ class LensfunDatabase:
             _lensfun.lf_db_destroy(self.db)
     
     def find_camera(self, maker: Optional[str], model: str) -> Optional[ctypes.POINTER(lfCamera)]:
-        """查找相机"""
+        """查找相机 (结果指向数据库内部对象，随数据库存活)"""
+        key = (maker, model)
+        if key in self._cameras:
+            return self._cameras[key]
+
         maker_b = maker.encode('utf-8') if maker else None
         model_b = model.encode('utf-8')
         
+        camera = None
         cameras = _lensfun.lf_db_find_cameras_ext(self.db, maker_b, model_b, 0)
-        if cameras and cameras[0]:
-            return cameras[0]
-        return None
+        if cameras:
+            if cameras[0]:
+                camera = cameras[0]
+            # 结果列表由 Lensfun 分配，列表中的相机对象属于数据库
+            _lensfun.lf_free(cameras)
+        self._cameras[key] = camera
+        return camera
     
     def find_lens(self, camera: Optional[ctypes.POINTER(lfCamera)], 
                   maker: Optional[str], model: str) -> Optional[ctypes.POINTER(lfLens)]:
-        """查找镜头"""
+        """查找镜头 (结果指向数据库内部对象，随数据库存活)"""
+        key = (ctypes.addressof(camera.contents) if camera else None, maker, model)
+        if key in self._lenses:
+            return self._lenses[key]
+
         maker_b = maker.encode('utf-8') if maker else None
         model_b = model.encode('utf-8')
         
+        lens = None
         lenses = _lensfun.lf_db_find_lenses(self.db, camera, maker_b, model_b, 0)
-        if lenses and lenses[0]:
-            return lenses[0]
+        if lenses:
+            if lenses[0]:
+                lens = lenses[0]
+            _lensfun.lf_free(lenses)
+        self._lenses[key] = lens
+        return lens
+
+
+# ============================================================================
+# 进程级数据库缓存与 XML 索引
+# ============================================================================
+
+# 索引格式版本，修改索引内容时递增
+LENS_INDEX_VERSION = 1
+
+# 进程内缓存: (自定义数据库, 加载的 XML 文件) -> LensfunDatabase
+_database_cache = {}
+
+# 进程内缓存: 索引文件路径 (含数据库签名) -> 索引
+_index_cache = {}
+
+
+def _normalize_name(name: Optional[str]) -> str:
+    """与 Lensfun 的厂商比较一致: 忽略大小写和多余空白"""
+    return ' '.join((name or '').split()).lower()
+
+
+def _file_signature(path: Optional[str]):
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return [path, stat.st_mtime_ns, stat.st_size]
+
+
+def build_lens_index(db_path: str) -> dict:
+    """
+    扫描 XML 数据库目录，记录每个文件中出现的相机厂商、镜头厂商以及是否定义卡口
+
+    Returns:
+        {'files': {文件名: {'camera_makers': [...], 'lens_makers': [...], 'mounts': bool}}}
+    """
+    files = {}
+    for name in sorted(os.listdir(db_path)):
+        if not name.endswith('.xml'):
+            continue
+        root = ET.parse(os.path.join(db_path, name)).getroot()
+        # 厂商名可能带多语言变体 (<maker lang="...">)，全部记录
+        camera_makers = {_normalize_name(m.text) for m in root.iterfind('camera/maker')}
+        lens_makers = {_normalize_name(m.text) for m in root.iterfind('lens/maker')}
+        files[name] = {
+            'camera_makers': sorted(camera_makers),
+            'lens_makers': sorted(lens_makers),
+            'mounts': root.find('mount') is not None,
+        }
+    return {'files': files}
+
+
+def _database_signature(db_path: str) -> list:
+    """XML 数据库目录中各文件的 (路径, 修改时间, 大小)；数据库更新后签名随之变化"""
+    if not os.path.isdir(db_path):
+        return []
+    names = sorted(name for name in os.listdir(db_path) if name.endswith('.xml'))
+    return [_file_signature(os.path.join(db_path, name)) for name in names]
+
+
+def load_lens_index(db_path: str, cache_dir: Optional[str] = None) -> Optional[dict]:
+    """
+    读取预建的 XML 索引 (不存在或数据库文件有变化时重新构建并写回磁盘)
+
+    索引按目录中各 XML 文件的名称、修改时间和大小生成签名，数据库更新后自动失效。
+
+    索引以 JSON 保存而不是二进制格式: Lensfun 只能从 XML 加载数据库 (lf_db_load_*)，
+    省下的是解析无关 XML 文件的时间；索引本身只记录每个文件的厂商名，只有几 KB，
+    每个进程读取一次后缓存在内存中 (读取耗时见 benchmarks/bench_lens_index.py)。
+    """
+    if not os.path.isdir(db_path):
+        return None
+    signature = json.dumps([LENS_INDEX_VERSION] + _database_signature(db_path))
+    key = hashlib.sha1(signature.encode('utf-8')).hexdigest()
+
+    if cache_dir is None:
+        from raw_alchemy.utils import get_cache_dir
+        cache_dir = get_cache_dir('lensfun')
+    index_path = os.path.join(cache_dir, f"index-{key}.json")
+    if index_path in _index_cache:
+        return _index_cache[index_path]
+
+    try:
+        with open(index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        _index_cache[index_path] = index
+        return index
+    except (OSError, ValueError):
+        pass
+
+    try:
+        index = build_lens_index(db_path)
+    except (OSError, ET.ParseError):
         return None
+    _index_cache[index_path] = index
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # 先写临时文件再原子重命名，避免并行的工作进程读到半截文件
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+    except OSError:
+        pass
+    return index
+
+
+def select_xml_files(index: dict, camera_maker: Optional[str], lens_maker: Optional[str]) -> Optional[list]:
+    """
+    选出查找该相机和镜头所需的 XML 文件名
+
+    Lensfun 给定厂商时只在同一厂商的条目中匹配，因此只需加载含该相机厂商、该镜头厂商
+    的文件，以及定义卡口 (兼容关系) 的文件。厂商未知或索引中找不到时返回 None (加载整个数据库)。
+    """
+    camera_maker, lens_maker = _normalize_name(camera_maker), _normalize_name(lens_maker)
+    if not camera_maker or not lens_maker:
+        return None
+    files = index['files']
+    if not any(camera_maker in info['camera_makers'] for info in files.values()):
+        return None
+    if not any(lens_maker in info['lens_makers'] for info in files.values()):
+        return None
+    return [
+        name for name, info in files.items()
+        if info['mounts'] or camera_maker in info['camera_makers'] or lens_maker in info['lens_makers']
+    ]
+
+
+def get_lens_database(
+    custom_db_path: Optional[str] = None,
+    camera_maker: Optional[str] = None,
+    lens_maker: Optional[str] = None,
+    logger: callable = print,
+    use_index: bool = True,
+) -> LensfunDatabase:
+    """
+    获取进程内共享的 Lensfun 数据库 (首次使用时加载)
+
+    本地 XML 数据库可用且 use_index 时只加载索引选出的文件 (见 select_xml_files)，
+    同一批次的同款相机/镜头共用一个数据库实例；否则加载整个数据库。
+    """
+    xml_files = None
+    db_path = _local_db_path()
+    if use_index:
+        index = load_lens_index(db_path)
+        names = select_xml_files(index, camera_maker, lens_maker) if index else None
+        if names is not None:
+            xml_files = [os.path.join(db_path, name) for name in names]
+
+    key = (json.dumps(_file_signature(custom_db_path)), tuple(xml_files) if xml_files is not None else None)
+    db = _database_cache.get(key)
+    if db is None:
+        db = LensfunDatabase(custom_db_path=custom_db_path, logger=logger, xml_files=xml_files)
+        _database_cache[key] = db
+    return db
 
 
 class LensfunModifier:
@@ -428,8 +635,275 @@ class LensfunModifier:
 # 便捷函数
 # ============================================================================
 
-def apply_lens_correction(
-    image: np.ndarray,
+# 向 Lensfun 请求坐标的行带高度: 行带在线程池中并行计算，同时在内存中的坐标不超过 (线程数 + 1) 个行带
+LENS_BAND_ROWS = 256
+
+
+class LensCorrector:
+    """
+    已配置好的镜头校正 (暗角 + 几何畸变/TCA)
+
+    暗角校正使用按镜头配置缓存的径向增益曲线 (vignetting 模块): 启用几何校正时在重映射核函数内
+    与重采样一起完成，否则由 apply_vignetting 原位相乘 (可同时乘上曝光增益)。
+    标定的光学中心偏离图像中心时没有可用的曲线，apply_vignetting 改为按行带逐像素调用 Lensfun。
+    几何校正按输出行带计算坐标并重映射，
+    整幅处理即 remap_rows(image, 0, height)。分块渲染时每个行带只分配
+    该行带的坐标和输出缓冲区，而不是整幅的 width*height*6 坐标。
+    重采样由 remap.remap_rgb 核函数完成 (interpolation: bilinear / bicubic / lanczos)。
+    图像可以是 float32 或 float16 (半精度存储)，输出与输入 dtype 相同。
+
+    grid_step > 0 时为稀疏网格模式: 只在每隔 grid_step 像素的网格点上向 Lensfun 请求坐标
+    (计算量约为稠密映射的 1/grid_step)，重映射核函数内插值出每个像素的坐标，
+    不再分配 width*height*6 的坐标数组。与稠密映射的最大误差见 grid_error()。
+
+    map_key 不为 None 时坐标映射经 lens_map_cache 缓存: 首次使用时计算整幅 float16 偏移量
+    (或网格)，之后相同镜头几何的图像直接从缓存中取用。map_key 为 None 的稠密模式按行带
+    向 Lensfun 请求 float32 坐标，不分配整幅映射。
+
+    Lensfun 不保证同一个 lfModifier 可被多个线程同时调用，并行计算坐标时每个线程从
+    modifier_factory 取得各自的修改器 (配置与 modifier 相同，用完放回复用)。
+    构造时先试算一个像素的坐标: Lensfun 无法计算时整幅跳过几何校正 (暗角仍由 apply_vignetting 完成)，
+    而不是在写出部分行带后才发现。
+    """
+
+    def __init__(self, db: LensfunDatabase, modifier: LensfunModifier, width: int, height: int,
+                 correct_distortion: bool, correct_tca: bool, correct_vignetting: bool,
+                 interpolation: str = 'bicubic', map_key: Optional[str] = None,
+                 map_cache_dir: Optional[str] = None, logger: callable = print, grid_step: int = 0,
+                 vignetting_key: Optional[str] = None, modifier_factory: Optional[callable] = None):
+        # 修改器引用数据库中的镜头对象，必须保持数据库存活
+        self.db = db
+        self.modifier = modifier
+        self.width = width
+        self.height = height
+        self.correct_geometry = correct_distortion or correct_tca
+        self.correct_vignetting = correct_vignetting
+        self.interpolation = interpolation
+        self._method = interpolation_index(interpolation)
+        self.map_key = map_key
+        self.map_cache_dir = map_cache_dir
+        self.logger = logger
+        self.grid_step = grid_step
+        self.threads = config.DEFAULT_LENS_THREADS or os.cpu_count() or 1
+        self.vignetting_key = vignetting_key
+        self._map = None
+        self._vignetting = None
+        self._center = profile_center(width, height)
+        # 坐标计算线程使用的修改器 (None=只在调用线程上用 modifier 串行计算)
+        self._modifier_factory = modifier_factory
+        self._spare_modifiers = queue.SimpleQueue()
+
+        if self.correct_geometry and modifier.apply_subpixel_geometry_distortion(0.0, 0.0, 1, 1) is None:
+            logger("  ⚠️ [Lensfun] Could not compute the coordinate map. Skipping geometry correction.")
+            self.correct_geometry = False
+
+    def _compute_vignetting(self) -> np.ndarray:
+        profile = radial_profile(self.modifier, self.width, self.height)
+        if profile is None:
+            raise RuntimeError("Lensfun could not compute the vignetting profile")
+        return profile
+
+    def _cached_vignetting(self) -> np.ndarray:
+        """径向增益曲线或空数组 (光学中心不在图像中心)，经 lens_map_cache 缓存"""
+        if self._vignetting is None:
+            if self.vignetting_key is None:
+                self._vignetting = self._compute_vignetting()
+            else:
+                self._vignetting = get_lens_map(
+                    self.vignetting_key, self._compute_vignetting,
+                    memory_bytes=int(config.DEFAULT_LENS_MAP_CACHE_MB * 1024**2),
+                    cache_dir=self.map_cache_dir,
+                    disk_bytes=int(config.DEFAULT_LENS_MAP_DISK_CACHE_GB * 1024**3),
+                    logger=self.logger, label="Vignetting profile",
+                )
+        return self._vignetting
+
+    def vignetting_profile(self) -> Optional[np.ndarray]:
+        """暗角径向增益曲线 (未启用暗角校正或需逐像素校正时为 None)"""
+        if not self.correct_vignetting:
+            return None
+        profile = self._cached_vignetting()
+        return profile if profile.size else None
+
+    def _apply_color_modification(self, image: np.ndarray):
+        """逐像素调用 Lensfun 做暗角校正 (原位，按行带；float16 行带先转为 float32)"""
+        for b0 in range(0, self.height, LENS_BAND_ROWS):
+            b1 = min(b0 + LENS_BAND_ROWS, self.height)
+            band = np.ascontiguousarray(image[b0:b1], dtype=np.float32)
+            if not self.modifier.apply_color_modification(band, 0.0, float(b0), self.width, b1 - b0):
+                raise RuntimeError("Lensfun could not apply the vignetting correction")
+            if not np.shares_memory(band, image):
+                image[b0:b1] = band
+
+    def apply_vignetting(self, image: np.ndarray, gain: float = 1.0) -> bool:
+        """
+        暗角校正 (原位修改 image；需在几何重映射之前对整幅源图像调用)
+
+        启用几何校正时暗角增益在 remap_rows 中与重采样一起相乘，这里不做任何事；
+        否则一次遍历原位乘上暗角增益和曝光增益 gain。
+        光学中心不在图像中心时 (没有径向增益曲线)，无论是否启用几何校正都在这里逐像素调用 Lensfun，
+        曝光增益留给调用方。
+
+        Returns:
+            bool: gain 是否已乘入 image (为 True 时调用方不应再应用曝光增益)
+        """
+        if not self.correct_vignetting:
+            return False
+        profile = self.vignetting_profile()
+        if profile is None:
+            self.logger("  ⚠️ [Lensfun] Optical centre is off the image centre, applying vignetting per pixel.")
+            self._apply_color_modification(image)
+            return False
+        if self.correct_geometry:
+            return False
+        cx, cy = self._center
+        apply_vignetting_gain(storage_view(image), profile, cx, cy, float(gain))
+        return True
+
+    def _coordinate_bands(self, y0: int, y1: int):
+        """
+        按 LENS_BAND_ROWS 行带计算第 [y0, y1) 行的坐标，按行顺序产出 (band_y0, band_y1, coords)
+
+        Lensfun 调用 (ctypes 调用期间释放 GIL) 在线程池中并行执行，每个调用独占一个修改器；
+        调用方同时处理已完成的行带 (重映射核函数仍在调用线程上运行，Numba 的 workqueue 线程层
+        不支持多个线程同时调用并行核函数)。最多 threads + 1 个行带的坐标同时在内存中。
+
+        Raises:
+            RuntimeError: Lensfun 无法计算某个行带的坐标
+        """
+        bands = [(b0, min(b0 + LENS_BAND_ROWS, y1)) for b0 in range(y0, y1, LENS_BAND_ROWS)]
+
+        def compute(modifier, b0, b1):
+            coords = modifier.apply_subpixel_geometry_distortion(0.0, float(b0), self.width, b1 - b0)
+            if coords is None:
+                raise RuntimeError(f"Lensfun could not compute the coordinates of rows {b0}-{b1}")
+            return coords
+
+        if self.threads <= 1 or len(bands) <= 1 or self._modifier_factory is None:
+            for b0, b1 in bands:
+                yield b0, b1, compute(self.modifier, b0, b1)
+            return
+
+        def compute_band(band):
+            try:
+                modifier = self._spare_modifiers.get_nowait()
+            except queue.Empty:
+                modifier = self._modifier_factory()
+            try:
+                return compute(modifier, *band)
+            finally:
+                self._spare_modifiers.put(modifier)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.threads) as executor:
+            pending = iter(bands)
+            futures = []
+            for band in pending:
+                futures.append((band, executor.submit(compute_band, band)))
+                if len(futures) > self.threads:
+                    break
+            while futures:
+                (b0, b1), future = futures.pop(0)
+                coords = future.result()
+                band = next(pending, None)
+                if band is not None:
+                    futures.append((band, executor.submit(compute_band, band)))
+                yield b0, b1, coords
+
+    def _compute_offsets(self) -> np.ndarray:
+        """按行带向 Lensfun 请求坐标 (并行)，转换为整幅 float16 偏移量"""
+        offsets = np.empty((self.height, self.width, 3, 2), dtype=np.float16)
+        for y0, y1, coords in self._coordinate_bands(0, self.height):
+            coords_to_offsets(coords, y0, offsets[y0:y1])
+        return offsets
+
+    def _compute_grid(self) -> np.ndarray:
+        """
+        网格点坐标 (gh, gw, 3, 2)：每个网格行向 Lensfun 请求一行坐标并每隔 grid_step 取一个点
+        (末端网格点可超出图像，Lensfun 照常计算)
+        """
+        step = self.grid_step
+        gw, gh = grid_shape(self.width, self.height, step)
+        grid = np.empty((gh, gw, 3, 2), dtype=np.float32)
+        for gy in range(gh):
+            coords = self.modifier.apply_subpixel_geometry_distortion(0.0, float(gy * step), (gw - 1) * step + 1, 1)
+            if coords is None:
+                raise RuntimeError("Lensfun could not compute the coordinate grid")
+            grid[gy] = coords[0, ::step]
+        return grid
+
+    def _lens_map(self) -> np.ndarray:
+        """坐标映射 (稠密 float16 偏移量或网格)，经 lens_map_cache 缓存"""
+        if self._map is None:
+            compute = self._compute_grid if self.grid_step > 0 else self._compute_offsets
+            if self.map_key is None:
+                self._map = compute()
+            else:
+                self._map = get_lens_map(
+                    self.map_key, compute,
+                    memory_bytes=int(config.DEFAULT_LENS_MAP_CACHE_MB * 1024**2),
+                    cache_dir=self.map_cache_dir,
+                    disk_bytes=int(config.DEFAULT_LENS_MAP_DISK_CACHE_GB * 1024**3),
+                    logger=self.logger,
+                )
+        return self._map
+
+    def grid_error(self) -> float:
+        """
+        稀疏网格插值出的坐标与 Lensfun 稠密坐标的最大误差 (像素，所有通道和 x/y 中的最大值)
+
+        按行带计算稠密坐标，只用于评估网格间距 (与一次稠密计算的代价相同)。
+        """
+        grid = self._lens_map()
+        max_error = 0.0
+        for y0, y1, dense in self._coordinate_bands(0, self.height):
+            interpolated = grid_to_coords(grid, self.grid_step, y0, y1 - y0, self.width)
+            max_error = max(max_error, float(np.nanmax(np.abs(interpolated - dense))))
+        return max_error
+
+    def remap_rows(self, image: np.ndarray, y0: int, y1: int) -> np.ndarray:
+        """
+        计算校正后图像的第 [y0, y1) 行
+
+        核函数直接从整幅源图像 (float32 或 float16) 中读取坐标所需的像素，不复制源行带。
+        逐像素坐标按 LENS_BAND_ROWS 行带生成 (线程池并行调用 Lensfun) 并逐个行带重映射，
+        坐标缓冲区只有几个行带大小。启用暗角校正时增益在核函数内与重采样一起相乘。
+
+        Returns:
+            np.ndarray: (y1 - y0, width, 3)，dtype 同 image；未启用几何校正时为 image[y0:y1] 视图
+
+        Raises:
+            RuntimeError: Lensfun 无法计算坐标 (构造时的试算已通过，不应发生；
+                          抛出而不是返回未校正的行带，避免同一幅图像中混有校正和未校正的行带)
+        """
+        if not self.correct_geometry:
+            return image[y0:y1]
+
+        output = np.empty((y1 - y0, self.width, 3), dtype=image.dtype)
+        vignette = self.vignetting_profile()
+        cx, cy = self._center
+        if self.grid_step > 0:
+            remap_rgb_grid(storage_view(image), self._lens_map(), self.grid_step, y0,
+                           storage_view(output), self._method, vignette, cx, cy)
+            return output
+
+        source = storage_view(image)
+        if self.map_key is not None:
+            # 缓存的整幅偏移量: 按行带还原坐标，避免一次分配 (rows, width, 3, 2) 的 float32 坐标
+            lens_map = self._lens_map()
+            for b0 in range(y0, y1, LENS_BAND_ROWS):
+                b1 = min(b0 + LENS_BAND_ROWS, y1)
+                coords = offsets_to_coords(lens_map[b0:b1], b0)
+                remap_rgb(source, coords, storage_view(output[b0 - y0:b1 - y0]), self._method, vignette, cx, cy)
+            return output
+
+        for b0, b1, coords in self._coordinate_bands(y0, y1):
+            remap_rgb(source, coords, storage_view(output[b0 - y0:b1 - y0]), self._method, vignette, cx, cy)
+        return output
+
+
+def create_lens_corrector(
+    width: int,
+    height: int,
     camera_maker: Optional[str],
     camera_model: str,
     lens_maker: Optional[str],
@@ -443,48 +917,33 @@ def apply_lens_correction(
     distance: float = 1000.0,
     custom_db_path: Optional[str] = None,
     logger: callable = print,
-) -> np.ndarray:
-    """应用镜头校正到图像
-    
-    参数:
-        image: 输入图像，shape为 (height, width, 3)，范围0-1
-        camera_maker: 相机制造商
-        camera_model: 相机型号
-        lens_maker: 镜头制造商
-        lens_model: 镜头型号
-        focal_length: 焦距 (mm)
-        aperture: 光圈值 (f-number)
-        crop_factor: 裁剪系数，如果为None则从相机信息获取
-        correct_distortion: 是否校正畸变
-        correct_tca: 是否校正横向色差
-        correct_vignetting: 是否校正暗角
-        distance: 对焦距离 (米)
-    
+    interpolation: str = 'bicubic',
+    lens_map_cache_dir: Optional[str] = None,
+    grid_step: int = 0,
+) -> Optional[LensCorrector]:
+    """查找相机和镜头并配置校正 (参数见 apply_lens_correction)
+
     返回:
-        校正后的图像（与输入相同dtype）
+        LensCorrector；Lensfun 未加载或未找到镜头时返回 None
     """
     if not _lensfun:
         logger("  ⚠️ [Lensfun] Library not loaded. Skipping lens correction.")
-        return image
-    
-    # 记住原始dtype以便最后转换回去
-    original_dtype = image.dtype
-    
-    # 转换为float32（如果不是的话）
-    if image.dtype != np.float32:
-        image = image.astype(np.float32)
-    
-    height, width = image.shape[:2]
-    
-    # 创建数据库并查找相机和镜头
-    db = LensfunDatabase(custom_db_path=custom_db_path, logger=logger)
+        return None
+
+    # 使用进程内共享的数据库查找相机和镜头 (相机和镜头对象属于数据库，数据库缓存在进程内)
+    db = get_lens_database(custom_db_path, camera_maker, lens_maker, logger=logger)
     camera = db.find_camera(camera_maker, camera_model)
     lens = db.find_lens(camera, lens_maker, lens_model)
-    
+    if not lens and db.xml_files is not None:
+        # 索引子集中未找到 (例如镜头仅通过卡口兼容)，回退到完整数据库
+        db = get_lens_database(custom_db_path, logger=logger, use_index=False)
+        camera = db.find_camera(camera_maker, camera_model)
+        lens = db.find_lens(camera, lens_maker, lens_model)
+
     if not lens:
         logger(f"  ⚠️ [Lensfun] Lens not found: {lens_maker} {lens_model}. Skipping correction.")
-        return image
-    
+        return None
+
     # 确定裁剪系数
     if crop_factor is None:
         if camera:
@@ -493,63 +952,147 @@ def apply_lens_correction(
             crop_factor = 1.0
         else:
             crop_factor = 1.0
-    
+
     # 创建修改器
     modifier = LensfunModifier(lens, focal_length, crop_factor, width, height, LF_PF_F32)
-    
+
     # 启用所需的校正并应用自动缩放
+    scale = 1.0
     if correct_distortion:
         modifier.enable_distortion_correction()
         # 获取并应用自动缩放以消除黑边
         auto_scale = modifier.get_auto_scale()
-        if auto_scale < 1.0:
-            modifier.enable_scaling(1.0/auto_scale)
-        else:
-            modifier.enable_scaling(auto_scale)
+        scale = 1.0 / auto_scale if auto_scale < 1.0 else auto_scale
+        modifier.enable_scaling(scale)
         logger(f"  ⚖️ [Lensfun] Auto-scaling enabled with factor: {auto_scale:.4f}")
 
     if correct_tca:
         modifier.enable_tca_correction()
-    
+
+    def geometry_modifier() -> LensfunModifier:
+        """与 modifier 几何配置相同的新修改器 (坐标计算线程各用一个)"""
+        clone = LensfunModifier(lens, focal_length, crop_factor, width, height, LF_PF_F32)
+        if correct_distortion:
+            clone.enable_distortion_correction()
+            clone.enable_scaling(scale)
+        if correct_tca:
+            clone.enable_tca_correction()
+        return clone
+
     if correct_vignetting:
         modifier.enable_vignetting_correction(aperture, distance)
+
+    use_cache = config.DEFAULT_LENS_MAP_CACHE_MB > 0 or bool(lens_map_cache_dir)
+    lens_config = {
+        'camera': [camera_maker, camera_model],
+        'lens': [lens_maker, lens_model],
+        'focal_length': float(focal_length),
+        'crop_factor': float(crop_factor),
+        'size': [width, height],
+        'database': [_database_signature(_local_db_path()), _file_signature(custom_db_path)],
+    }
+
+    # 坐标映射缓存键: 映射只取决于镜头几何 (与光圈、对焦距离无关)。
+    # 稀疏网格只有几 MB 且不量化，总是缓存；稠密映射为整幅 float16 偏移量 (12 字节/像素，坐标随之量化)，
+    # 只在指定磁盘缓存时使用，否则按行带计算 float32 坐标，内存只有几个行带
+    map_key = None
+    cache_map = use_cache if grid_step > 0 else bool(lens_map_cache_dir)
+    if (correct_distortion or correct_tca) and cache_map:
+        map_key = make_lens_map_key({
+            **lens_config,
+            'distortion': bool(correct_distortion),
+            'tca': bool(correct_tca),
+            'grid_step': int(grid_step),
+        })
+
+    # 暗角增益曲线缓存键: 还取决于光圈和对焦距离
+    vignetting_key = None
+    if correct_vignetting and use_cache:
+        vignetting_key = make_lens_map_key({
+            **lens_config,
+            'vignetting': [float(aperture), float(distance)],
+            'profile_version': PROFILE_VERSION,
+        })
+
+    return LensCorrector(db, modifier, width, height, correct_distortion, correct_tca,
+                         correct_vignetting, interpolation, map_key=map_key,
+                         map_cache_dir=lens_map_cache_dir, logger=logger, grid_step=grid_step,
+                         vignetting_key=vignetting_key, modifier_factory=geometry_modifier)
+
+
+def apply_lens_correction(
+    image: np.ndarray,
+    camera_maker: Optional[str],
+    camera_model: str,
+    lens_maker: Optional[str],
+    lens_model: str,
+    focal_length: float,
+    aperture: float,
+    crop_factor: Optional[float] = None,
+    correct_distortion: bool = True,
+    correct_tca: bool = True,
+    correct_vignetting: bool = True,
+    distance: float = 1000.0,
+    custom_db_path: Optional[str] = None,
+    logger: callable = print,
+    interpolation: str = 'bicubic',
+    lens_map_cache_dir: Optional[str] = None,
+    grid_step: int = 0,
+    gain: float = 1.0,
+) -> Tuple[np.ndarray, float]:
+    """应用镜头校正到图像
+    
+    参数:
+        image: 输入图像，shape为 (height, width, 3)，范围0-1 (float16 按半精度存储直接处理)
+        camera_maker: 相机制造商
+        camera_model: 相机型号
+        lens_maker: 镜头制造商
+        lens_model: 镜头型号
+        focal_length: 焦距 (mm)
+        aperture: 光圈值 (f-number)
+        crop_factor: 裁剪系数，如果为None则从相机信息获取
+        correct_distortion: 是否校正畸变
+        correct_tca: 是否校正横向色差
+        correct_vignetting: 是否校正暗角
+        distance: 对焦距离 (米)
+        interpolation: 重采样插值方式 (bilinear / bicubic / lanczos，见 remap 模块)
+        lens_map_cache_dir: 坐标映射的磁盘缓存目录 (None=稠密坐标不缓存，按行带计算；网格只在进程内缓存)
+        grid_step: >0 时只在每隔 grid_step 像素的网格点上计算坐标，重映射时插值 (0=逐像素)
+        gain: 尚未应用的曝光增益；只校正暗角时与暗角增益在同一次遍历中相乘
     
-    # 创建输出图像
-    output = np.zeros_like(image)
+    返回:
+        (校正后的图像（与输入相同dtype）, 仍需由调用方应用的曝光增益 (已乘入时为 1.0))
+    """
+    # 记住原始dtype以便最后转换回去
+    original_dtype = image.dtype
     
-    # 步骤1: 应用颜色修改（暗角）
-    # 这是原位操作，会直接修改 image 数组。
-    # 后续的几何校正会从这个修改后的 image 中读取数据，所以这是期望的行为。
-    if correct_vignetting:
-        modifier.apply_color_modification(image, 0.0, 0.0, width, height)
+    # 转换为float32（如果不是的话；float16 由 LensCorrector 按块处理，无需整幅转换）
+    if image.dtype not in (np.float32, np.float16):
+        image = image.astype(np.float32)
     
+    height, width = image.shape[:2]
+
+    corrector = create_lens_corrector(
+        width, height, camera_maker, camera_model, lens_maker, lens_model, focal_length, aperture,
+        crop_factor=crop_factor, correct_distortion=correct_distortion, correct_tca=correct_tca,
+        correct_vignetting=correct_vignetting, distance=distance, custom_db_path=custom_db_path,
+        logger=logger, interpolation=interpolation, lens_map_cache_dir=lens_map_cache_dir,
+        grid_step=grid_step,
+    )
+    if corrector is None:
+        return image, gain
+
+    # 步骤1: 应用颜色修改（暗角）
+    # 未启用几何校正时为原位操作，会直接修改 image 数组，同时乘上曝光增益；
+    # 启用几何校正时暗角增益在步骤2的重映射核函数内相乘，不需要额外遍历。
+    if corrector.apply_vignetting(image, gain):
+        gain = 1.0
+
     # 步骤2: 应用几何畸变和TCA校正
-    if correct_distortion or correct_tca:
-        coords = modifier.apply_subpixel_geometry_distortion(0.0, 0.0, width, height)
-        
-        if coords is not None:
-            # 使用scipy的map_coordinates进行插值
-            from scipy.ndimage import map_coordinates
-            
-            for c in range(3):  # R, G, B
-                coords_c = coords[:, :, c, :]
-                coordinates = np.array([coords_c[:, :, 1], coords_c[:, :, 0]])
-                
-                output[:, :, c] = map_coordinates(
-                    image[:, :, c],
-                    coordinates,
-                    order=3,
-                    mode='constant',
-                    cval=0.0
-                )
-        else:
-            output = image
-    else:
-        output = image
+    output = corrector.remap_rows(image, 0, height)
     
     # 转换回原始dtype
     if output.dtype != original_dtype:
         output = output.astype(original_dtype)
     
-    return output
-
+    return output, gain
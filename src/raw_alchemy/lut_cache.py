@@ -0,0 +1,171 @@
+"""
+LUT 读取缓存模块
+colour.read_LUT 每次都要重新解析 .cube 文本 (65³ 的 cube 约 27 万行)。
+这里按 "路径 + 修改时间 + 文件大小" 在进程内缓存解析结果，并把 float32 表格和定义域
+写入磁盘 sidecar (.npz)，之后其他工作进程和预览刷新读取二进制文件即可，无需重新解析。
+sidecar 目录总大小超过 config.DEFAULT_LUT_CACHE_SIZE_MB 时按最近使用时间淘汰
+(LUT 文件修改后旧的 sidecar 不再命中，也由淘汰清理)。
+
+批处理时主进程还可以把编译好的查表链发布为只读共享表格 (share_lut)，
+工作进程零拷贝挂载 (attach_shared_lut)，既不必各自读取和打包，也不必各持一份表格。
+"""
+import os
+import hashlib
+import numpy as np
+import colour
+from typing import Optional
+
+from raw_alchemy import config, utils
+from raw_alchemy.luts import LUTChain, compile_lut, lut_content_hash
+from raw_alchemy.shared_tables import SharedTables, attach_tables
+
+# sidecar 格式版本，修改存储方式时递增，使旧缓存自动失效
+LUT_CACHE_VERSION = 1
+
+# 可写入 sidecar 的 LUT 类型 (其他算子，如 CLF 中的矩阵，只在进程内缓存)
+_LUT_TYPES = {'LUT1D': colour.LUT1D, 'LUT3x1D': colour.LUT3x1D, 'LUT3D': colour.LUT3D}
+
+# 进程内缓存: 绝对路径 -> (修改时间 ns, 文件大小, LUT)
+_memory_cache = {}
+
+
+def _sidecar_key(path: str, stat: os.stat_result) -> str:
+    payload = f"{LUT_CACHE_VERSION}|{path}|{stat.st_mtime_ns}|{stat.st_size}"
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _to_float32(lut):
+    """表格统一为 float32 (首次解析与读取 sidecar 得到完全相同的 LUT)"""
+    if isinstance(lut, colour.LUTSequence):
+        return colour.LUTSequence(*[_to_float32(op) for op in lut])
+    if type(lut).__name__ in _LUT_TYPES:
+        return type(lut)(np.asarray(lut.table, dtype=np.float32), lut.name, np.asarray(lut.domain, dtype=np.float32))
+    return lut
+
+
+def _sidecar_arrays(lut) -> Optional[dict]:
+    """LUT -> np.savez 的数组字典；含无法存储的算子时返回 None"""
+    is_sequence = isinstance(lut, colour.LUTSequence)
+    operators = list(lut) if is_sequence else [lut]
+    arrays = {'sequence': np.array(is_sequence)}
+    for i, op in enumerate(operators):
+        kind = type(op).__name__
+        if kind not in _LUT_TYPES:
+            return None
+        arrays[f'kind_{i}'] = np.array(kind)
+        arrays[f'name_{i}'] = np.array(op.name)
+        arrays[f'table_{i}'] = op.table
+        arrays[f'domain_{i}'] = op.domain
+    return arrays
+
+
+def _from_sidecar(data) -> object:
+    operators = []
+    i = 0
+    while f'kind_{i}' in data:
+        lut_type = _LUT_TYPES[str(data[f'kind_{i}'])]
+        operators.append(lut_type(data[f'table_{i}'], str(data[f'name_{i}']), data[f'domain_{i}']))
+        i += 1
+    if bool(data['sequence']):
+        return colour.LUTSequence(*operators)
+    return operators[0]
+
+
+def _evict_disk(cache_dir: str, max_bytes: int):
+    """按 LRU 顺序 (修改时间) 删除 sidecar，直到总大小不超过上限"""
+    entries = []
+    total = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith('.npz'):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+        total += st.st_size
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+def load_lut(lut_path: str, cache_dir: Optional[str] = None, logger=None):
+    """
+    读取 LUT 文件: 进程内缓存 -> 磁盘 sidecar -> colour.read_LUT 解析 (并写回 sidecar)
+
+    返回的 LUT 对象在多次调用间共享，调用方不应修改。
+
+    Args:
+        lut_path: LUT 文件路径
+        cache_dir: sidecar 目录 (None=默认缓存目录下的 luts 子目录)
+        logger: 日志处理器
+    """
+    path = os.path.abspath(lut_path)
+    stat = os.stat(path)
+
+    cached = _memory_cache.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    if cache_dir is None:
+        cache_dir = utils.get_cache_dir('luts')
+    sidecar = os.path.join(cache_dir, f"{_sidecar_key(path, stat)}.npz")
+
+    try:
+        with np.load(sidecar) as data:
+            lut = _from_sidecar(data)
+    except (OSError, ValueError, KeyError):
+        lut = None
+    else:
+        try:
+            os.utime(sidecar)  # 刷新 LRU 时间戳
+        except OSError:
+            pass
+
+    if lut is None:
+        lut = _to_float32(colour.read_LUT(path))
+        arrays = _sidecar_arrays(lut)
+        if arrays is not None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                # 先写临时文件再原子重命名，避免并行的工作进程读到半截文件
+                tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, **arrays)
+                os.replace(tmp_path, sidecar)
+                _evict_disk(cache_dir, int(config.DEFAULT_LUT_CACHE_SIZE_MB * 1024**2))
+            except OSError as e:
+                if logger:
+                    logger.warning(f"  ⚠️  [LUT] Failed to store parsed LUT: {e}")
+
+    _memory_cache[path] = (stat.st_mtime_ns, stat.st_size, lut)
+    return lut
+
+
+def share_lut(lut_path: str, logger=None) -> Optional[SharedTables]:
+    """
+    读取并编译 LUT，把查表链的表格发布给工作进程 (主进程调用，用完后 close)
+
+    Returns:
+        SharedTables (descriptor 传给 attach_shared_lut)；LUT 无法整理为查表链时返回 None，
+        由各工作进程自行读取
+    """
+    lut = load_lut(lut_path, logger=logger)
+    chain = compile_lut(lut)
+    if chain is None:
+        return None
+    return SharedTables(chain.to_arrays(), meta={'content_hash': lut_content_hash(lut)})
+
+
+def attach_shared_lut(descriptor: dict) -> LUTChain:
+    """挂载主进程发布的查表链 (只读视图，不复制表格)"""
+    arrays, meta = attach_tables(descriptor)
+    return LUTChain.from_arrays(arrays, content_hash=meta['content_hash'])
@@ -0,0 +1,545 @@
+"""
+创意 LUT 模块
+colour.read_LUT 可能返回 LUT1D、LUT3x1D、LUT3D 或 LUTSequence (厂商胶片模拟常见的 1D shaper + 3D cube)。
+这里把它们统一整理为 "前置 1D -> 3D -> 后置 1D" 的查表链，由 float32 原位 Numba 核函数单次遍历完成。
+不符合该形式的序列逐个 LUT 应用，只有非均匀定义域 (显式 domain) 的 LUT 回退到 colour 的实现。
+
+3D 表格支持多种存储格式 (见 CUBE_FORMATS)，大尺寸 cube 用更紧凑的格式减少缓存未命中。
+"""
+import numpy as np
+import colour
+from numba import njit, prange, types
+from numba.extending import overload
+
+from raw_alchemy.half_float import half_bits_to_float32
+from raw_alchemy.decode_cache import hash_bytes
+
+# 1D LUT 类型 (LUT1D 的单通道表格会扩展为 3 通道)
+LUT_1D_TYPES = (colour.LUT1D, colour.LUT3x1D)
+
+# 3D 表格存储格式:
+#   'rgb32'   (n,n,n,3) float32，每项 12 字节 (colour 原始布局)
+#   'rgba32'  (n,n,n,4) float32，补齐到 16 字节，每个格点不跨缓存行
+#   'rgba16u' (n,n,n,4) uint16 量化码值，插值后按通道缩放/偏移还原 (误差 <= 码值范围 / 131070)
+#   'rgba16f' (n,n,n,4) float16 (以 int16 位模式视图传入核函数)，逐格点查表解码
+CUBE_FORMATS = ('rgb32', 'rgba32', 'rgba16u', 'rgba16f')
+
+# 自动选择: rgb32 表格不超过该字节数时保持 rgb32，更大的 cube 用 uint16 量化表格
+# (65³ 为 3.3 MB，129³ 为 25.8 MB；各尺寸的测量见 benchmarks/bench_luts.py --formats)
+CUBE_FORMAT_RGB32_MAX_BYTES = 16 * 1024**2
+
+# 最近编译的查表链: (id(lut), cube_format) -> (lut, LUTChain)。
+# 持有 lut 引用保证 id 不被复用；lut_cache 对同一文件返回同一对象，因此整批图像和分块渲染的各行带共用一次编译
+_CHAIN_CACHE_SIZE = 4
+_chain_cache = {}
+
+
+def select_cube_format(size: int) -> str:
+    """按 cube 尺寸自动选择存储格式"""
+    return 'rgb32' if size ** 3 * 12 <= CUBE_FORMAT_RGB32_MAX_BYTES else 'rgba16u'
+
+# =========================================================
+# Numba 加速核函数 (In-Place / 无内存分配)
+# =========================================================
+
+def _cube_entry(value):
+    """读取 3D 表格的一个分量 (Numba 内使用，见 overload)"""
+    raise NotImplementedError
+
+
+@overload(_cube_entry, inline='always')
+def _cube_entry_impl(value):
+    # 按表格 dtype 编译期分派: float32 原值，uint16 量化码值 (插值后再还原)，int16 为 float16 位模式
+    if isinstance(value, types.Integer) and value.signed:
+        return lambda value: half_bits_to_float32(np.uint16(value))
+    return lambda value: np.float32(value)
+
+
+@njit(inline='always', fastmath=True, cache=True)
+def _tetrahedral_sample(lut_table, idx_r, idx_g, idx_b):
+    """
+    单点四面体插值 (Tetrahedral Interpolation)，供各 LUT 核函数内联调用
+
+    idx_* 为已钳位到 [0, size-1] 的 LUT 浮点坐标。
+    lut_table 的最后一维可为 3 或 4 (RGBA 补齐，第 4 分量不读取)，dtype 见 CUBE_FORMATS；
+    uint16 量化表格返回插值后的码值，由调用方还原。
+
+    优势:
+    1. 内存访问减少 50% (只读 4 个点，而不是 8 个)
+    2. 色彩精度更高，特别是对于灰阶和肤色
+    3. 使用了显式的 6 种情况分支，编译器通常能将其优化为高效的跳转表
+    """
+    size_minus_1 = lut_table.shape[0] - 1
+
+    # --- A. 计算整数坐标 (x0) 和 小数部分 (d) ---
+    x0 = int(idx_r)
+    y0 = int(idx_g)
+    z0 = int(idx_b)
+
+    # 边界保护：确保 x1 不会越界
+    # 注意：如果 x0 已经是 size_minus_1，x1 应该保持 size_minus_1
+    x1 = x0 + 1
+    if x0 == size_minus_1: x1 = x0
+
+    y1 = y0 + 1
+    if y0 == size_minus_1: y1 = y0
+
+    z1 = z0 + 1
+    if z0 == size_minus_1: z1 = z0
+
+    # 计算权重 (Delta)
+    dx = idx_r - x0
+    dy = idx_g - y0
+    dz = idx_b - z0
+
+    # --- B. 四面体判定逻辑 (Tetrahedral Logic) ---
+    # 我们需要找到包围该点的 4 个顶点。
+    # P0 (x0, y0, z0) 和 P3 (x1, y1, z1) 总是存在的。
+    # 剩下的 P1 和 P2 取决于 dx, dy, dz 的大小关系。
+
+    # 定义临时变量用于存储插值结果
+    r_val = 0.0
+    g_val = 0.0
+    b_val = 0.0
+
+    # 读取基础点 P0 (Base) 和 对角点 P3 (Opposite)
+    # 这样写虽然代码长，但比用数组存储 P1, P2 更快，因为直接操作寄存器
+
+    # 优化技巧：我们在 if 分支里直接读取 LUT 并计算，避免不必要的内存读取
+
+    if dx >= dy:
+        if dy >= dz:
+            # Case 1: dx >= dy >= dz
+            # P1=(1,0,0), P2=(1,1,0)
+            # Weights: (1-dx), (dx-dy), (dy-dz), dz
+            
+            # P0
+            w0 = 1.0 - dx
+            c_r = _cube_entry(lut_table[x0, y0, z0, 0]) * w0
+            c_g = _cube_entry(lut_table[x0, y0, z0, 1]) * w0
+            c_b = _cube_entry(lut_table[x0, y0, z0, 2]) * w0
+            
+            # P1 (x+1, y, z)
+            w1 = dx - dy
+            c_r += _cube_entry(lut_table[x1, y0, z0, 0]) * w1
+            c_g += _cube_entry(lut_table[x1, y0, z0, 1]) * w1
+            c_b += _cube_entry(lut_table[x1, y0, z0, 2]) * w1
+            
+            # P2 (x+1, y+1, z)
+            w2 = dy - dz
+            c_r += _cube_entry(lut_table[x1, y1, z0, 0]) * w2
+            c_g += _cube_entry(lut_table[x1, y1, z0, 1]) * w2
+            c_b += _cube_entry(lut_table[x1, y1, z0, 2]) * w2
+            
+            # P3 (x+1, y+1, z+1) -> Weight is dz
+            c_r += _cube_entry(lut_table[x1, y1, z1, 0]) * dz
+            c_g += _cube_entry(lut_table[x1, y1, z1, 1]) * dz
+            c_b += _cube_entry(lut_table[x1, y1, z1, 2]) * dz
+
+            r_val, g_val, b_val = c_r, c_g, c_b
+
+        elif dx >= dz:
+            # Case 2: dx >= dz > dy
+            # P1=(1,0,0), P2=(1,0,1)
+            # Weights: (1-dx), (dx-dz), (dz-dy), dy
+            
+            w0 = 1.0 - dx
+            c_r = _cube_entry(lut_table[x0, y0, z0, 0]) * w0
+            c_g = _cube_entry(lut_table[x0, y0, z0, 1]) * w0
+            c_b = _cube_entry(lut_table[x0, y0, z0, 2]) * w0
+            
+            w1 = dx - dz
+            c_r += _cube_entry(lut_table[x1, y0, z0, 0]) * w1
+            c_g += _cube_entry(lut_table[x1, y0, z0, 1]) * w1
+            c_b += _cube_entry(lut_table[x1, y0, z0, 2]) * w1
+            
+            w2 = dz - dy
+            c_r += _cube_entry(lut_table[x1, y0, z1, 0]) * w2
+            c_g += _cube_entry(lut_table[x1, y0, z1, 1]) * w2
+            c_b += _cube_entry(lut_table[x1, y0, z1, 2]) * w2
+            
+            c_r += _cube_entry(lut_table[x1, y1, z1, 0]) * dy
+            c_g += _cube_entry(lut_table[x1, y1, z1, 1]) * dy
+            c_b += _cube_entry(lut_table[x1, y1, z1, 2]) * dy
+            
+            r_val, g_val, b_val = c_r, c_g, c_b
+            
+        else:
+            # Case 3: dz > dx >= dy
+            # P1=(0,0,1), P2=(1,0,1)
+            # Weights: (1-dz), (dz-dx), (dx-dy), dy
+            
+            w0 = 1.0 - dz
+            c_r = _cube_entry(lut_table[x0, y0, z0, 0]) * w0
+            c_g = _cube_entry(lut_table[x0, y0, z0, 1]) * w0
+            c_b = _cube_entry(lut_table[x0, y0, z0, 2]) * w0
+            
+            w1 = dz - dx
+            c_r += _cube_entry(lut_table[x0, y0, z1, 0]) * w1
+            c_g += _cube_entry(lut_table[x0, y0, z1, 1]) * w1
+            c_b += _cube_entry(lut_table[x0, y0, z1, 2]) * w1
+            
+            w2 = dx - dy
+            c_r += _cube_entry(lut_table[x1, y0, z1, 0]) * w2
+            c_g += _cube_entry(lut_table[x1, y0, z1, 1]) * w2
+            c_b += _cube_entry(lut_table[x1, y0, z1, 2]) * w2
+            
+            c_r += _cube_entry(lut_table[x1, y1, z1, 0]) * dy
+            c_g += _cube_entry(lut_table[x1, y1, z1, 1]) * dy
+            c_b += _cube_entry(lut_table[x1, y1, z1, 2]) * dy
+
+            r_val, g_val, b_val = c_r, c_g, c_b
+
+    else: # dy > dx
+        if dz >= dy:
+            # Case 6: dz > dy > dx
+            # P1=(0,0,1), P2=(0,1,1)
+            # Weights: (1-dz), (dz-dy), (dy-dx), dx
+            
+            w0 = 1.0 - dz
+            c_r = _cube_entry(lut_table[x0, y0, z0, 0]) * w0
+            c_g = _cube_entry(lut_table[x0, y0, z0, 1]) * w0
+            c_b = _cube_entry(lut_table[x0, y0, z0, 2]) * w0
+            
+            w1 = dz - dy
+            c_r += _cube_entry(lut_table[x0, y0, z1, 0]) * w1
+            c_g += _cube_entry(lut_table[x0, y0, z1, 1]) * w1
+            c_b += _cube_entry(lut_table[x0, y0, z1, 2]) * w1
+            
+            w2 = dy - dx
+            c_r += _cube_entry(lut_table[x0, y1, z1, 0]) * w2
+            c_g += _cube_entry(lut_table[x0, y1, z1, 1]) * w2
+            c_b += _cube_entry(lut_table[x0, y1, z1, 2]) * w2
+            
+            c_r += _cube_entry(lut_table[x1, y1, z1, 0]) * dx
+            c_g += _cube_entry(lut_table[x1, y1, z1, 1]) * dx
+            c_b += _cube_entry(lut_table[x1, y1, z1, 2]) * dx
+            
+            r_val, g_val, b_val = c_r, c_g, c_b
+
+        elif dz >= dx:
+            # Case 5: dy >= dz > dx
+            # P1=(0,1,0), P2=(0,1,1)
+            # Weights: (1-dy), (dy-dz), (dz-dx), dx
+            
+            w0 = 1.0 - dy
+            c_r = _cube_entry(lut_table[x0, y0, z0, 0]) * w0
+            c_g = _cube_entry(lut_table[x0, y0, z0, 1]) * w0
+            c_b = _cube_entry(lut_table[x0, y0, z0, 2]) * w0
+            
+            w1 = dy - dz
+            c_r += _cube_entry(lut_table[x0, y1, z0, 0]) * w1
+            c_g += _cube_entry(lut_table[x0, y1, z0, 1]) * w1
+            c_b += _cube_entry(lut_table[x0, y1, z0, 2]) * w1
+            
+            w2 = dz - dx
+            c_r += _cube_entry(lut_table[x0, y1, z1, 0]) * w2
+            c_g += _cube_entry(lut_table[x0, y1, z1, 1]) * w2
+            c_b += _cube_entry(lut_table[x0, y1, z1, 2]) * w2
+            
+            c_r += _cube_entry(lut_table[x1, y1, z1, 0]) * dx
+            c_g += _cube_entry(lut_table[x1, y1, z1, 1]) * dx
+            c_b += _cube_entry(lut_table[x1, y1, z1, 2]) * dx
+            
+            r_val, g_val, b_val = c_r, c_g, c_b
+
+        else:
+            # Case 4: dy > dx >= dz
+            # P1=(0,1,0), P2=(1,1,0)
+            # Weights: (1-dy), (dy-dx), (dx-dz), dz
+            
+            w0 = 1.0 - dy
+            c_r = _cube_entry(lut_table[x0, y0, z0, 0]) * w0
+            c_g = _cube_entry(lut_table[x0, y0, z0, 1]) * w0
+            c_b = _cube_entry(lut_table[x0, y0, z0, 2]) * w0
+            
+            w1 = dy - dx
+            c_r += _cube_entry(lut_table[x0, y1, z0, 0]) * w1
+            c_g += _cube_entry(lut_table[x0, y1, z0, 1]) * w1
+            c_b += _cube_entry(lut_table[x0, y1, z0, 2]) * w1
+            
+            w2 = dx - dz
+            c_r += _cube_entry(lut_table[x1, y1, z0, 0]) * w2
+            c_g += _cube_entry(lut_table[x1, y1, z0, 1]) * w2
+            c_b += _cube_entry(lut_table[x1, y1, z0, 2]) * w2
+            
+            c_r += _cube_entry(lut_table[x1, y1, z1, 0]) * dz
+            c_g += _cube_entry(lut_table[x1, y1, z1, 1]) * dz
+            c_b += _cube_entry(lut_table[x1, y1, z1, 2]) * dz
+
+            r_val, g_val, b_val = c_r, c_g, c_b
+
+    return r_val, g_val, b_val
+
+@njit(inline='always', fastmath=True, cache=True)
+def _interp_1d(table, channel, x, lo, scale):
+    """
+    1D LUT 单通道线性插值
+
+    定义域外沿首/末段线性外推 (与 colour 默认的 Extrapolator 一致)。
+    """
+    last = np.float32(table.shape[0] - 2)
+    t = (x - lo) * scale
+    # t < 0 时 int 截断得 0，正好落在首段；超出末端则钳位到末段
+    i = int(min(max(t, np.float32(0.0)), last))
+    v0 = table[i, channel]
+    return v0 + (table[i + 1, channel] - v0) * (t - i)
+
+@njit(inline='always', fastmath=True, cache=True)
+def _sample_lut_chain(r, g, b, pre_table, pre_min, pre_scale, cube, cube_min, cube_scale, cube_dequant,
+                      post_table, post_min, post_scale, has_pre, has_cube, has_post):
+    """
+    对单个像素依次应用查表链: 前置 1D -> 3D (四面体插值) -> 后置 1D
+
+    参数即 LUTChain.kernel_args 的各项，各级由 has_* 标志控制是否启用。
+    调用方须在像素循环之外解包 kernel_args: 在循环内从元组取数组会产生逐像素的引用计数开销 (约慢 4 倍)。
+    """
+    if has_pre:
+        r = _interp_1d(pre_table, 0, r, pre_min[0], pre_scale[0])
+        g = _interp_1d(pre_table, 1, g, pre_min[1], pre_scale[1])
+        b = _interp_1d(pre_table, 2, b, pre_min[2], pre_scale[2])
+
+    if has_cube:
+        size_float = np.float32(cube.shape[0] - 1)
+        idx_r = min(max((r - cube_min[0]) * cube_scale[0], np.float32(0.0)), size_float)
+        idx_g = min(max((g - cube_min[1]) * cube_scale[1], np.float32(0.0)), size_float)
+        idx_b = min(max((b - cube_min[2]) * cube_scale[2], np.float32(0.0)), size_float)
+        r, g, b = _tetrahedral_sample(cube, idx_r, idx_g, idx_b)
+        # 量化表格还原 (插值是线性的，可在插值后统一缩放/偏移；浮点表格为 1/0)
+        r = r * cube_dequant[0, 0] + cube_dequant[1, 0]
+        g = g * cube_dequant[0, 1] + cube_dequant[1, 1]
+        b = b * cube_dequant[0, 2] + cube_dequant[1, 2]
+
+    if has_post:
+        r = _interp_1d(post_table, 0, r, post_min[0], post_scale[0])
+        g = _interp_1d(post_table, 1, g, post_min[1], post_scale[1])
+        b = _interp_1d(post_table, 2, b, post_min[2], post_scale[2])
+
+    return r, g, b
+
+@njit(parallel=True, fastmath=True, cache=True)
+def apply_lut_chain_inplace(flat_img, lut_chain):
+    """
+    高性能原位查表 (flat_img: (N, 3) float32 视图)，整条查表链单次遍历完成
+    """
+    (pre_table, pre_min, pre_scale, cube, cube_min, cube_scale, cube_dequant,
+     post_table, post_min, post_scale, has_pre, has_cube, has_post) = lut_chain
+
+    for i in prange(flat_img.shape[0]):
+        r_val, g_val, b_val = _sample_lut_chain(
+            flat_img[i, 0], flat_img[i, 1], flat_img[i, 2],
+            pre_table, pre_min, pre_scale, cube, cube_min, cube_scale, cube_dequant,
+            post_table, post_min, post_scale, has_pre, has_cube, has_post,
+        )
+        flat_img[i, 0] = r_val
+        flat_img[i, 1] = g_val
+        flat_img[i, 2] = b_val
+
+# =========================================================
+# 查表链整理与调度
+# =========================================================
+
+def _stage_arrays(table: np.ndarray, domain: np.ndarray):
+    """表格转为 float32 连续数组，定义域转为 (下限, 索引缩放) 两个 3 元素向量"""
+    table = np.ascontiguousarray(table, dtype=np.float32)
+    domain = np.asarray(domain, dtype=np.float64)
+    if domain.ndim == 1:
+        domain = np.repeat(domain[:, None], 3, axis=1)
+    lo = domain[0].astype(np.float32)
+    scale = ((table.shape[0] - 1) / (domain[1] - domain[0])).astype(np.float32)
+    return table, lo, scale
+
+
+def pack_cube(table: np.ndarray, cube_format: str = 'auto'):
+    """
+    将 (n,n,n,3) 3D 表格转为指定的存储格式 (见 CUBE_FORMATS，'auto' 按尺寸选择)
+
+    Returns:
+        (packed, dequant): 传给核函数的表格，以及 (2, 3) float32 还原参数 [缩放; 偏移]
+        (浮点格式为 1 / 0)
+    """
+    if cube_format == 'auto':
+        cube_format = select_cube_format(table.shape[0])
+    if cube_format not in CUBE_FORMATS:
+        raise ValueError(f"Unknown 3D LUT format: {cube_format}")
+
+    table = np.asarray(table, dtype=np.float32)
+    dequant = np.array([[1.0] * 3, [0.0] * 3], dtype=np.float32)
+    if cube_format == 'rgb32':
+        return np.ascontiguousarray(table), dequant
+
+    packed_dtype = {'rgba32': np.float32, 'rgba16u': np.uint16, 'rgba16f': np.float16}[cube_format]
+    packed = np.zeros(table.shape[:3] + (4,), dtype=packed_dtype)
+    if cube_format == 'rgba16u':
+        # 按通道把 [最小值, 最大值] 线性量化到 0..65535
+        lo = table.reshape(-1, 3).min(axis=0)
+        span = np.maximum(table.reshape(-1, 3).max(axis=0) - lo, np.float32(1e-12))
+        codes = table - lo
+        codes *= np.float32(65535.0) / span
+        packed[..., :3] = np.rint(codes, out=codes)
+        dequant = np.array([span / np.float32(65535.0), lo], dtype=np.float32)
+    else:
+        packed[..., :3] = table
+    if cube_format == 'rgba16f':
+        packed = packed.view(np.int16)
+    return packed, dequant
+
+
+class LUTChain:
+    """
+    "前置 1D -> 3D -> 后置 1D" 查表链 (各级可缺省)
+
+    kernel_args 为传给 Numba 核函数的参数元组，缺省的级别使用占位表格并关闭对应标志，
+    保证所有查表链共用同一份编译结果 (每种 3D 表格格式各编译一份)。
+    cube_format 为 3D 表格的存储格式 (见 CUBE_FORMATS，'auto' 按尺寸选择)。
+
+    查表链本身可代替 colour LUT 传给 apply_lut / render_look：
+    批处理时主进程编译一次，工作进程通过 from_arrays 零拷贝挂载共享的表格 (见 shared_tables)。
+    """
+
+    # kernel_args 中数组的名称 (顺序与核函数参数一致，其后为 3 个启用标志)
+    ARRAY_NAMES = ('pre_table', 'pre_min', 'pre_scale', 'cube', 'cube_min', 'cube_scale', 'cube_dequant',
+                   'post_table', 'post_min', 'post_scale')
+
+    def __init__(self, pre=None, cube=None, post=None, cube_format: str = 'auto'):
+        self.pre, self.cube, self.post = pre, cube, post
+        # 源 LUT 的内容哈希 (见 lut_content_hash)，从共享表格挂载时由主进程提供
+        self.content_hash = None
+
+        identity_1d = (np.zeros((2, 3), dtype=np.float32), np.zeros(3, dtype=np.float32), np.ones(3, dtype=np.float32))
+        identity_3d = (np.zeros((2, 2, 2, 3), dtype=np.float32), np.zeros(3, dtype=np.float32), np.ones(3, dtype=np.float32),
+                       np.array([[1.0] * 3, [0.0] * 3], dtype=np.float32))
+
+        pre_args = self._lut_1d_arrays(pre) if pre is not None else identity_1d
+        if cube is not None:
+            table, lo, scale = _stage_arrays(cube.table, cube.domain)
+            packed, dequant = pack_cube(table, cube_format)
+            cube_args = (packed, lo, scale, dequant)
+        else:
+            cube_args = identity_3d
+        post_args = self._lut_1d_arrays(post) if post is not None else identity_1d
+
+        self.kernel_args = pre_args + cube_args + post_args + (pre is not None, cube is not None, post is not None)
+
+    @staticmethod
+    def _lut_1d_arrays(lut):
+        table = lut.table
+        if table.ndim == 1:
+            # LUT1D: 同一曲线作用于三个通道
+            table = np.repeat(table[:, None], 3, axis=1)
+        return _stage_arrays(table, lut.domain)
+
+    @property
+    def is_identity(self) -> bool:
+        return not any(self.kernel_args[-3:])
+
+    def to_arrays(self) -> dict:
+        """kernel_args 转为 名称 -> 数组 的字典 (启用标志存为 'flags')，用于发布到共享内存"""
+        arrays = dict(zip(self.ARRAY_NAMES, self.kernel_args[:-3]))
+        arrays['flags'] = np.array(self.kernel_args[-3:], dtype=np.bool_)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, content_hash: str = None) -> 'LUTChain':
+        """由 to_arrays 的结果 (可为只读 memmap 视图) 重建查表链，不复制表格"""
+        chain = cls.__new__(cls)
+        chain.pre = chain.cube = chain.post = None
+        chain.content_hash = content_hash
+        flags = tuple(bool(flag) for flag in arrays['flags'])
+        chain.kernel_args = tuple(arrays[name] for name in cls.ARRAY_NAMES) + flags
+        return chain
+
+
+def compile_lut(lut, cube_format: str = 'auto'):
+    """
+    将 colour LUT 整理为单次遍历的 LUTChain (3D 表格按 cube_format 存储)
+
+    同一 LUT 对象的编译结果会被缓存 (见 _chain_cache)，调用方不应原位修改 LUT 表格。
+
+    Returns:
+        LUTChain，或 None (LUT 无法表示为 "前置 1D -> 3D -> 后置 1D"，
+        例如多个连续 1D、非均匀定义域或矩阵等其他算子)
+    """
+    if isinstance(lut, LUTChain):
+        return lut
+
+    key = (id(lut), cube_format)
+    cached = _chain_cache.get(key)
+    if cached is not None and cached[0] is lut:
+        return cached[1]
+
+    chain = _build_chain(lut, cube_format)
+    if len(_chain_cache) >= _CHAIN_CACHE_SIZE:
+        _chain_cache.pop(next(iter(_chain_cache)))
+    _chain_cache[key] = (lut, chain)
+    return chain
+
+
+def _build_chain(lut, cube_format: str):
+    operators = list(lut) if isinstance(lut, colour.LUTSequence) else [lut]
+
+    pre = cube = post = None
+    for op in operators:
+        if isinstance(op, (colour.LUT3D,) + LUT_1D_TYPES) and op.is_domain_explicit():
+            return None
+        if isinstance(op, colour.LUT3D) and cube is None and post is None:
+            cube = op
+        elif isinstance(op, LUT_1D_TYPES) and cube is None and pre is None:
+            pre = op
+        elif isinstance(op, LUT_1D_TYPES) and cube is not None and post is None:
+            post = op
+        else:
+            return None
+    return LUTChain(pre, cube, post, cube_format)
+
+
+def apply_lut(img: np.ndarray, lut, cube_format: str = 'auto') -> np.ndarray:
+    """
+    应用 colour 读取的 LUT (LUT1D / LUT3x1D / LUT3D / LUTSequence)，3D 表格按 cube_format 存储
+
+    能整理为查表链时用 Numba 原位单次遍历；其他序列逐个算子应用；
+    非均匀定义域等无法加速的 LUT 使用 colour 默认方法。
+
+    Returns:
+        np.ndarray: 结果图像 (加速路径下为原位修改的 float32 输入)
+    """
+    chain = compile_lut(lut, cube_format)
+    if chain is not None:
+        if not img.flags['C_CONTIGUOUS']:
+            img = np.ascontiguousarray(img)
+        if img.dtype != np.float32:
+            img = img.astype(np.float32)
+        if not chain.is_identity:
+            apply_lut_chain_inplace(img.reshape(-1, 3), chain.kernel_args)
+        return img
+
+    if isinstance(lut, colour.LUTSequence):
+        for op in lut:
+            img = apply_lut(img, op, cube_format)
+        return img
+
+    return lut.apply(img)
+
+
+def lut_content_hash(lut) -> str:
+    """LUT 内容哈希 (见 lut_fingerprint_bytes)；共享的查表链直接返回主进程计算的哈希"""
+    if isinstance(lut, LUTChain) and lut.content_hash is not None:
+        return lut.content_hash
+    return hash_bytes(lut_fingerprint_bytes(lut))
+
+
+def lut_fingerprint_bytes(lut) -> bytes:
+    """LUT 内容的字节表示 (类型 + float32 表格 + 定义域，序列逐个算子拼接)，用于缓存指纹"""
+    if isinstance(lut, colour.LUTSequence):
+        return b''.join(lut_fingerprint_bytes(op) for op in lut)
+    if isinstance(lut, LUTChain):
+        # 无源 LUT 哈希的查表链: 以打包后的核函数数组参与指纹
+        return b'LUTChain' + b''.join(np.ascontiguousarray(array).tobytes() for array in lut.to_arrays().values())
+    if not hasattr(lut, 'table'):
+        # 矩阵等其他算子: 以其文本表示参与指纹
+        return type(lut).__name__.encode('utf-8') + repr(lut).encode('utf-8')
+    return (
+        type(lut).__name__.encode('utf-8')
+        + np.ascontiguousarray(lut.table, dtype=np.float32).tobytes()
+        + np.ascontiguousarray(lut.domain, dtype=np.float32).tobytes()
+    )
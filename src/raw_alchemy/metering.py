@@ -2,8 +2,9 @@
 测光策略模块
 使用策略模式实现不同的测光算法
 """
+import numba
 import numpy as np
-from typing import Protocol, Optional
+from typing import Protocol, Optional, List
 
 try:
     from .logger import Logger
@@ -37,6 +38,66 @@ class MeteringStrategy(Protocol):
         ...
 
 
+# 亮度直方图参数 (log2 分箱): 覆盖 2^-24 ~ 2^8，每档 128 箱 (百分位误差 < 1/128 档)
+HIST_LOG2_MIN = -24.0
+HIST_LOG2_MAX = 8.0
+HIST_BINS = 4096
+
+# 矩阵测光网格尺寸
+MATRIX_GRID_SIZE = 7
+
+
+class MeteringStats:
+    """
+    单次遍历得到的测光统计量
+    
+    由 utils.compute_luminance_stats 计算，所有策略共用，避免对采样视图做复制、全图 log 和排序。
+    """
+    
+    def __init__(self, img_linear: np.ndarray, source_colorspace, grid_size: int = MATRIX_GRID_SIZE):
+        h, w, _ = img_linear.shape
+        step = utils.get_subsample_step(h, w)
+        coeffs = np.asarray(utils.get_luminance_coeffs(source_colorspace), dtype=np.float64)
+        
+        (log_sum, count, self.max_hist, grid_sum, grid_count,
+         cw_sum, cw_weight) = utils.compute_luminance_stats(
+            img_linear, step, coeffs, grid_size, grid_size,
+            HIST_BINS, HIST_LOG2_MIN, HIST_LOG2_MAX, numba.get_num_threads() * 4,
+        )
+        
+        self.count = count
+        self._cumulative = None
+        self.avg_log_lum = log_sum / count
+        self.center_weighted_lum = cw_sum / cw_weight if cw_weight > 0 else 0.0
+        # 空网格 (采样图小于网格尺寸) 的均值记为 0，与逐格切片的行为一致
+        self.grid_lums = np.where(grid_count > 0, grid_sum / np.maximum(grid_count, 1), 0.0)
+    
+    def _order_statistic(self, k: int) -> float:
+        """第 k 小的值 (0 起)，取所在分箱的几何中心"""
+        idx = int(np.searchsorted(self._cumulative, k, side='right'))
+        idx = min(idx, HIST_BINS - 1)
+        bin_width = (HIST_LOG2_MAX - HIST_LOG2_MIN) / HIST_BINS
+        return float(2.0 ** (HIST_LOG2_MIN + (idx + 0.5) * bin_width))
+    
+    def max_channel_percentile(self, q: float) -> float:
+        """
+        三通道最大值的百分位 (由直方图查得，无需排序)
+        
+        与 np.percentile 相同，在相邻两个顺序统计量之间线性插值。
+        
+        Args:
+            q: 百分位 (0-100)
+        """
+        if self._cumulative is None:
+            self._cumulative = np.cumsum(self.max_hist)
+        rank = q / 100.0 * (self.count - 1)
+        lo = int(np.floor(rank))
+        hi = min(lo + 1, self.count - 1)
+        v_lo = self._order_statistic(lo)
+        v_hi = self._order_statistic(hi) if hi != lo else v_lo
+        return v_lo + (v_hi - v_lo) * (rank - lo)
+
+
 class AverageMeteringStrategy:
     """平均测光策略（几何平均）"""
     
@@ -48,14 +109,8 @@ class AverageMeteringStrategy:
         logger: Optional[Logger] = None
     ) -> float:
 
-        sample = utils.get_subsampled_view(img_linear)
-        coeffs = utils.get_luminance_coeffs(source_colorspace)
-        luminance = np.dot(sample, coeffs)
-        
-        # 确保亮度值为正，避免对数运算中的无效值
-        luminance = np.maximum(luminance, 1e-10)
-        avg_log_lum = np.mean(np.log(luminance + 1e-6))
-        avg_lum = np.exp(avg_log_lum)
+        stats = MeteringStats(img_linear, source_colorspace)
+        avg_lum = np.exp(stats.avg_log_lum)
         
         if avg_lum < 0.0001:
             gain = 1.0
@@ -81,18 +136,8 @@ class CenterWeightedMeteringStrategy:
         logger: Optional[Logger] = None
     ) -> float:
 
-        sample = utils.get_subsampled_view(img_linear)
-        coeffs = utils.get_luminance_coeffs(source_colorspace)
-        luminance = np.dot(sample, coeffs)
-        
-        h, w = luminance.shape
-        y, x = np.ogrid[:h, :w]
-        center_y, center_x = h / 2, w / 2
-        sigma = min(h, w) / 2
-        dist_sq = (x - center_x)**2 + (y - center_y)**2
-        weights = np.exp(-dist_sq / (2 * sigma**2))
-        
-        weighted_avg_lum = np.average(luminance, weights=weights)
+        stats = MeteringStats(img_linear, source_colorspace)
+        weighted_avg_lum = stats.center_weighted_lum
         
         if weighted_avg_lum < 1e-6:
             gain = 1.0
@@ -118,9 +163,8 @@ class HighlightSafeMeteringStrategy:
         logger: Optional[Logger] = None
     ) -> float:
 
-        sample = utils.get_subsampled_view(img_linear)
-        max_vals = np.max(sample, axis=2)
-        high_percentile = np.percentile(max_vals, 99.0)
+        stats = MeteringStats(img_linear, source_colorspace)
+        high_percentile = stats.max_channel_percentile(99.0)
         
         target_high = 0.9
         if high_percentile < 1e-6:
@@ -145,18 +189,11 @@ class HybridMeteringStrategy:
         logger: Optional[Logger] = None
     ) -> float:
         
-        sample = utils.get_subsampled_view(img_linear)
-        coeffs = utils.get_luminance_coeffs(source_colorspace)
-        luminance = np.dot(sample, coeffs)
-        
-        # 确保亮度值为正，避免对数运算中的无效值
-        luminance = np.maximum(luminance, 1e-10)
-        avg_log_lum = np.mean(np.log(luminance + 1e-6))
-        avg_lum = np.exp(avg_log_lum)
+        stats = MeteringStats(img_linear, source_colorspace)
+        avg_lum = np.exp(stats.avg_log_lum)
         base_gain = target_gray / (avg_lum + 1e-6)
         
-        max_vals = np.max(sample, axis=2)
-        p99 = np.percentile(max_vals, 99.0)
+        p99 = stats.max_channel_percentile(99.0)
         
         potential_peak = p99 * base_gain
         max_allowed_peak = 6.0
@@ -188,21 +225,9 @@ class MatrixMeteringStrategy:
         logger: Optional[Logger] = None
     ) -> float:
         
-        sample = utils.get_subsampled_view(img_linear)
-        h, w, _ = sample.shape
-        
-        coeffs = utils.get_luminance_coeffs(source_colorspace)
-        luminance = np.dot(sample, coeffs)
-        
-        grid_size = 7
-        grid_h, grid_w = h // grid_size, w // grid_size
-        
-        grid_lums = np.zeros((grid_size, grid_size))
-        for i in range(grid_size):
-            for j in range(grid_size):
-                cell = luminance[i*grid_h:(i+1)*grid_h, j*grid_w:(j+1)*grid_w]
-                if cell.size > 0:
-                    grid_lums[i, j] = np.mean(cell)
+        grid_size = MATRIX_GRID_SIZE
+        stats = MeteringStats(img_linear, source_colorspace, grid_size)
+        grid_lums = stats.grid_lums
         
         weights = np.ones((grid_size, grid_size))
         
@@ -214,7 +239,7 @@ class MatrixMeteringStrategy:
         center_bias = np.exp(-dist_sq / (2 * sigma**2))
         weights *= (1 + center_bias * 1.5)
         
-        # 高光抑制
+        # 高光抑制 (网格仅 49 个值，直接排序)
         lum_percentile_90 = np.percentile(grid_lums, 90)
         highlight_zones = grid_lums > lum_percentile_90
         weights[highlight_zones] *= 0.2
@@ -232,8 +257,7 @@ class MatrixMeteringStrategy:
             gain = target_gray / weighted_avg_lum
         
         # 保护性削减
-        max_vals = np.max(sample, axis=2)
-        p99 = np.percentile(max_vals, 99.0)
+        p99 = stats.max_channel_percentile(99.0)
         potential_peak = p99 * gain
         max_allowed_peak = 6.0
         
@@ -280,12 +304,127 @@ def get_metering_strategy(mode: str) -> MeteringStrategy:
     return strategy
 
 
-def apply_auto_exposure(
+def smooth_exposure_gains(gains: List[Optional[float]], window: int) -> List[Optional[float]]:
+    """
+    在序列上平滑曝光增益 (去闪烁)
+    
+    在 log2 (档位) 域做居中滑动平均，序列两端窗口自动收缩。
+    测光失败的帧 (None) 不参与平均，其结果由相邻帧的平均值补齐；
+    窗口内没有任何有效值时仍为 None (该帧回退到单独测光)。
+    
+    Args:
+        gains: 按拍摄顺序排列的增益
+        window: 窗口大小 (帧数)，<= 1 时不平滑
+    
+    Returns:
+        平滑后的增益列表
+    """
+    if window <= 1:
+        return list(gains)
+    
+    half = window // 2
+    stops = [np.log2(g) if g is not None and g > 0 else None for g in gains]
+    smoothed = []
+    for i in range(len(stops)):
+        neighbours = [v for v in stops[max(0, i - half):i + half + 1] if v is not None]
+        smoothed.append(float(2.0 ** np.mean(neighbours)) if neighbours else None)
+    return smoothed
+
+
+def extract_bayer_sample(raw, target_size: int = 1024) -> Optional[np.ndarray]:
+    """
+    在去马赛克之前，直接从 Bayer 数据生成测光用的 RGB 缩略图
+    
+    按 2x2 CFA 块跨步采样 raw.raw_image_visible，逐通道扣除黑电平并以传感器真实白电平归一化，
+    再应用相机白平衡和 相机RGB -> ProPhoto 矩阵，使其与解码输出处于同一尺度。
+    高光不受解码器高光混合 (highlight_mode) 的影响，可按真实传感器饱和点测光。
+    
+    Args:
+        raw: 已打开的 rawpy.RawPy 对象
+        target_size: 缩略图长边像素数
+    
+    Returns:
+        np.ndarray: (h, w, 3) float32 ProPhoto 线性缩略图；
+                    非拜耳阵列 (如 X-Trans) 返回 None，调用方应回退到解码后测光
+    """
+    import colour
+    
+    pattern = raw.raw_pattern
+    if pattern is None or pattern.shape != (2, 2):
+        return None
+    
+    cfa = raw.raw_image_visible
+    h, w = cfa.shape
+    block = 2 * utils.get_subsample_step(h // 2, w // 2, target_size)
+    sh, sw = (h - 1) // block, (w - 1) // block
+    if sh == 0 or sw == 0:
+        return None
+    
+    black = raw.black_level_per_channel
+    white = float(raw.white_level)
+    
+    # 与 LibRaw 一致: 白平衡系数按最大值归一化 (高光混合模式下不放大任何通道)
+    wb = np.array(raw.camera_whitebalance[:3], dtype=np.float32)
+    if wb.min() <= 0:
+        wb = np.ones(3, dtype=np.float32)
+    wb /= wb.max()
+    
+    sample = np.zeros((sh, sw, 3), dtype=np.float32)
+    counts = np.zeros(3, dtype=np.float32)
+    for i in range(2):
+        for j in range(2):
+            c = int(pattern[i, j])
+            channel = 1 if c == 3 else c # 第二个绿色 (G2) 并入 G
+            plane = cfa[i::block, j::block][:sh, :sw].astype(np.float32)
+            plane -= black[c]
+            plane *= 1.0 / (white - black[c])
+            sample[:, :, channel] += plane
+            counts[channel] += 1
+    
+    sample *= wb / counts
+    np.maximum(sample, 0.0, out=sample)
+    
+    # 相机 RGB -> sRGB (LibRaw rgb_cam) -> ProPhoto RGB
+    M = colour.matrix_RGB_to_RGB(
+        colour.RGB_COLOURSPACES['sRGB'],
+        colour.RGB_COLOURSPACES['ProPhoto RGB'],
+    ) @ np.asarray(raw.color_matrix)[:, :3]
+    utils.apply_matrix_inplace(sample, M.astype(np.float32))
+    
+    return sample
+
+
+def calculate_auto_exposure_gain(
     img_linear: np.ndarray,
     source_colorspace,
     metering_mode: str = 'hybrid',
     target_gray: float = 0.18,
     logger: Optional[Logger] = None
+) -> float:
+    """
+    仅计算自动曝光增益，不修改图像 (用于将增益合并到解码转换中)
+    
+    Args:
+        img_linear: 线性图像数据或测光缩略图
+        source_colorspace: 源色彩空间
+        metering_mode: 测光模式
+        target_gray: 目标灰度值
+        logger: 日志处理器
+    
+    Returns:
+        float: 曝光增益值
+    """
+    strategy = get_metering_strategy(metering_mode)
+    return float(strategy.calculate_gain(img_linear, source_colorspace, target_gray, logger))
+
+
+def apply_auto_exposure(
+    img_linear: np.ndarray,
+    source_colorspace,
+    metering_mode: str = 'hybrid',
+    target_gray: float = 0.18,
+    logger: Optional[Logger] = None,
+    metering_sample: Optional[np.ndarray] = None
 ) -> np.ndarray:
     """
     应用自动曝光
@@ -296,13 +435,15 @@ def apply_auto_exposure(
         metering_mode: 测光模式
         target_gray: 目标灰度值
         logger: 日志处理器
+        metering_sample: 预先生成的测光缩略图 (如解码时一并生成)，
+                         为 None 时在 img_linear 上跨步采样
     
     Returns:
         np.ndarray: 调整后的图像
     """
 
-    strategy = get_metering_strategy(metering_mode)
-    gain = strategy.calculate_gain(img_linear, source_colorspace, target_gray, logger)
+    sample = img_linear if metering_sample is None else metering_sample
+    gain = calculate_auto_exposure_gain(sample, source_colorspace, metering_mode, target_gray, logger)
     utils.apply_gain_inplace(img_linear, float(gain))
     
     return img_linear
@@ -1,12 +1,78 @@
+import io
 import os
+import collections
 import concurrent.futures
-from raw_alchemy import core
+from concurrent.futures.process import BrokenProcessPool
+
+import math
+
+import rawpy
+
+from raw_alchemy import core, config
+from raw_alchemy.lut_cache import share_lut
+from raw_alchemy.metering import smooth_exposure_gains
+from raw_alchemy.prefetch import ReadAheadLoader
 
 # Supported RAW file extensions (lowercase)
 SUPPORTED_RAW_EXTENSIONS = [
     '.dng', '.cr2', '.cr3', '.nef', '.arw', '.rw2', '.raf', '.orf', '.pef', '.srw'
 ]
 
+# How many times a job may be resubmitted after its worker process crashed
+MAX_CRASH_RETRIES = 2
+
+# After a crash halves the pool, concurrency doubles again (up to --jobs) once this many
+# jobs in a row have finished without a crash
+RECOVERY_SUCCESSES = 4
+
+
+def estimate_job_memory(raw_path, raw_buffer, lens_correct, preset, tile_rows=config.DEFAULT_TILE_ROWS,
+                        half_precision=config.DEFAULT_HALF_PRECISION, lens_grid_step=config.DEFAULT_LENS_GRID_STEP,
+                        lens_map_cache_dir=None):
+    """
+    Estimates a job's peak memory from the RAW dimensions (header only, no unpacking).
+    Returns 0 if the header cannot be read; the worker will then report the real error.
+    """
+    source = io.BytesIO(raw_buffer) if raw_buffer is not None else raw_path
+    try:
+        with rawpy.imread(source) as raw:
+            width, height = raw.sizes.raw_width, raw.sizes.raw_height
+    except Exception:
+        return 0
+    return core.estimate_peak_memory(width, height, lens_correct=lens_correct, preset=preset, tile_rows=tile_rows,
+                                     half_precision=half_precision, lens_grid_step=lens_grid_step,
+                                     lens_map_cache=lens_map_cache_dir is not None)
+
+
+def measure_sequence_exposures(raw_paths, metering_mode, preset, jobs, window, log_message):
+    """
+    Deflicker phase 1: meters every file in parallel from a cheap sample (Bayer data or a
+    half-size decode), then smooths the gains across the sequence.
+
+    Returns a dict mapping each path to an exposure in stops, or None for files whose
+    gain could not be determined (those fall back to per-frame metering).
+    """
+    log_message(f"📈 Deflicker: metering {len(raw_paths)} file(s), smoothing over {window} frame(s)...")
+    gains = [None] * len(raw_paths)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(core.measure_exposure_gain, raw_path, metering_mode, preset): index
+            for index, raw_path in enumerate(raw_paths)
+        }
+        for future in concurrent.futures.as_completed(futures):
+            index = futures[future]
+            try:
+                gains[index] = future.result()
+            except Exception as exc:
+                log_message(f"⚠️ [{os.path.basename(raw_paths[index])}] Deflicker metering failed: {exc}")
+
+    smoothed = smooth_exposure_gains(gains, window)
+    return {
+        raw_path: (math.log2(gain) if gain is not None else None)
+        for raw_path, gain in zip(raw_paths, smoothed)
+    }
+
+
 def process_path(
     input_path,
     output_path,
@@ -19,10 +85,50 @@ def process_path(
     jobs,
     logger_func, # A function to handle logging, e.g., print or queue.put
     output_format: str = 'tif',
+    decode_cache_dir=None,
+    decode_cache_size_gb: float = config.DEFAULT_DECODE_CACHE_SIZE_GB,
+    decode_cache_compress: bool = False,
+    preset: str = config.DEFAULT_QUALITY_PRESET,
+    read_ahead: int = config.DEFAULT_READ_AHEAD,
+    io_concurrency: int = config.DEFAULT_IO_CONCURRENCY,
+    max_memory_gb=None,
+    metering_source: str = 'image',
+    deflicker: int = 0,
+    pipeline: str = config.DEFAULT_PIPELINE,
+    tile_rows: int = config.DEFAULT_TILE_ROWS,
+    half_precision: bool = config.DEFAULT_HALF_PRECISION,
+    lens_map_cache_dir=None,
+    lens_grid_step: int = config.DEFAULT_LENS_GRID_STEP,
+    tiff_tile: int = config.DEFAULT_TIFF_TILE,
+    interpolation=None,
 ):
     """
     Orchestrates the processing of a single file or a directory of files.
     Updated to support GUI Progress Bar signaling.
+
+    deflicker: batch mode only. When > 1 (and no manual exposure is set), all files are
+    metered first and the gains are smoothed over a window of that many frames in
+    filename order, so time-lapse sequences render without exposure flicker.
+
+    tile_rows: when > 0, every stage after decode runs on bands of that many rows and
+    finished bands are streamed to the output file, bounding memory for very large frames.
+
+    half_precision: store the decoded working frame as float16 (kernels still compute in
+    float32). Halves the frame's memory, so a --max-memory budget admits more concurrent jobs.
+    Only used for 8-bit output; 16-bit TIFF/HEIF output keeps a float32 frame.
+
+    lens_map_cache_dir: directory for persisting dense lens coordinate maps (float16 offsets)
+    across runs. Without it, dense coordinates are computed per band in float32 and no
+    full-frame map is built; sparse grids are always cached in memory per worker.
+
+    lens_grid_step: when > 0, lens coordinates are computed only on a grid with this
+    spacing and interpolated inside the remap kernel instead of stored per pixel.
+
+    tiff_tile: when > 0, TIFF output is written as tiles of this size (a multiple of 16)
+    compressed on a thread pool; 0 writes strips.
+
+    interpolation: lens correction resampling ('bilinear', 'bicubic' or 'lanczos'),
+    overriding the preset's choice; None uses the preset.
     """
     
     # --- Helper Functions ---
@@ -42,6 +148,35 @@ def process_path(
 
     output_ext = f".{output_format}"
 
+    # Settings shared by every process_image call
+    common_kwargs = dict(
+        log_space=log_space,
+        lut_path=lut_path,
+        exposure=exposure,
+        lens_correct=lens_correct,
+        custom_db_path=custom_db_path,
+        metering_mode=metering_mode,
+        metering_source=metering_source,
+        decode_cache_dir=decode_cache_dir,
+        decode_cache_size_gb=decode_cache_size_gb,
+        decode_cache_compress=decode_cache_compress,
+        preset=preset,
+        pipeline=pipeline,
+        tile_rows=tile_rows,
+        half_precision=half_precision,
+        lens_map_cache_dir=lens_map_cache_dir,
+        lens_grid_step=lens_grid_step,
+        tiff_tile=tiff_tile,
+        interpolation=interpolation,
+        # Pass queue directly if it is one (for internal logging inside the worker)
+        log_queue=logger_func if hasattr(logger_func, 'put') else None,
+    )
+
+    if tiff_tile % 16:
+        error_msg = f"TIFF tile size must be a multiple of 16, got {tiff_tile}."
+        log_message(f"❌ Error: {error_msg}")
+        raise ValueError(error_msg)
+
     # ============================
     #      Batch Processing
     # ============================
@@ -64,36 +199,200 @@ def process_path(
         log_message(f"🔍 Found {count} RAW files for parallel processing.")
         send_signal({'total_files': count}) 
         
-        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
-            futures = {
-                executor.submit(
-                    core.process_image,
-                    raw_path=os.path.join(input_path, filename),
-                    output_path=os.path.join(output_path, f"{os.path.splitext(filename)[0]}{output_ext}"),
-                    log_space=log_space,
-                    lut_path=lut_path,
-                    exposure=exposure,
-                    lens_correct=lens_correct,
-                    custom_db_path=custom_db_path,
-                    metering_mode=metering_mode,
-                    # Pass queue directly if it is one (for internal logging inside the worker)
-                    log_queue=logger_func if hasattr(logger_func, 'put') else None 
-                ): filename for filename in raw_files
-            }
-            
-            for future in concurrent.futures.as_completed(futures):
-                filename = futures[future]
-                try:
-                    future.result()  # Check for exceptions
-                except Exception as exc:
-                    log_msg = f"❌ Generated an exception: {exc}"
-                    if hasattr(logger_func, 'put'):
-                        logger_func.put({'id': filename, 'msg': log_msg})
+        # Sorted so that sequences (e.g. time-lapses) are processed in shooting order
+        raw_paths = [os.path.join(input_path, filename) for filename in sorted(raw_files)]
+
+        # float16 storage is only used for 8-bit output (see core.supports_half_precision); resolved
+        # here so the memory estimate matches what the workers do and each file does not warn again
+        if half_precision and not core.supports_half_precision(os.path.join(output_path, f"output{output_ext}")):
+            log_message(f"⚠️ Half precision only applies to 8-bit output, {output_format} keeps the float32 working frame.")
+            half_precision = common_kwargs['half_precision'] = False
+
+        # Precomputed per-file exposures (stops); None = meter each frame on its own
+        sequence_exposures = {}
+        if deflicker > 1 and exposure is None:
+            sequence_exposures = measure_sequence_exposures(raw_paths, metering_mode, preset, jobs, deflicker, log_message)
+
+        if read_ahead > 0:
+            # Files are read on background threads and handed to workers as in-memory buffers
+            log_message(f"📥 Read-ahead enabled: {read_ahead} file(s) ahead, {io_concurrency} concurrent read(s) per device.")
+            work_items = iter(ReadAheadLoader(raw_paths, read_ahead, io_concurrency))
+        else:
+            work_items = ((raw_path, None) for raw_path in raw_paths)
+
+        # Memory budget (None = unlimited). Jobs are only admitted while their estimated
+        # peak memory fits into the budget; at least one job always runs.
+        memory_budget = int(max_memory_gb * 1024**3) if max_memory_gb else None
+        if memory_budget:
+            log_message(f"🧮 Memory budget: {max_memory_gb:g} GB")
+
+        workers = jobs
+        retry_queue = collections.deque()
+        # Jobs that were in flight when a worker crashed. A dead worker breaks every in-flight
+        # future at once, so the crashing job cannot be told apart; suspects are rerun one at
+        # a time, where a crash is charged to the job that caused it.
+        suspects = collections.deque()
+        successes = 0
+        next_job = None
+        exhausted = False
+        futures = {}
+        in_flight_bytes = 0
+
+        def report_failure(filename, log_msg):
+            if hasattr(logger_func, 'put'):
+                logger_func.put({'id': filename, 'msg': log_msg})
+            else:
+                log_message(f"[{filename}] {log_msg}")
+
+        def take_next_job():
+            """Crashed jobs are retried before new files are started."""
+            nonlocal exhausted
+            if retry_queue:
+                return retry_queue.popleft()
+            if exhausted:
+                return None
+            item = next(work_items, None)
+            if item is None:
+                exhausted = True
+                return None
+            raw_path, raw_buffer = item
+            memory = (estimate_job_memory(raw_path, raw_buffer, lens_correct, preset, tile_rows, half_precision,
+                                          lens_grid_step, lens_map_cache_dir) if memory_budget else 0)
+            return {'raw_path': raw_path, 'raw_buffer': raw_buffer, 'memory': memory, 'attempts': 0}
+
+        def is_crash(future):
+            return not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)
+
+        def collect(future, job):
+            """Reports a finished job (success or exception). Crashed jobs are handled by the caller."""
+            filename = os.path.basename(job['raw_path'])
+            try:
+                future.result()  # Check for exceptions
+            except Exception as exc:
+                report_failure(filename, f"❌ Generated an exception: {exc}")
+            # 【关键修改 2】无论成功还是失败，都发送完成信号，让进度条往前走
+            send_signal({'status': 'done'})
+
+        def charge_crash(job):
+            """The job crashed its worker while running alone: count it against its retry limit."""
+            job['attempts'] += 1
+            if job['attempts'] <= MAX_CRASH_RETRIES:
+                suspects.append(job)
+            else:
+                filename = os.path.basename(job['raw_path'])
+                report_failure(filename, f"❌ Worker process crashed {job['attempts']} times (out of memory?), giving up.")
+                send_signal({'status': 'done'})
+
+        # Parse and compile the LUT once here; workers attach the tables read-only instead of
+        # each parsing, packing and holding a private copy
+        shared_lut = None
+        if lut_path:
+            try:
+                shared_lut = share_lut(lut_path)
+            except Exception as e:
+                log_message(f"⚠️ Could not share the LUT with workers, each will load it: {e}")
+        if shared_lut is not None:
+            common_kwargs['shared_lut'] = shared_lut.descriptor
+            log_message(f"🧊 LUT tables shared read-only with workers ({shared_lut.nbytes / 1024**2:.1f} MB).")
+
+        def submit(job):
+            filename = os.path.basename(job['raw_path'])
+            job_kwargs = common_kwargs
+            if sequence_exposures.get(job['raw_path']) is not None:
+                job_kwargs = dict(common_kwargs, exposure=sequence_exposures[job['raw_path']])
+            return executor.submit(
+                core.process_image,
+                raw_path=job['raw_path'],
+                output_path=os.path.join(output_path, f"{os.path.splitext(filename)[0]}{output_ext}"),
+                raw_buffer=job['raw_buffer'],
+                **job_kwargs,
+            )
+
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        try:
+            while True:
+                # With a memory budget every submitted job must be running, otherwise the
+                # accounting is meaningless; without one, keep the read-ahead window queued
+                # so that prefetched buffers do not pile up in the executor queue.
+                max_in_flight = workers if memory_budget else workers + max(0, read_ahead)
+
+                if suspects:
+                    # Isolation: a suspect runs only once the pool is idle, and nothing runs beside it
+                    if not futures:
+                        job = suspects.popleft()
+                        filename = os.path.basename(job['raw_path'])
+                        log_message(f"🔬 [{filename}] Rerunning alone to find the job that crashed its worker.")
+                        futures[submit(job)] = job
+                        in_flight_bytes += job['memory']
+                    max_in_flight = 0
+                elif workers < jobs and successes >= RECOVERY_SUCCESSES:
+                    # Stable again: let the in-flight jobs drain, then restart the pool with more workers
+                    if not futures:
+                        workers = min(jobs, workers * 2)
+                        successes = 0
+                        executor.shutdown(wait=True)
+                        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+                        log_message(f"📈 No crashes in the last {RECOVERY_SUCCESSES} job(s), raising concurrency to {workers} worker(s).")
                     else:
-                        log_message(f"[{filename}] {log_msg}")
-                finally:
-                    # 【关键修改 2】无论成功还是失败，都发送完成信号，让进度条往前走
-                    send_signal({'status': 'done'})
+                        max_in_flight = 0
+
+                while len(futures) < max_in_flight:
+                    if next_job is None:
+                        next_job = take_next_job()
+                    if next_job is None:
+                        break
+                    if memory_budget and futures and in_flight_bytes + next_job['memory'] > memory_budget:
+                        break  # Wait for running jobs to free memory
+
+                    job, next_job = next_job, None
+                    filename = os.path.basename(job['raw_path'])
+                    if memory_budget and job['memory'] > memory_budget:
+                        log_message(f"⚠️ [{filename}] Estimated {job['memory'] / 1024**3:.1f} GB exceeds the memory budget, running it alone.")
+                    futures[submit(job)] = job
+                    in_flight_bytes += job['memory']
+
+                if not futures:
+                    break
+
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                if not any(is_crash(future) for future in done):
+                    for future in done:
+                        job = futures.pop(future)
+                        in_flight_bytes -= job['memory']
+                        collect(future, job)
+                        successes += 1
+                    continue
+
+                # A dead worker breaks the whole pool: every in-flight future fails with
+                # BrokenProcessPool, in no particular order. Wait until all of them have
+                # settled, so that what happens next does not depend on timing.
+                executor.shutdown(wait=True, cancel_futures=True)
+                crashed = []
+                for future, job in futures.items():
+                    if future.cancelled():
+                        retry_queue.append(job)  # Never started
+                    elif is_crash(future):
+                        crashed.append(job)
+                    else:
+                        collect(future, job)
+                futures.clear()
+                in_flight_bytes = 0
+                successes = 0
+
+                if len(crashed) == 1:
+                    # Only one job was running, so it is the one that crashed
+                    charge_crash(crashed[0])
+                else:
+                    suspects.extend(crashed)
+
+                workers = max(1, workers // 2)
+                log_message(f"♻️ A worker process crashed (likely out of memory). "
+                            f"Restarting with {workers} worker(s); {len(suspects)} job(s) will be rerun one at a time.")
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            if shared_lut is not None:
+                shared_lut.close()
         
         log_message("\n🎉 Batch processing complete.")
 
@@ -115,13 +414,7 @@ def process_path(
             core.process_image(
                 raw_path=input_path,
                 output_path=final_output_path,
-                log_space=log_space,
-                lut_path=lut_path,
-                exposure=exposure,
-                lens_correct=lens_correct,
-                custom_db_path=custom_db_path,
-                metering_mode=metering_mode,
-                log_queue=logger_func if hasattr(logger_func, 'put') else None
+                **common_kwargs,
             )
         finally:
             # 发送完成信号
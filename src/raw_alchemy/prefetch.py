@@ -0,0 +1,62 @@
+"""
+批处理预读模块
+在后台线程中提前把接下来的 RAW 文件读入内存，进程池中的工作进程直接拿到文件内容
+(由 rawpy 的 open_buffer 解码)，不必阻塞在 NAS 共享目录、USB 读卡器等慢速存储上。
+"""
+import os
+import threading
+import itertools
+import collections
+import concurrent.futures
+
+
+class ReadAheadLoader:
+    """
+    按顺序产出 (path, data)，最多提前读取 depth 个文件
+
+    每个存储设备 (st_dev) 上的并发读取数有上限，--jobs 较大时不会让机械硬盘陷入随机读取。
+    读取失败时 data 为 None，由工作进程自行打开该路径。
+    """
+
+    def __init__(self, paths, depth: int, per_device_limit: int = 2):
+        self.paths = list(paths)
+        self.depth = max(1, int(depth))
+        self.per_device_limit = max(1, int(per_device_limit))
+        self._device_semaphores = {}
+        self._guard = threading.Lock()
+
+    def _device_semaphore(self, path):
+        try:
+            device = os.stat(path).st_dev
+        except OSError:
+            device = None
+        with self._guard:
+            if device not in self._device_semaphores:
+                self._device_semaphores[device] = threading.BoundedSemaphore(self.per_device_limit)
+            return self._device_semaphores[device]
+
+    def _read(self, path):
+        with self._device_semaphore(path):
+            with open(path, 'rb') as f:
+                return f.read()
+
+    def __iter__(self):
+        paths = iter(self.paths)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.depth) as executor:
+            pending = collections.deque(
+                (path, executor.submit(self._read, path))
+                for path in itertools.islice(paths, self.depth)
+            )
+            while pending:
+                path, future = pending.popleft()
+
+                # 交出当前文件之前先补满预读窗口
+                next_path = next(paths, None)
+                if next_path is not None:
+                    pending.append((next_path, executor.submit(self._read, next_path)))
+
+                try:
+                    data = future.result()
+                except OSError:
+                    data = None
+                yield path, data
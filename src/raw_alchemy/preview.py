@@ -7,6 +7,7 @@ import colour
 import gc
 import threading
 import os
+import io
 
 import matplotlib
 matplotlib.use('TkAgg')
@@ -15,6 +16,11 @@ from matplotlib.figure import Figure
 
 from raw_alchemy import utils, config
 from raw_alchemy.metering import apply_auto_exposure
+from raw_alchemy.log_curves import encode_log
+from raw_alchemy.luts import apply_lut
+from raw_alchemy.lut_cache import load_lut
+from raw_alchemy.half_float import storage_dtype
+from PIL import Image
 
 
 class PreviewWindow:
@@ -59,6 +65,9 @@ class PreviewWindow:
         self.is_loading = False
         self.is_processing = False
         
+        # 加载代数: 每次加载新文件递增，用于丢弃快速切换文件时旧线程的过期结果
+        self.load_generation = 0
+        
         # 镜头校正缓存参数
         self.cached_lens_params = None
         
@@ -189,15 +198,32 @@ class PreviewWindow:
         self.load_raw_async()
     
     def load_raw_async(self):
-        """异步加载RAW文件"""
+        """
+        异步加载RAW文件
+        
+        先显示 RAW 内嵌的 JPEG 预览 (毫秒级)，再在后台完整解码，完成后替换为处理后的渲染结果。
+        """
+        self.load_generation += 1
+        generation = self.load_generation
+        raw_path = self.raw_path
+        
         self.is_loading = True
         self.status_label.config(text="Loading RAW...", foreground="blue")
         
         def load_thread():
             try:
-                with rawpy.imread(self.raw_path) as raw:
+                with rawpy.imread(raw_path) as raw:
+                    # 首屏: 内嵌预览图，无需解码 RAW
+                    embedded = self.extract_embedded_preview(raw)
+                    if embedded is not None:
+                        self.window.after(0, lambda image=embedded: self.show_embedded_preview(image, generation))
+                    
+                    # 用户已切换到其他文件，跳过昂贵的完整解码
+                    if generation != self.load_generation:
+                        return
+                    
                     # 提取EXIF
-                    self.exif_data = utils.extract_lens_exif(raw, logger=print)
+                    exif_data = utils.extract_lens_exif(raw, logger=print)
                     
                     # 解码RAW - 使用半尺寸解码加快预览速度（速度提升约4倍）
                     prophoto_linear = raw.postprocess(
@@ -212,8 +238,8 @@ class PreviewWindow:
                         half_size=True,  # 半尺寸解码，分辨率减半但速度提升4倍
                     )
                     
-                    # 转为Float32
-                    img = prophoto_linear.astype(np.float32) / 65535.0
+                    # 转为Float32 (单次并行遍历，缩略图此处不需要)
+                    img, _ = utils.decode_to_float32(prophoto_linear)
                     
                     # 缩小图像以加快预览（保持宽高比，最大边1600px）
                     h, w = img.shape[:2]
@@ -225,30 +251,89 @@ class PreviewWindow:
                         from scipy.ndimage import zoom
                         img = zoom(img, (scale, scale, 1), order=1)
                     
-                    self.prophoto_linear = img
+                    # 缓存帧的存储类型 (半精度模式下为 float16，每次刷新时转回 float32 计算)
+                    img = img.astype(storage_dtype(config.DEFAULT_HALF_PRECISION), copy=False)
+                    
                     del prophoto_linear
                     gc.collect()
                     
-                    # 加载完成后刷新预览
-                    self.window.after(0, self.on_raw_loaded)
+                    # 加载完成后刷新预览 (在主线程中提交结果，过期结果直接丢弃)
+                    self.window.after(0, lambda image=img, exif=exif_data: self.on_raw_loaded(image, exif, generation))
                     
             except Exception as e:
                 error_msg = str(e)
                 import traceback
                 traceback.print_exc()
-                self.window.after(0, lambda msg=error_msg: self.on_load_error(msg))
+                self.window.after(0, lambda msg=error_msg: self.on_load_error(msg, generation))
         
         thread = threading.Thread(target=load_thread, daemon=True)
         thread.start()
     
-    def on_raw_loaded(self):
+    @staticmethod
+    def extract_embedded_preview(raw, max_dim=1600):
+        """
+        提取 RAW 内嵌的预览图 (sRGB, uint8)
+        
+        Returns:
+            np.ndarray 或 None (文件没有可用的内嵌预览)
+        """
+        try:
+            thumb = raw.extract_thumb()
+        except Exception:
+            # LibRawNoThumbnailError / LibRawUnsupportedThumbnailError 等: 没有可用的内嵌预览
+            return None
+        
+        if thumb.format == rawpy.ThumbFormat.JPEG:
+            with Image.open(io.BytesIO(thumb.data)) as im:
+                # draft 模式利用 JPEG 的 DCT 缩放直接解码到接近目标尺寸，速度远快于全尺寸解码后再缩放
+                im.draft('RGB', (max_dim, max_dim))
+                im = im.convert('RGB')
+                im.thumbnail((max_dim, max_dim))
+                preview = np.asarray(im)
+        elif thumb.format == rawpy.ThumbFormat.BITMAP:
+            preview = thumb.data
+        else:
+            return None
+        
+        # 内嵌预览通常未旋转，按 RAW 的方向标记 (LibRaw flip) 旋转
+        flip = raw.sizes.flip
+        if flip == 3:
+            preview = np.rot90(preview, 2)
+        elif flip == 5:
+            preview = np.rot90(preview, 1)
+        elif flip == 6:
+            preview = np.rot90(preview, -1)
+        
+        return np.ascontiguousarray(preview)
+    
+    def show_embedded_preview(self, img_uint8, generation):
+        """显示内嵌预览图 (完整渲染就绪前的首屏)"""
+        if generation != self.load_generation or self.prophoto_linear is not None:
+            return
+        try:
+            self.ax.clear()
+            self.ax.axis('off')
+            self.image_obj = self.ax.imshow(img_uint8, interpolation='bilinear')
+            self.fig.tight_layout(pad=0)
+            self.canvas.draw()
+            self.status_label.config(text="Embedded preview (rendering...)", foreground="blue")
+        except Exception as e:
+            print(f"Embedded preview error: {e}")
+    
+    def on_raw_loaded(self, img, exif_data, generation):
         """RAW加载完成的回调"""
+        if generation != self.load_generation:
+            return
+        self.prophoto_linear = img
+        self.exif_data = exif_data
         self.is_loading = False
         self.status_label.config(text="Ready", foreground="green")
         self.refresh_preview()
     
-    def on_load_error(self, error_msg):
+    def on_load_error(self, error_msg, generation):
         """RAW加载失败的回调"""
+        if generation != self.load_generation:
+            return
         self.is_loading = False
         self.status_label.config(text=f"Error: {error_msg}", foreground="red")
     
@@ -278,6 +363,7 @@ class PreviewWindow:
         
         self.is_processing = True
         self.status_label.config(text="Processing...", foreground="orange")
+        generation = self.load_generation
         
         def process_thread():
             try:
@@ -290,12 +376,12 @@ class PreviewWindow:
                 
                 # 如果镜头校正参数变化，需要重新校正
                 if lens_params_changed:
-                    img = self.prophoto_linear.copy()
+                    img = self.prophoto_linear.astype(np.float32)
                     source_cs = colour.RGB_COLOURSPACES['ProPhoto RGB']
                     
                     # 镜头校正
                     if params['lens_correct'] and self.exif_data:
-                        img = utils.apply_lens_correction(
+                        img, _ = utils.apply_lens_correction(
                             img,
                             exif_data=self.exif_data,
                             custom_db_path=params['custom_db_path'],
@@ -303,11 +389,11 @@ class PreviewWindow:
                         )
                     
                     # 缓存校正后的结果
-                    self.prophoto_corrected = img.copy()
+                    self.prophoto_corrected = img.astype(storage_dtype(config.DEFAULT_HALF_PRECISION))
                     self.cached_lens_params = current_lens_params
                 else:
                     # 使用缓存的校正结果
-                    img = self.prophoto_corrected.copy()
+                    img = self.prophoto_corrected.astype(np.float32)
                 
                 source_cs = colour.RGB_COLOURSPACES['ProPhoto RGB']
                 
@@ -341,25 +427,16 @@ class PreviewWindow:
                         img = img.astype(np.float32)
                     utils.apply_matrix_inplace(img, M)
                     
-                    # Log编码
-                    np.maximum(img, 1e-6, out=img)
-                    img = colour.cctf_encoding(img, function=log_curve_name)
+                    # Log编码 (float32 原位，含 1e-6 底噪裁剪)
+                    img = encode_log(img, log_curve_name, floor=1e-6)
                 
                 # 5. 应用LUT
                 lut_path = params['lut_path']
                 if lut_path:
                     try:
-                        lut = colour.read_LUT(lut_path)
-                        if isinstance(lut, colour.LUT3D):
-                            if not img.flags['C_CONTIGUOUS']:
-                                img = np.ascontiguousarray(img)
-                            if img.dtype != np.float32:
-                                img = img.astype(np.float32)
-                            if lut.table.dtype != np.float32:
-                                lut.table = lut.table.astype(np.float32)
-                            utils.apply_lut_inplace(img, lut.table, lut.domain[0], lut.domain[1])
-                        else:
-                            img = lut.apply(img)
+                        # 解析结果按路径和修改时间缓存，拖动滑块时不会重复解析
+                        lut = load_lut(lut_path)
+                        img = apply_lut(img, lut)
                     except Exception as e:
                         print(f"LUT应用错误: {e}")
                 
@@ -367,7 +444,7 @@ class PreviewWindow:
                 img = np.clip(img, 0, 1)
                 
                 # 更新UI
-                self.window.after(0, lambda image=img: self.update_image_display(image))
+                self.window.after(0, lambda image=img: self.update_image_display(image, generation))
                 
             except Exception as e:
                 import traceback
@@ -380,8 +457,10 @@ class PreviewWindow:
         thread = threading.Thread(target=process_thread, daemon=True)
         thread.start()
     
-    def update_image_display(self, img_array):
+    def update_image_display(self, img_array, generation=None):
         """更新图像显示"""
+        if generation is not None and generation != self.load_generation:
+            return
         try:
             # 清除之前的图像
             self.ax.clear()
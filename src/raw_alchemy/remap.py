@@ -0,0 +1,290 @@
+"""
+重映射核函数模块
+按坐标映射对交错存储的 RGB 图像重采样 (镜头畸变/TCA 校正)。
+
+每个输出像素的 R/G/B 各有一组源坐标 (横向色差校正时三者不同)。核函数直接读取交错图像:
+三个通道坐标相同时 (仅畸变校正) 每个抽头一次读出整个 RGB 像素，只计算一次权重；
+横向色差校正时各通道分别在自己的坐标处插值。
+多行并行 (prange)，不需要按通道切片，也不产生 float64 坐标数组。
+坐标可以是稠密映射 (remap_rgb)，也可以是稀疏网格，在核函数内插值 (remap_rgb_grid)。
+传入暗角增益曲线 (vignetting.radial_profile) 时，在每个通道的源坐标处乘上暗角增益，
+暗角校正与重采样在同一次遍历中完成 (增益场很平滑，与先校正源图像再插值的结果差异可忽略)。
+
+插值方式:
+    bilinear  双线性 (2x2)
+    bicubic   Keys 三次卷积 (a=-0.5, 4x4)
+    lanczos   Lanczos-3 (6x6，权重归一化，按 1/1024 像素查表)
+源坐标超出图像范围 [0, size-1] 的输出为 0；边界附近的抽头按边缘像素延伸。
+"""
+import numpy as np
+from numba import njit, prange
+
+from raw_alchemy.half_float import load_float32, to_storage
+from raw_alchemy.vignetting import profile_gain
+
+INTERPOLATIONS = ('bilinear', 'bicubic', 'lanczos')
+
+# 核函数内的插值方式编号 (与 INTERPOLATIONS 的顺序一致)
+INTERP_BILINEAR = 0
+INTERP_BICUBIC = 1
+INTERP_LANCZOS = 2
+
+# Lanczos-3 权重表: 小数位置按 1/LANCZOS_TABLE_STEPS 像素取最近项 (位置误差不超过 1/2048 像素)，
+# 避免每个采样点 6 次三角函数
+LANCZOS_TABLE_STEPS = 1024
+
+
+def _lanczos_table(steps: int) -> np.ndarray:
+    """(steps + 1, 6) 归一化权重，第 k 行对应小数位置 t = k / steps，抽头距离为 t+2 .. t-3"""
+    t = np.arange(steps + 1, dtype=np.float64) / steps
+    d = t[:, None] + 2.0 - np.arange(6)[None, :]
+    weights = np.sinc(d) * np.sinc(d / 3.0)
+    return (weights / weights.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+_LANCZOS_TABLE = _lanczos_table(LANCZOS_TABLE_STEPS)
+
+
+def interpolation_index(interpolation: str) -> int:
+    """插值方式名称 -> 核函数编号"""
+    if interpolation not in INTERPOLATIONS:
+        raise ValueError(f"Unknown interpolation: {interpolation} (expected one of {', '.join(INTERPOLATIONS)})")
+    return INTERPOLATIONS.index(interpolation)
+
+
+@njit(inline='always', cache=True)
+def _cubic_weights(t):
+    """Keys 三次卷积权重 (a=-0.5)，抽头距离为 1+t, t, 1-t, 2-t"""
+    t2 = t * t
+    t3 = t2 * t
+    w0 = -0.5 * t3 + t2 - 0.5 * t
+    w1 = 1.5 * t3 - 2.5 * t2 + 1.0
+    w2 = -1.5 * t3 + 2.0 * t2 + 0.5 * t
+    w3 = 0.5 * t3 - 0.5 * t2
+    return w0, w1, w2, w3
+
+
+@njit(inline='always', cache=True)
+def _lanczos_weights(t):
+    """Lanczos-3 权重 (查表)，抽头距离为 t+2, t+1, t, t-1, t-2, t-3"""
+    k = int(t * LANCZOS_TABLE_STEPS + 0.5)
+    return (_LANCZOS_TABLE[k, 0], _LANCZOS_TABLE[k, 1], _LANCZOS_TABLE[k, 2],
+            _LANCZOS_TABLE[k, 3], _LANCZOS_TABLE[k, 4], _LANCZOS_TABLE[k, 5])
+
+
+@njit(inline='always', cache=True)
+def _weights(x, y, method, height, width):
+    """
+    插值抽头: 返回 (x0, y0, taps, wx, wy)，抽头为 x0..x0+taps-1 / y0..y0+taps-1，
+    wx / wy 为长度 6 的权重元组 (多余项为 0)
+    """
+    ix = int(x)
+    iy = int(y)
+    tx = x - ix
+    ty = y - iy
+
+    if method == INTERP_BILINEAR:
+        wx = (1.0 - tx, tx, 0.0, 0.0, 0.0, 0.0)
+        wy = (1.0 - ty, ty, 0.0, 0.0, 0.0, 0.0)
+        return ix, iy, 2, wx, wy
+    if method == INTERP_BICUBIC:
+        cx = _cubic_weights(tx)
+        cy = _cubic_weights(ty)
+        wx = (cx[0], cx[1], cx[2], cx[3], 0.0, 0.0)
+        wy = (cy[0], cy[1], cy[2], cy[3], 0.0, 0.0)
+        return ix - 1, iy - 1, 4, wx, wy
+    return ix - 2, iy - 2, 6, _lanczos_weights(tx), _lanczos_weights(ty)
+
+
+@njit(inline='always', cache=True)
+def _inside(x, y, height, width):
+    """源坐标是否在 [0, size-1] 内 (NaN 视为超出)"""
+    return x >= 0.0 and x <= width - 1 and y >= 0.0 and y <= height - 1
+
+
+@njit(inline='always', cache=True)
+def sample_rgb(src, x, y, method):
+    """在源坐标 (x, y) 处插值整个 RGB 像素 (每个抽头一次读出三个通道)；坐标超出图像时返回 0"""
+    height, width = src.shape[0], src.shape[1]
+    if not _inside(x, y, height, width):
+        return 0.0, 0.0, 0.0
+    x0, y0, taps, wx, wy = _weights(x, y, method, height, width)
+
+    r = 0.0
+    g = 0.0
+    b = 0.0
+    for j in range(taps):
+        yj = min(max(y0 + j, 0), height - 1)
+        rr = 0.0
+        gg = 0.0
+        bb = 0.0
+        for i in range(taps):
+            xi = min(max(x0 + i, 0), width - 1)
+            w = wx[i]
+            rr += w * load_float32(src[yj, xi, 0])
+            gg += w * load_float32(src[yj, xi, 1])
+            bb += w * load_float32(src[yj, xi, 2])
+        w = wy[j]
+        r += w * rr
+        g += w * gg
+        b += w * bb
+    return r, g, b
+
+
+@njit(inline='always', cache=True)
+def sample_channel(src, x, y, c, method):
+    """在源坐标 (x, y) 处插值通道 c (横向色差校正时各通道坐标不同)；坐标超出图像时返回 0"""
+    height, width = src.shape[0], src.shape[1]
+    if not _inside(x, y, height, width):
+        return 0.0
+    x0, y0, taps, wx, wy = _weights(x, y, method, height, width)
+
+    v = 0.0
+    for j in range(taps):
+        yj = min(max(y0 + j, 0), height - 1)
+        vv = 0.0
+        for i in range(taps):
+            xi = min(max(x0 + i, 0), width - 1)
+            vv += wx[i] * load_float32(src[yj, xi, c])
+        v += wy[j] * vv
+    return v
+
+
+# fastmath 去掉 nnan/ninf: 坐标可能为 NaN (超出投影范围)，越界判断必须保留对 NaN 的比较
+REMAP_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+
+@njit(inline='always', cache=True)
+def _remap_pixel(src, dst, i, j, xr, yr, xg, yg, xb, yb, method, vignette, cx, cy):
+    """按三个通道的源坐标插值并写入 dst[i, j] (vignette 不为 None 时乘上源坐标处的暗角增益)"""
+    if xg == xr and yg == yr and xb == xr and yb == yr:
+        r, g, b = sample_rgb(src, xr, yr, method)
+        if vignette is not None:
+            v = profile_gain(vignette, xr, yr, cx, cy)
+            r *= v
+            g *= v
+            b *= v
+    else:
+        # 横向色差: 各通道在自己的坐标处插值
+        r = sample_channel(src, xr, yr, 0, method)
+        g = sample_channel(src, xg, yg, 1, method)
+        b = sample_channel(src, xb, yb, 2, method)
+        if vignette is not None:
+            r *= profile_gain(vignette, xr, yr, cx, cy)
+            g *= profile_gain(vignette, xg, yg, cx, cy)
+            b *= profile_gain(vignette, xb, yb, cx, cy)
+
+    dst[i, j, 0] = to_storage(np.float32(r), dst)
+    dst[i, j, 1] = to_storage(np.float32(g), dst)
+    dst[i, j, 2] = to_storage(np.float32(b), dst)
+
+
+@njit(parallel=True, fastmath=REMAP_FASTMATH, cache=True)
+def remap_rgb(src, coords, dst, method, vignette=None, cx=0.0, cy=0.0):
+    """
+    按坐标映射重采样 RGB 图像
+
+    Args:
+        src: 源图像 (H, W, 3)，float32 或 float16 的位模式视图 (见 half_float.storage_view)
+        coords: (rows, width, 3, 2) float32 源坐标，[..., c, 0] 为通道 c 的 x，[..., c, 1] 为 y
+        dst: 输出 (rows, width, 3)，float32 或 float16 位模式视图
+        method: 插值方式编号 (INTERP_*)
+        vignette: 暗角增益曲线 (None=不做暗角校正)，cx / cy 为曲线圆心 (vignetting.profile_center)
+    """
+    rows, cols = dst.shape[0], dst.shape[1]
+    for i in prange(rows):
+        for j in range(cols):
+            _remap_pixel(
+                src, dst, i, j,
+                coords[i, j, 0, 0], coords[i, j, 0, 1],
+                coords[i, j, 1, 0], coords[i, j, 1, 1],
+                coords[i, j, 2, 0], coords[i, j, 2, 1],
+                method, vignette, cx, cy,
+            )
+
+
+# ============================================================================
+# 稀疏网格坐标
+# ============================================================================
+# 畸变场很平滑，可以只在每隔 step 像素的网格点上计算坐标 (grid[gy, gx] 为像素 (gx*step, gy*step)
+# 的源坐标)，核函数内双线性插值得到每个像素的坐标。网格覆盖到最后一行/列 (末端网格点可超出图像)。
+
+
+def grid_shape(width: int, height: int, step: int):
+    """覆盖 width x height 图像的网格点数 (gw, gh)，每个方向至少 2 个"""
+    return max(-(-(width - 1) // step) + 1, 2), max(-(-(height - 1) // step) + 1, 2)
+
+
+@njit(inline='always', cache=True)
+def _grid_cell(pos, inv_step, n):
+    """像素坐标 -> (网格单元起点, 单元内位置)，最后一个单元包含末端网格点"""
+    g = pos * inv_step
+    g0 = min(int(g), n - 2)
+    return g0, g - g0
+
+
+@njit(inline='always', cache=True)
+def _grid_value(grid, gy0, gx0, w00, w01, w10, w11, c, k):
+    return (w00 * grid[gy0, gx0, c, k] + w01 * grid[gy0, gx0 + 1, c, k]
+            + w10 * grid[gy0 + 1, gx0, c, k] + w11 * grid[gy0 + 1, gx0 + 1, c, k])
+
+
+@njit(parallel=True, fastmath=REMAP_FASTMATH, cache=True)
+def remap_rgb_grid(src, grid, step, y0, dst, method, vignette=None, cx=0.0, cy=0.0):
+    """
+    按稀疏网格坐标重采样 RGB 图像 (坐标在核函数内由网格双线性插值得到，不分配整幅坐标)
+
+    Args:
+        src: 源图像 (H, W, 3)，float32 或 float16 的位模式视图
+        grid: (gh, gw, 3, 2) float32 网格点源坐标 (见 grid_shape)
+        step: 网格间距 (像素)
+        y0: dst 第一行在整幅输出中的行号 (按行带处理时)
+        dst: 输出 (rows, width, 3)
+        method: 插值方式编号 (INTERP_*)
+        vignette: 暗角增益曲线 (None=不做暗角校正)，cx / cy 为曲线圆心
+    """
+    rows, cols = dst.shape[0], dst.shape[1]
+    gh, gw = grid.shape[0], grid.shape[1]
+    inv_step = 1.0 / step
+    for i in prange(rows):
+        gy0, fy = _grid_cell(y0 + i, inv_step, gh)
+        for j in range(cols):
+            gx0, fx = _grid_cell(j, inv_step, gw)
+            w00 = (1.0 - fy) * (1.0 - fx)
+            w01 = (1.0 - fy) * fx
+            w10 = fy * (1.0 - fx)
+            w11 = fy * fx
+            _remap_pixel(
+                src, dst, i, j,
+                _grid_value(grid, gy0, gx0, w00, w01, w10, w11, 0, 0),
+                _grid_value(grid, gy0, gx0, w00, w01, w10, w11, 0, 1),
+                _grid_value(grid, gy0, gx0, w00, w01, w10, w11, 1, 0),
+                _grid_value(grid, gy0, gx0, w00, w01, w10, w11, 1, 1),
+                _grid_value(grid, gy0, gx0, w00, w01, w10, w11, 2, 0),
+                _grid_value(grid, gy0, gx0, w00, w01, w10, w11, 2, 1),
+                method, vignette, cx, cy,
+            )
+
+
+@njit(parallel=True, cache=True)
+def grid_to_coords(grid, step, y0, rows, width):
+    """
+    由网格插值出第 [y0, y0 + rows) 行的稠密坐标 (rows, width, 3, 2)
+
+    与 remap_rgb_grid 内的插值相同，用于与 Lensfun 的稠密坐标比较误差。
+    """
+    coords = np.empty((rows, width, 3, 2), dtype=np.float32)
+    gh, gw = grid.shape[0], grid.shape[1]
+    inv_step = 1.0 / step
+    for i in prange(rows):
+        gy0, fy = _grid_cell(y0 + i, inv_step, gh)
+        for j in range(width):
+            gx0, fx = _grid_cell(j, inv_step, gw)
+            w00 = (1.0 - fy) * (1.0 - fx)
+            w01 = (1.0 - fy) * fx
+            w10 = fy * (1.0 - fx)
+            w11 = fy * fx
+            for c in range(3):
+                for k in range(2):
+                    coords[i, j, c, k] = _grid_value(grid, gy0, gx0, w00, w01, w10, w11, c, k)
+    return coords
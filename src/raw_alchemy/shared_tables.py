@@ -0,0 +1,64 @@
+"""
+只读共享表格模块
+批处理主进程把每个数组写入私有临时目录下的未压缩 .npy 文件 (只写一次)，
+工作进程以只读方式内存映射，所有进程读取同一份页缓存，不必各自解析、各持一份副本。
+使用内存映射文件而不是 multiprocessing.shared_memory: fork 和 spawn 启动方式都可用，
+也不会留下让 resource tracker 报警的残留对象。
+"""
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# 工作进程: 描述符中的目录 -> 已挂载的数组 (在进程生命周期内保留)
+_attached = {}
+
+
+class SharedTables:
+    """
+    向工作进程发布一组数组 (主进程调用)
+
+    descriptor 是可 pickle 的小字典，传给工作进程后由 attach_tables() 挂载。
+    所有工作进程结束后调用 close() (或作为上下文管理器使用) 删除文件。
+    """
+
+    def __init__(self, arrays: dict, meta: dict = None, directory: str = None):
+        self.directory = tempfile.mkdtemp(prefix='raw_alchemy_tables_', dir=directory)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(self.directory, f"{name}.npy"), np.ascontiguousarray(array))
+        except BaseException:
+            self.close()
+            raise
+        self.nbytes = sum(np.asarray(array).nbytes for array in arrays.values())
+        self.descriptor = {'directory': self.directory, 'names': list(arrays), 'meta': dict(meta or {})}
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach_tables(descriptor: dict):
+    """
+    挂载 SharedTables 发布的数组 (工作进程调用)
+
+    Returns:
+        (arrays, meta): 按名称索引的只读内存映射视图，以及元数据字典。
+        同一进程内再次挂载相同的描述符时复用已有的映射。
+    """
+    directory = descriptor['directory']
+    arrays = _attached.get(directory)
+    if arrays is None:
+        arrays = {
+            # 转为普通 ndarray 视图: Numba 不接受 np.memmap 子类
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='r').view(np.ndarray)
+            for name in descriptor['names']
+        }
+        _attached[directory] = arrays
+    return arrays, descriptor['meta']
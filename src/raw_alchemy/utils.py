@@ -1,9 +1,12 @@
 import os
 import sys
-from typing import Optional
+from typing import Optional, Tuple
 import rawpy
 import numpy as np
 from raw_alchemy import lensfun_wrapper as lf
+from raw_alchemy.log_curves import log_encode_value
+from raw_alchemy.luts import _sample_lut_chain
+from raw_alchemy.half_float import load_float32, to_storage, storage_view
 from numba import njit, prange
 
 
@@ -15,6 +18,15 @@ def resource_path(relative_path):
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
 
+def get_cache_dir(subdir=None):
+    """
+    持久化缓存根目录 (LUT 解析缓存等)
+
+    优先使用环境变量 RAW_ALCHEMY_CACHE_DIR，否则为 ~/.cache/raw_alchemy。
+    """
+    base = os.environ.get('RAW_ALCHEMY_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'raw_alchemy')
+    return os.path.join(base, subdir) if subdir else base
+
 # =========================================================
 # Numba 加速核函数 (In-Place / 无内存分配)
 # =========================================================
@@ -51,259 +63,6 @@ def apply_matrix_inplace(img, matrix):
         flat_img[i, 1] = r * m10 + g * m11 + b * m12
         flat_img[i, 2] = r * m20 + g * m21 + b * m22
 
-@njit(parallel=True, fastmath=True, cache=True)
-def apply_lut_inplace(img, lut_table, domain_min, domain_max):
-    """
-    高性能原位四面体插值 (Tetrahedral Interpolation)
-    
-    优势:
-    1. 内存访问减少 50% (只读 4 个点，而不是 8 个)
-    2. 色彩精度更高，特别是对于灰阶和肤色
-    3. 使用了显式的 6 种情况分支，编译器通常能将其优化为高效的跳转表
-    """
-    # ---------------------------
-    # 1. 数据准备与打平
-    # ---------------------------
-    if img.ndim == 2:
-        n_pixels = img.shape[0]
-        flat_img = img.reshape(n_pixels, 1) # 防御性代码
-    else:
-        rows, cols, _ = img.shape
-        n_pixels = rows * cols
-        flat_img = img.reshape(n_pixels, 3)
-
-    # 预计算常量
-    size = lut_table.shape[0]
-    size_minus_1 = size - 1
-    size_float = float(size_minus_1)
-    
-    scale_r = size_minus_1 / (domain_max[0] - domain_min[0])
-    scale_g = size_minus_1 / (domain_max[1] - domain_min[1])
-    scale_b = size_minus_1 / (domain_max[2] - domain_min[2])
-    
-    min_r, min_g, min_b = domain_min[0], domain_min[1], domain_min[2]
-
-    # ---------------------------
-    # 2. 并行像素循环
-    # ---------------------------
-    for i in prange(n_pixels):
-        # --- A. 坐标归一化 ---
-        in_r = flat_img[i, 0]
-        in_g = flat_img[i, 1]
-        in_b = flat_img[i, 2]
-
-        raw_idx_r = (in_r - min_r) * scale_r
-        raw_idx_g = (in_g - min_g) * scale_g
-        raw_idx_b = (in_b - min_b) * scale_b
-
-        # 钳位 (Clamping)
-        idx_r = min(max(raw_idx_r, 0.0), size_float)
-        idx_g = min(max(raw_idx_g, 0.0), size_float)
-        idx_b = min(max(raw_idx_b, 0.0), size_float)
-
-        # --- B. 计算整数坐标 (x0) 和 小数部分 (d) ---
-        x0 = int(idx_r)
-        y0 = int(idx_g)
-        z0 = int(idx_b)
-
-        # 边界保护：确保 x1 不会越界
-        # 注意：如果 x0 已经是 size_minus_1，x1 应该保持 size_minus_1
-        x1 = x0 + 1
-        if x0 == size_minus_1: x1 = x0
-        
-        y1 = y0 + 1
-        if y0 == size_minus_1: y1 = y0
-        
-        z1 = z0 + 1
-        if z0 == size_minus_1: z1 = z0
-
-        # 计算权重 (Delta)
-        dx = idx_r - x0
-        dy = idx_g - y0
-        dz = idx_b - z0
-
-        # --- C. 四面体判定逻辑 (Tetrahedral Logic) ---
-        # 我们需要找到包围该点的 4 个顶点。
-        # P0 (x0, y0, z0) 和 P3 (x1, y1, z1) 总是存在的。
-        # 剩下的 P1 和 P2 取决于 dx, dy, dz 的大小关系。
-        
-        # 定义临时变量用于存储插值结果
-        r_val = 0.0
-        g_val = 0.0
-        b_val = 0.0
-
-        # 读取基础点 P0 (Base) 和 对角点 P3 (Opposite)
-        # 这样写虽然代码长，但比用数组存储 P1, P2 更快，因为直接操作寄存器
-        
-        # 优化技巧：我们在 if 分支里直接读取 LUT 并计算，避免不必要的内存读取
-        
-        if dx >= dy:
-            if dy >= dz:
-                # Case 1: dx >= dy >= dz
-                # P1=(1,0,0), P2=(1,1,0)
-                # Weights: (1-dx), (dx-dy), (dy-dz), dz
-                
-                # P0
-                w0 = 1.0 - dx
-                c_r = lut_table[x0, y0, z0, 0] * w0
-                c_g = lut_table[x0, y0, z0, 1] * w0
-                c_b = lut_table[x0, y0, z0, 2] * w0
-                
-                # P1 (x+1, y, z)
-                w1 = dx - dy
-                c_r += lut_table[x1, y0, z0, 0] * w1
-                c_g += lut_table[x1, y0, z0, 1] * w1
-                c_b += lut_table[x1, y0, z0, 2] * w1
-                
-                # P2 (x+1, y+1, z)
-                w2 = dy - dz
-                c_r += lut_table[x1, y1, z0, 0] * w2
-                c_g += lut_table[x1, y1, z0, 1] * w2
-                c_b += lut_table[x1, y1, z0, 2] * w2
-                
-                # P3 (x+1, y+1, z+1) -> Weight is dz
-                c_r += lut_table[x1, y1, z1, 0] * dz
-                c_g += lut_table[x1, y1, z1, 1] * dz
-                c_b += lut_table[x1, y1, z1, 2] * dz
-
-                r_val, g_val, b_val = c_r, c_g, c_b
-
-            elif dx >= dz:
-                # Case 2: dx >= dz > dy
-                # P1=(1,0,0), P2=(1,0,1)
-                # Weights: (1-dx), (dx-dz), (dz-dy), dy
-                
-                w0 = 1.0 - dx
-                c_r = lut_table[x0, y0, z0, 0] * w0
-                c_g = lut_table[x0, y0, z0, 1] * w0
-                c_b = lut_table[x0, y0, z0, 2] * w0
-                
-                w1 = dx - dz
-                c_r += lut_table[x1, y0, z0, 0] * w1
-                c_g += lut_table[x1, y0, z0, 1] * w1
-                c_b += lut_table[x1, y0, z0, 2] * w1
-                
-                w2 = dz - dy
-                c_r += lut_table[x1, y0, z1, 0] * w2
-                c_g += lut_table[x1, y0, z1, 1] * w2
-                c_b += lut_table[x1, y0, z1, 2] * w2
-                
-                c_r += lut_table[x1, y1, z1, 0] * dy
-                c_g += lut_table[x1, y1, z1, 1] * dy
-                c_b += lut_table[x1, y1, z1, 2] * dy
-                
-                r_val, g_val, b_val = c_r, c_g, c_b
-                
-            else:
-                # Case 3: dz > dx >= dy
-                # P1=(0,0,1), P2=(1,0,1)
-                # Weights: (1-dz), (dz-dx), (dx-dy), dy
-                
-                w0 = 1.0 - dz
-                c_r = lut_table[x0, y0, z0, 0] * w0
-                c_g = lut_table[x0, y0, z0, 1] * w0
-                c_b = lut_table[x0, y0, z0, 2] * w0
-                
-                w1 = dz - dx
-                c_r += lut_table[x0, y0, z1, 0] * w1
-                c_g += lut_table[x0, y0, z1, 1] * w1
-                c_b += lut_table[x0, y0, z1, 2] * w1
-                
-                w2 = dx - dy
-                c_r += lut_table[x1, y0, z1, 0] * w2
-                c_g += lut_table[x1, y0, z1, 1] * w2
-                c_b += lut_table[x1, y0, z1, 2] * w2
-                
-                c_r += lut_table[x1, y1, z1, 0] * dy
-                c_g += lut_table[x1, y1, z1, 1] * dy
-                c_b += lut_table[x1, y1, z1, 2] * dy
-
-                r_val, g_val, b_val = c_r, c_g, c_b
-
-        else: # dy > dx
-            if dz >= dy:
-                # Case 6: dz > dy > dx
-                # P1=(0,0,1), P2=(0,1,1)
-                # Weights: (1-dz), (dz-dy), (dy-dx), dx
-                
-                w0 = 1.0 - dz
-                c_r = lut_table[x0, y0, z0, 0] * w0
-                c_g = lut_table[x0, y0, z0, 1] * w0
-                c_b = lut_table[x0, y0, z0, 2] * w0
-                
-                w1 = dz - dy
-                c_r += lut_table[x0, y0, z1, 0] * w1
-                c_g += lut_table[x0, y0, z1, 1] * w1
-                c_b += lut_table[x0, y0, z1, 2] * w1
-                
-                w2 = dy - dx
-                c_r += lut_table[x0, y1, z1, 0] * w2
-                c_g += lut_table[x0, y1, z1, 1] * w2
-                c_b += lut_table[x0, y1, z1, 2] * w2
-                
-                c_r += lut_table[x1, y1, z1, 0] * dx
-                c_g += lut_table[x1, y1, z1, 1] * dx
-                c_b += lut_table[x1, y1, z1, 2] * dx
-                
-                r_val, g_val, b_val = c_r, c_g, c_b
-
-            elif dz >= dx:
-                # Case 5: dy >= dz > dx
-                # P1=(0,1,0), P2=(0,1,1)
-                # Weights: (1-dy), (dy-dz), (dz-dx), dx
-                
-                w0 = 1.0 - dy
-                c_r = lut_table[x0, y0, z0, 0] * w0
-                c_g = lut_table[x0, y0, z0, 1] * w0
-                c_b = lut_table[x0, y0, z0, 2] * w0
-                
-                w1 = dy - dz
-                c_r += lut_table[x0, y1, z0, 0] * w1
-                c_g += lut_table[x0, y1, z0, 1] * w1
-                c_b += lut_table[x0, y1, z0, 2] * w1
-                
-                w2 = dz - dx
-                c_r += lut_table[x0, y1, z1, 0] * w2
-                c_g += lut_table[x0, y1, z1, 1] * w2
-                c_b += lut_table[x0, y1, z1, 2] * w2
-                
-                c_r += lut_table[x1, y1, z1, 0] * dx
-                c_g += lut_table[x1, y1, z1, 1] * dx
-                c_b += lut_table[x1, y1, z1, 2] * dx
-                
-                r_val, g_val, b_val = c_r, c_g, c_b
-
-            else:
-                # Case 4: dy > dx >= dz
-                # P1=(0,1,0), P2=(1,1,0)
-                # Weights: (1-dy), (dy-dx), (dx-dz), dz
-                
-                w0 = 1.0 - dy
-                c_r = lut_table[x0, y0, z0, 0] * w0
-                c_g = lut_table[x0, y0, z0, 1] * w0
-                c_b = lut_table[x0, y0, z0, 2] * w0
-                
-                w1 = dy - dx
-                c_r += lut_table[x0, y1, z0, 0] * w1
-                c_g += lut_table[x0, y1, z0, 1] * w1
-                c_b += lut_table[x0, y1, z0, 2] * w1
-                
-                w2 = dx - dz
-                c_r += lut_table[x1, y1, z0, 0] * w2
-                c_g += lut_table[x1, y1, z0, 1] * w2
-                c_b += lut_table[x1, y1, z0, 2] * w2
-                
-                c_r += lut_table[x1, y1, z1, 0] * dz
-                c_g += lut_table[x1, y1, z1, 1] * dz
-                c_b += lut_table[x1, y1, z1, 2] * dz
-
-                r_val, g_val, b_val = c_r, c_g, c_b
-
-        # 写入最终结果
-        flat_img[i, 0] = r_val
-        flat_img[i, 1] = g_val
-        flat_img[i, 2] = b_val
-
 @njit(parallel=True, fastmath=True)
 def apply_saturation_contrast_inplace(img, saturation, contrast, pivot, luma_coeffs):
     """
@@ -353,6 +112,35 @@ def apply_gain_inplace(img, gain):
             img[r, c, 1] *= gain
             img[r, c, 2] *= gain
 
+@njit(parallel=True, fastmath=True, cache=True)
+def convert_uint16_to_float32(src, dst, thumb, step, scale):
+    """
+    单次并行遍历: uint16 解码结果 -> 归一化 float32 (写入预分配的 dst)
+
+    同时按步长 step 抽取测光用缩略图 (等价于 src[::step, ::step] 的 float32 版本)，
+    测光阶段无需再跨步遍历整张大图。
+    峰值内存只有 uint16 原图 + float32 结果，不再有 astype 和除法产生的临时数组。
+    dst 也可以是 float16 工作帧的位模式视图 (见 half_float.storage_view)，缩略图始终为 float32。
+    """
+    rows, cols, _ = src.shape
+    t_rows, t_cols, _ = thumb.shape
+
+    for r in prange(rows):
+        for c in range(cols):
+            dst[r, c, 0] = to_storage(src[r, c, 0] * scale, dst)
+            dst[r, c, 1] = to_storage(src[r, c, 1] * scale, dst)
+            dst[r, c, 2] = to_storage(src[r, c, 2] * scale, dst)
+
+        # 缩略图行: 直接从刚写入 (仍在缓存中) 的行里抽取
+        if r % step == 0:
+            tr = r // step
+            if tr < t_rows:
+                for tc in range(t_cols):
+                    c = tc * step
+                    thumb[tr, tc, 0] = load_float32(dst[r, c, 0])
+                    thumb[tr, tc, 1] = load_float32(dst[r, c, 1])
+                    thumb[tr, tc, 2] = load_float32(dst[r, c, 2])
+
 @njit(parallel=True, fastmath=True, cache=True)
 def bt709_to_srgb_inplace(img):
     """
@@ -389,6 +177,165 @@ def bt709_to_srgb_inplace(img):
                 
                 img[r, c, ch] = result
 
+@njit(parallel=True, fastmath=True, cache=True)
+def compute_luminance_stats(img, step, luma_coeffs, grid_rows, grid_cols,
+                            hist_bins, hist_log2_min, hist_log2_max, n_chunks):
+    """
+    单次并行遍历计算测光所需的全部统计量 (跨步读取，不复制采样视图)
+
+    坐标均以采样图 img[::step, ::step] 为准:
+    1. 对数平均亮度: sum(log(max(Y, 1e-10) + 1e-6))
+    2. 三通道最大值的 log2 直方图 (固定分箱)，用于 p90/p99 查询，无需排序
+    3. grid_rows x grid_cols 网格的亮度和 (每格 h//grid_rows 行，与切片测光一致，余数像素不计入)
+    4. 中央重点高斯加权亮度和 (sigma = min(h, w) / 2)
+
+    n_chunks 为并行分块数 (每块持有独立的部分和，最后归约，避免线程间竞争)。
+
+    Returns:
+        (log_sum, count, max_hist, grid_sum, grid_count, cw_sum, cw_weight)
+    """
+    rows, cols, _ = img.shape
+    h = (rows + step - 1) // step
+    w = (cols + step - 1) // step
+    cr, cg, cb = luma_coeffs[0], luma_coeffs[1], luma_coeffs[2]
+
+    cell_h = h // grid_rows
+    cell_w = w // grid_cols
+
+    center_y = h / 2.0
+    center_x = w / 2.0
+    sigma = min(h, w) / 2.0
+    inv_two_sigma_sq = 1.0 / (2.0 * sigma * sigma)
+
+    # 高斯权重可分离: exp(-(dx²+dy²)k) = exp(-dx²k) * exp(-dy²k)，列权重预先算好
+    col_weights = np.empty(w)
+    for sx in range(w):
+        col_weights[sx] = np.exp(-((sx - center_x) ** 2) * inv_two_sigma_sq)
+
+    bin_scale = hist_bins / (hist_log2_max - hist_log2_min)
+
+    n_chunks = max(1, min(h, n_chunks))
+    chunk_rows = (h + n_chunks - 1) // n_chunks
+
+    log_sums = np.zeros(n_chunks)
+    cw_sums = np.zeros(n_chunks)
+    cw_weights = np.zeros(n_chunks)
+    hists = np.zeros((n_chunks, hist_bins), dtype=np.int64)
+    grid_sums = np.zeros((n_chunks, grid_rows, grid_cols))
+    grid_counts = np.zeros((n_chunks, grid_rows, grid_cols), dtype=np.int64)
+
+    for t in prange(n_chunks):
+        y_start = t * chunk_rows
+        y_end = min(y_start + chunk_rows, h)
+        for sy in range(y_start, y_end):
+            r = sy * step
+            gy = sy // cell_h if cell_h > 0 else grid_rows
+            row_weight = np.exp(-((sy - center_y) ** 2) * inv_two_sigma_sq)
+            for sx in range(w):
+                c = sx * step
+                rv = img[r, c, 0]
+                gv = img[r, c, 1]
+                bv = img[r, c, 2]
+
+                lum = rv * cr + gv * cg + bv * cb
+
+                # 1. 对数平均
+                log_sums[t] += np.log(max(lum, 1e-10) + 1e-6)
+
+                # 2. 最大通道直方图 (log2 分箱，<= 下限的值落入第 0 箱)
+                m = max(rv, max(gv, bv))
+                if m > 0.0:
+                    b = int((np.log2(m) - hist_log2_min) * bin_scale)
+                    if b < 0:
+                        b = 0
+                    elif b >= hist_bins:
+                        b = hist_bins - 1
+                else:
+                    b = 0
+                hists[t, b] += 1
+
+                # 3. 网格
+                if gy < grid_rows and cell_w > 0:
+                    gx = sx // cell_w
+                    if gx < grid_cols:
+                        grid_sums[t, gy, gx] += lum
+                        grid_counts[t, gy, gx] += 1
+
+                # 4. 中央重点
+                wgt = row_weight * col_weights[sx]
+                cw_sums[t] += lum * wgt
+                cw_weights[t] += wgt
+
+    return (
+        log_sums.sum(),
+        h * w,
+        hists.sum(axis=0),
+        grid_sums.sum(axis=0),
+        grid_counts.sum(axis=0),
+        cw_sums.sum(),
+        cw_weights.sum(),
+    )
+
+@njit(parallel=True, fastmath=True, cache=True)
+def render_fused(src, dst, gain, saturation, contrast, pivot, luma_coeffs, matrix,
+                 log_params, lut_chain, out_scale):
+    """
+    融合渲染核: 每个像素只读一次、写一次
+
+    依次完成 (与参考管线逐步调用的顺序和数学一致):
+    1. 曝光增益
+    2. 饱和度 / 对比度 (负值裁剪为 0)
+    3. Gamut 矩阵
+    4. Log 编码 (下限 1e-6，log_params 见 log_curves.get_log_curve_params)
+    5. 创意 LUT 查表链 (前置 1D -> 3D 四面体插值 -> 后置 1D，lut_chain 见 luts.LUTChain.kernel_args)
+    6. 裁剪到 [0, 1] 并量化写入 dst (uint16: out_scale=65535, uint8: out_scale=255)
+    """
+    rows, cols, _ = src.shape
+    cr, cg, cb = luma_coeffs[0], luma_coeffs[1], luma_coeffs[2]
+    m00, m01, m02 = matrix[0, 0], matrix[0, 1], matrix[0, 2]
+    m10, m11, m12 = matrix[1, 0], matrix[1, 1], matrix[1, 2]
+    m20, m21, m22 = matrix[2, 0], matrix[2, 1], matrix[2, 2]
+
+    floor = np.float32(1e-6)
+
+    (pre_table, pre_min, pre_scale, cube, cube_min, cube_scale, cube_dequant,
+     post_table, post_min, post_scale, has_pre, has_cube, has_post) = lut_chain
+
+    for r in prange(rows):
+        for c in range(cols):
+            # 1. 增益
+            r_val = load_float32(src[r, c, 0]) * gain
+            g_val = load_float32(src[r, c, 1]) * gain
+            b_val = load_float32(src[r, c, 2]) * gain
+
+            # 2. 饱和度 & 对比度
+            lum = r_val * cr + g_val * cg + b_val * cb
+            r_val = max((lum + (r_val - lum) * saturation - pivot) * contrast + pivot, 0.0)
+            g_val = max((lum + (g_val - lum) * saturation - pivot) * contrast + pivot, 0.0)
+            b_val = max((lum + (b_val - lum) * saturation - pivot) * contrast + pivot, 0.0)
+
+            # 3. Gamut 矩阵
+            r_m = r_val * m00 + g_val * m01 + b_val * m02
+            g_m = r_val * m10 + g_val * m11 + b_val * m12
+            b_m = r_val * m20 + g_val * m21 + b_val * m22
+
+            # 4. Log 编码
+            r_val = log_encode_value(max(r_m, floor), log_params)
+            g_val = log_encode_value(max(g_m, floor), log_params)
+            b_val = log_encode_value(max(b_m, floor), log_params)
+
+            # 5. 创意 LUT
+            r_val, g_val, b_val = _sample_lut_chain(
+                r_val, g_val, b_val,
+                pre_table, pre_min, pre_scale, cube, cube_min, cube_scale, cube_dequant,
+                post_table, post_min, post_scale, has_pre, has_cube, has_post,
+            )
+
+            # 6. 裁剪 & 量化 (截断取整，与参考管线的 astype 一致)
+            dst[r, c, 0] = int(min(max(r_val, 0.0), 1.0) * out_scale)
+            dst[r, c, 1] = int(min(max(g_val, 0.0), 1.0) * out_scale)
+            dst[r, c, 2] = int(min(max(b_val, 0.0), 1.0) * out_scale)
+
 # =========================================================
 # 辅助计算函数 (用于测光)
 # =========================================================
@@ -398,17 +345,44 @@ def get_luminance_coeffs(colourspace):
     # RGB_to_XYZ 矩阵的第二行就是 Y 通道的系数 [Lr, Lg, Lb]
     return colourspace.matrix_RGB_to_XYZ[1, :]
 
+def get_subsample_step(h, w, target_size=1024):
+    """计算下采样步长，使得长边大约为 target_size"""
+    return max(1, max(h, w) // target_size)
+
 def get_subsampled_view(img, target_size=1024):
     """
     获取图像的下采样视图。
     对于测光来说，分析 1000px 宽的缩略图和分析 8000px 的原图，结果差异可忽略不计。
     """
     h, w, _ = img.shape
-    # 计算步长，使得长边大约为 target_size
-    step = max(1, max(h, w) // target_size)
+    step = get_subsample_step(h, w, target_size)
     # Numpy切片是视图(View)，不占用新内存
     return img[::step, ::step, :]
 
+def decode_to_float32(prophoto_uint16, target_size=1024, gain=1.0, dtype=np.float32):
+    """
+    将 rawpy 输出的 16-bit 图像转为 float32 (0.0 - 1.0)，并同时生成测光缩略图。
+
+    Args:
+        prophoto_uint16: rawpy 解码输出 (uint16)
+        target_size: 缩略图长边像素数
+        gain: 转换时一并应用的曝光增益 (默认 1.0，即不调整)
+        dtype: 全尺寸图像的存储类型 (np.float32，或 np.float16 半精度存储)
+
+    Returns:
+        (img, thumb): 全尺寸图像 (dtype)，以及长边约 target_size 的 float32 缩略图
+    """
+    if not prophoto_uint16.flags['C_CONTIGUOUS']:
+        prophoto_uint16 = np.ascontiguousarray(prophoto_uint16)
+
+    h, w, _ = prophoto_uint16.shape
+    step = get_subsample_step(h, w, target_size)
+    img = np.empty((h, w, 3), dtype=dtype)
+    thumb = np.empty(((h + step - 1) // step, (w + step - 1) // step, 3), dtype=np.float32)
+
+    convert_uint16_to_float32(prophoto_uint16, storage_view(img), thumb, step, np.float32(gain / 65535.0))
+    return img, thumb
+
 # =========================================================
 # 业务逻辑函数 (优化版)
 # =========================================================
@@ -631,44 +605,73 @@ def auto_expose_matrix(img_linear: np.ndarray, source_colorspace, target_gray: f
 
 # ----------------- 镜头校正 (保持逻辑，优化注释) -----------------
 
-def apply_lens_correction(image: np.ndarray, exif_data: dict, custom_db_path: Optional[str] = None, logger: callable = print, **kwargs) -> np.ndarray:
-    """
-    镜头校正通常需要几何变换，很难完全 In-Place。
-    这是整个流程中少数几个必然会产生内存拷贝的地方。
-    """
-    # exif_data is now passed directly
-    
+def _lens_params(exif_data: dict, logger: callable = print, **kwargs) -> Optional[dict]:
+    """合并 EXIF 与额外参数，并检查镜头校正所需的信息；信息不足时返回 None"""
     # 简单的字典合并
     params = {**exif_data, **kwargs}
     
     # 必要的 key 检查
     if not params.get('camera_model') or not params.get('lens_model'):
         logger("  ⚠️  [Lens] Missing info, skipping.")
-        return image
+        return None
     
     if not params.get('focal_length') or not params.get('aperture'):
         logger("  ⚠️  [Lens] Missing optical info, skipping.")
-        return image
+        return None
     
     logger(f"  🧬 [Lens] {params.get('camera_maker')} {params.get('camera_model')} + {params.get('lens_model')}")
+    return params
+
+def apply_lens_correction(image: np.ndarray, exif_data: dict, custom_db_path: Optional[str] = None, logger: callable = print,
+                          gain: float = 1.0, **kwargs) -> Tuple[np.ndarray, float]:
+    """
+    镜头校正通常需要几何变换，很难完全 In-Place。
+    这是整个流程中少数几个必然会产生内存拷贝的地方。
+
+    gain 为尚未应用的曝光增益: 只校正暗角时与暗角增益在同一次遍历中相乘。
+    返回 (校正后的图像, 仍需应用的曝光增益)。
+    """
+    # exif_data is now passed directly
+    params = _lens_params(exif_data, logger, **kwargs)
+    if params is None:
+        return image, gain
     
     try:
-        # lensfun_wrapper 内部通常会调用 cv2.remap 或 scipy.map_coordinates
+        # lensfun_wrapper 内部按行带并行计算坐标，用 Numba 核函数重映射
         # 这必然返回新图像
-        corrected = lf.apply_lens_correction(
+        corrected, gain = lf.apply_lens_correction(
             image=image,
             custom_db_path=custom_db_path,
             logger=logger,
+            gain=gain,
             **params # 传递所有提取到的参数
         )
         
         # 显式帮助 GC (虽然 Python 会自动处理，但在大内存压力下 explicit is better)
         # 这里原来的 image 引用计数会减少，如果外面没有引用，旧内存会被释放
-        return corrected
+        return corrected, gain
         
     except Exception as e:
         logger(f"  ❌ [Lens Error] {e}")
-        return image # 失败则返回原图
+        return image, gain # 失败则返回原图
+
+def create_lens_corrector(width: int, height: int, exif_data: dict, custom_db_path: Optional[str] = None,
+                          logger: callable = print, **kwargs) -> Optional[lf.LensCorrector]:
+    """
+    分块渲染用: 配置镜头校正但不执行 (按行带调用 LensCorrector.remap_rows)
+
+    Returns:
+        LensCorrector；信息不足、未找到镜头或出错时返回 None (跳过校正)
+    """
+    params = _lens_params(exif_data, logger, **kwargs)
+    if params is None:
+        return None
+
+    try:
+        return lf.create_lens_corrector(width, height, custom_db_path=custom_db_path, logger=logger, **params)
+    except Exception as e:
+        logger(f"  ❌ [Lens Error] {e}")
+        return None
 
 def extract_lens_exif(raw: rawpy.RawPy, logger: callable = print) -> dict:
     """使用 rawpy 对象从 RAW 文件中提取 EXIF 和镜头信息。"""
@@ -0,0 +1,105 @@
+"""
+暗角校正模块
+Lensfun 的暗角模型是以光学中心为圆心的径向增益，只取决于镜头、焦距、光圈、对焦距离和图像尺寸。
+光学中心与图像中心重合时 (绝大多数镜头配置)，只需对每种镜头配置向 Lensfun 请求一次径向增益曲线
+(每像素半径一个采样，24MP 约 3600 项)，之后由核函数按半径线性插值相乘，不再对每幅图像逐像素调用 Lensfun。
+
+镜头标定中的光学中心 (<center>) 偏离图像中心时增益不再以图像中心径向对称，
+radial_profile 的校验点对不上，由调用方回退到逐像素的 apply_color_modification。
+
+增益曲线有两种用法:
+    apply_vignetting_gain  独立的原位乘法，可同时乘上曝光增益 (一次遍历完成两者)
+    remap 核函数           几何校正时在源坐标处取增益，与重采样同一次遍历完成
+"""
+import math
+import numpy as np
+from numba import njit, prange
+
+from raw_alchemy.half_float import load_float32, to_storage
+
+
+# 增益曲线的生成方式版本 (写入缓存键，修改采样或校验方式时递增，使旧曲线失效)
+PROFILE_VERSION = 2
+
+# 校验点上曲线插值与 Lensfun 逐像素增益的最大相对误差 (约为 16-bit 输出的 1 LSB)
+PROFILE_TOLERANCE = 2e-5
+
+
+def profile_center(width: int, height: int):
+    """增益曲线的圆心 (图像中心 (width/2, height/2) 像素；标定的光学中心不在此处时曲线不可用)"""
+    return width / 2.0, height / 2.0
+
+
+def pixel_gain(modifier, x: float, y: float) -> float:
+    """Lensfun 在像素 (x, y) 处的暗角校正增益 (对单个全 1 像素做颜色修改)；失败时返回 None"""
+    pixel = np.ones((1, 1, 3), dtype=np.float32)
+    if not modifier.apply_color_modification(pixel, x, y, 1, 1):
+        return None
+    # Lensfun 的暗角增益与通道无关，取绿色通道
+    return float(pixel[0, 0, 1])
+
+
+def radial_profile(modifier, width: int, height: int) -> np.ndarray:
+    """
+    向 Lensfun 请求径向增益曲线: 第 k 项为距图像中心 k 像素处的暗角校正增益
+
+    沿中心到右下角的对角线逐点采样 (采样点都在图像内，最后两项在角点外 2 像素以内)，
+    再在四个角点和四条边的中点上与 Lensfun 的逐像素增益对比。光学中心偏离图像中心时
+    这些点到中心的半径相同或相近却增益不同，校验失败，返回空数组。
+
+    Returns:
+        np.ndarray: float32 一维数组；光学中心不在图像中心时为空数组 (调用方改为逐像素校正)；
+                    Lensfun 计算失败时返回 None
+    """
+    cx, cy = profile_center(width, height)
+    radius = math.hypot(cx, cy)
+    samples = int(math.ceil(radius)) + 2
+    ux, uy = cx / radius, cy / radius
+    profile = np.empty(samples, dtype=np.float32)
+    for k in range(samples):
+        gain = pixel_gain(modifier, cx + k * ux, cy + k * uy)
+        if gain is None:
+            return None
+        profile[k] = gain
+
+    checks = [(0.0, 0.0), (width - 1.0, 0.0), (0.0, height - 1.0), (width - 1.0, height - 1.0),
+              (cx, 0.0), (cx, height - 1.0), (0.0, cy), (width - 1.0, cy)]
+    for x, y in checks:
+        expected = pixel_gain(modifier, x, y)
+        if expected is None:
+            return None
+        if abs(profile_gain(profile, np.float32(x), np.float32(y), cx, cy) - expected) > PROFILE_TOLERANCE * expected:
+            return profile[:0]
+    return profile
+
+
+@njit(inline='always', cache=True)
+def profile_gain(profile, x, y, cx, cy):
+    """源坐标 (x, y) 处的暗角增益 (按半径在曲线中线性插值，超出曲线的半径取末项)"""
+    dx = x - cx
+    dy = y - cy
+    r = math.sqrt(dx * dx + dy * dy)
+    n = profile.shape[0]
+    k = min(int(r), n - 2)
+    t = min(r - k, 1.0)
+    return profile[k] + t * (profile[k + 1] - profile[k])
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def apply_vignetting_gain(img, profile, cx, cy, gain):
+    """
+    原位暗角校正，同时乘上曝光增益 gain (gain=1 时只做暗角校正)
+
+    Args:
+        img: (H, W, 3)，float32 或 float16 的位模式视图 (见 half_float.storage_view)
+        profile: radial_profile 返回的增益曲线
+        cx, cy: 曲线圆心 (profile_center)
+        gain: 曝光增益
+    """
+    rows, cols, _ = img.shape
+    for r in prange(rows):
+        for c in range(cols):
+            g = gain * profile_gain(profile, np.float32(c), np.float32(r), cx, cy)
+            img[r, c, 0] = to_storage(load_float32(img[r, c, 0]) * g, img)
+            img[r, c, 1] = to_storage(load_float32(img[r, c, 1]) * g, img)
+            img[r, c, 2] = to_storage(load_float32(img[r, c, 2]) * g, img)
@@ -0,0 +1,54 @@
+"""
+测试公用的合成数据与日志处理器
+"""
+import numpy as np
+import pytest
+import colour
+
+from raw_alchemy.logger import create_logger
+
+
+@pytest.fixture
+def quiet_logger():
+    """丢弃全部日志的处理器"""
+    return create_logger(lambda msg: None)
+
+
+def make_linear_image(height=96, width=128, seed=0):
+    """合成 ProPhoto 线性图像: 平滑渐变 + 对数正态噪声，覆盖阴影到高光 (float32)"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = 0.02 + 0.6 * (x / width) * (y / height)
+    img = np.stack([base * 1.1, base, base * 0.8], axis=-1)
+    img *= rng.lognormal(0.0, 0.5, img.shape).astype(np.float32)
+    return np.ascontiguousarray(img, dtype=np.float32)
+
+
+def make_creative_lut(size=17):
+    """合成 3D 创意 LUT: 各通道 S 形对比度后做少量通道混合"""
+    axis = np.linspace(0.0, 1.0, size)
+    r, g, b = np.meshgrid(axis, axis, axis, indexing='ij')
+    rgb = np.stack([r, g, b], axis=-1)
+    curve = 0.5 + 0.5 * np.tanh(3.0 * (rgb - 0.45)) / np.tanh(1.65)
+    mix = np.array([[0.9, 0.08, 0.02], [0.05, 0.9, 0.05], [0.02, 0.1, 0.88]])
+    return colour.LUT3D(np.clip(curve @ mix.T, 0.0, 1.0), name='synthetic S-curve')
+
+
+def make_shaper_sequence(size=17):
+    """合成 shaper + 3D 序列: 1D 伽马 shaper 后接 make_creative_lut"""
+    shaper = colour.LUT1D(np.linspace(0.0, 1.0, 1024) ** (1 / 1.8), name='synthetic shaper')
+    return colour.LUTSequence(shaper, make_creative_lut(size))
+
+
+def distortion_coords(x, y, width, height):
+    """合成畸变 + 横向色差: 像素坐标 (x, y) -> (..., 3, 2) 源坐标，与 Lensfun 输出的布局相同"""
+    cx, cy = width / 2, height / 2
+    r = max(cx, cy)
+    dx, dy = (x - cx) / r, (y - cy) / r
+    r2 = dx * dx + dy * dy
+    coords = np.empty(x.shape + (3, 2), dtype=np.float32)
+    for c, tca in enumerate((1.002, 1.0, 0.998)):
+        f = tca * (1.0 - 0.03 * r2 + 0.01 * r2 * r2) / 1.02
+        coords[..., c, 0] = cx + dx * f * r
+        coords[..., c, 1] = cy + dy * f * r
+    return coords
@@ -0,0 +1,56 @@
+"""
+TIFF 写入: strip / 分块、整幅 / 流式写入读回与输入一致
+"""
+import numpy as np
+import pytest
+import tifffile
+
+from raw_alchemy.file_io import save_image, save_image_bands
+
+
+def make_output_image(height=200, width=152, seed=0):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    base = (x * 300 + y * 200)[..., None] + np.array([0, 5000, 10000])
+    return (base + rng.integers(0, 64, (height, width, 3))).astype(np.uint16)
+
+
+def bands_of(image, rows):
+    return (image[y0:y0 + rows] for y0 in range(0, image.shape[0], rows))
+
+
+@pytest.mark.parametrize('tile', [0, 16, 64])
+@pytest.mark.parametrize('workers', [1, 0])
+def test_whole_frame_round_trip(tmp_path, quiet_logger, tile, workers):
+    image = make_output_image()
+    path = str(tmp_path / 'out.tif')
+    assert save_image(image, path, quiet_logger, compression_level=1, tiff_tile=tile, tiff_workers=workers)
+    with tifffile.TiffFile(path) as tif:
+        page = tif.pages[0]
+        assert page.is_tiled == (tile > 0)
+        if tile:
+            assert (page.tilelength, page.tilewidth) == (tile, tile)
+        np.testing.assert_array_equal(page.asarray(), image)
+
+
+@pytest.mark.parametrize('tile', [0, 32])
+@pytest.mark.parametrize('band_rows', [7, 64, 500])
+def test_streamed_bands_round_trip(tmp_path, quiet_logger, tile, band_rows):
+    image = make_output_image()
+    path = str(tmp_path / 'out.tif')
+    assert save_image_bands(bands_of(image, band_rows), path, image.shape, band_rows, quiet_logger,
+                            compression_level=1, tiff_tile=tile)
+    np.testing.assert_array_equal(tifffile.imread(path), image)
+
+
+def test_float_input_is_clipped_and_quantized(tmp_path, quiet_logger):
+    img = np.array([[[-0.5, 0.5, 1.5]]], dtype=np.float32).repeat(16, axis=0).repeat(16, axis=1)
+    path = str(tmp_path / 'out.tif')
+    assert save_image(img.copy(), path, quiet_logger)
+    out = tifffile.imread(path)
+    assert out.dtype == np.uint16
+    assert tuple(out[0, 0]) == (0, int(0.5 * 65535), 65535)
+
+
+def test_tile_must_be_multiple_of_16(tmp_path, quiet_logger):
+    assert not save_image(make_output_image(), str(tmp_path / 'out.tif'), quiet_logger, tiff_tile=24)
@@ -0,0 +1,92 @@
+"""
+半精度存储: float32 <-> float16 位模式转换与 numpy 一致
+"""
+import numpy as np
+from numba import njit, prange
+
+from raw_alchemy import core, utils
+from raw_alchemy.half_float import (
+    float32_to_half_bits, half_bits_to_float32, load_float32, to_storage, storage_view, storage_dtype,
+)
+
+
+@njit(parallel=True)
+def _encode(values, out):
+    for i in prange(values.shape[0]):
+        out[i] = float32_to_half_bits(values[i])
+
+
+@njit(parallel=True)
+def _decode(bits, out):
+    for i in prange(bits.shape[0]):
+        out[i] = half_bits_to_float32(bits[i])
+
+
+@njit
+def _copy_scaled(src, dst, scale):
+    for i in range(src.shape[0]):
+        dst[i] = to_storage(load_float32(src[i]) * scale, dst)
+
+
+def encode(values):
+    out = np.empty(values.shape, dtype=np.uint16)
+    _encode(values, out)
+    return out
+
+
+def test_decode_every_half_value():
+    bits = np.arange(65536, dtype=np.uint16)
+    out = np.empty(bits.shape, dtype=np.float32)
+    _decode(bits, out)
+    np.testing.assert_array_equal(out, bits.view(np.float16).astype(np.float32))
+
+
+def test_every_finite_half_value_round_trips():
+    halves = np.arange(65536, dtype=np.uint16).view(np.float16)
+    halves = halves[np.isfinite(halves)]
+    np.testing.assert_array_equal(encode(halves.astype(np.float32)), halves.view(np.uint16))
+
+
+def test_rounding_matches_numpy():
+    rng = np.random.default_rng(0)
+    values = np.concatenate([
+        rng.uniform(-70000.0, 70000.0, 100_000),
+        np.exp2(rng.uniform(-30.0, 17.0, 100_000)) * rng.choice([-1.0, 1.0], 100_000),
+        # 两个 float16 之间的中点 (偶数优先) 与次正规数边界
+        (np.arange(1024, 2048) + 0.5) * 2.0 ** -10,
+        [6.103515625e-05, 6.0975552e-05, 5.9604645e-08, 2.9802322e-08, 65504.0, 65519.99, 65520.0],
+    ]).astype(np.float32)
+    np.testing.assert_array_equal(encode(values), values.astype(np.float16).view(np.uint16))
+
+
+def test_special_values():
+    values = np.array([np.inf, -np.inf, 0.0, -0.0], dtype=np.float32)
+    np.testing.assert_array_equal(encode(values), values.astype(np.float16).view(np.uint16))
+    assert np.isnan(encode(np.array([np.nan], dtype=np.float32)).view(np.float16)[0])
+
+
+def test_kernel_storage_helpers_follow_dtype():
+    src = np.linspace(0.0, 4.0, 257, dtype=np.float32)
+    out32 = np.empty_like(src)
+    _copy_scaled(src, out32, np.float32(1.5))
+    np.testing.assert_array_equal(out32, src * np.float32(1.5))
+
+    half = src.astype(np.float16)
+    out16 = np.empty_like(half)
+    _copy_scaled(storage_view(half), storage_view(out16), np.float32(1.5))
+    np.testing.assert_array_equal(out16, (half.astype(np.float32) * np.float32(1.5)).astype(np.float16))
+
+
+def test_decode_to_float16_matches_numpy():
+    rng = np.random.default_rng(1)
+    raw = rng.integers(0, 65536, (40, 50, 3), dtype=np.uint16)
+    img, _ = utils.decode_to_float32(raw, 16, gain=2.0, dtype=storage_dtype(True))
+    assert img.dtype == np.float16
+    expected = (raw.astype(np.float32) * np.float32(2.0 / 65535)).astype(np.float16)
+    np.testing.assert_array_equal(img, expected)
+
+
+def test_half_precision_only_for_8bit_output():
+    assert core.supports_half_precision('out/frame.jpg')
+    assert not core.supports_half_precision('out/frame.tiff')
+    assert not core.supports_half_precision('out/frame.HEIF')
@@ -0,0 +1,86 @@
+"""
+LensCorrector 的行带坐标计算: 线程各用一个修改器，Lensfun 失败时整幅处理
+(用合成坐标的替身修改器，不需要 Lensfun 库)
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from raw_alchemy import lensfun_wrapper as lf
+from conftest import distortion_coords, make_linear_image
+
+WIDTH, HEIGHT = 64, 40
+
+
+class FakeModifier:
+    """按 Lensfun 的布局返回合成坐标；同一实例被并发调用时记录下来"""
+
+    def __init__(self, fail_from_row=None, available=True):
+        self.fail_from_row = fail_from_row
+        self.available = available
+        self.calls = 0
+        self.overlapped = False
+        self._busy = threading.Lock()
+
+    def apply_subpixel_geometry_distortion(self, xu, yu, width, height):
+        if not self._busy.acquire(blocking=False):
+            self.overlapped = True
+            self._busy.acquire()
+        try:
+            self.calls += 1
+            time.sleep(0.001)  # 扩大并发窗口
+            if not self.available or (self.fail_from_row is not None and yu >= self.fail_from_row):
+                return None
+            y, x = np.mgrid[yu:yu + height, xu:xu + width].astype(np.float32)
+            return distortion_coords(x, y, WIDTH, HEIGHT)
+        finally:
+            self._busy.release()
+
+
+def make_corrector(modifier, factory=None, threads=4):
+    corrector = lf.LensCorrector(None, modifier, WIDTH, HEIGHT, True, True, False,
+                                 logger=lambda msg: None, modifier_factory=factory)
+    corrector.threads = threads
+    return corrector
+
+
+@pytest.fixture
+def small_bands(monkeypatch):
+    monkeypatch.setattr(lf, 'LENS_BAND_ROWS', 4)
+
+
+def test_threads_use_their_own_modifiers(small_bands):
+    image = make_linear_image(HEIGHT, WIDTH)
+    created = []
+
+    def factory():
+        created.append(FakeModifier())
+        return created[-1]
+
+    main = FakeModifier()
+    parallel = make_corrector(main, factory).remap_rows(image, 0, HEIGHT)
+    serial = make_corrector(FakeModifier(), threads=1).remap_rows(image, 0, HEIGHT)
+
+    np.testing.assert_array_equal(parallel, serial)
+    assert created and main.calls == 1  # 主修改器只用于构造时的试算
+    assert not any(m.overlapped for m in created)
+    assert sum(m.calls for m in created) == -(-HEIGHT // 4)
+
+
+@pytest.mark.parametrize('threads', [1, 4])
+def test_band_failure_raises_instead_of_returning_partial_frame(small_bands, threads):
+    image = make_linear_image(HEIGHT, WIDTH)
+    corrector = make_corrector(FakeModifier(), lambda: FakeModifier(fail_from_row=20), threads)
+    if threads == 1:
+        corrector.modifier.fail_from_row = 20
+    with pytest.raises(RuntimeError):
+        corrector.remap_rows(image, 0, HEIGHT)
+
+
+def test_unavailable_geometry_skips_whole_frame():
+    image = make_linear_image(HEIGHT, WIDTH)
+    corrector = make_corrector(FakeModifier(available=False))
+    assert not corrector.correct_geometry
+    np.testing.assert_array_equal(corrector.remap_rows(image, 0, HEIGHT), image)
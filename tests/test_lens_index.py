@@ -0,0 +1,79 @@
+"""
+Lensfun XML 索引: 厂商记录、文件选择以及磁盘/进程内缓存的失效
+"""
+import os
+
+import pytest
+
+from raw_alchemy import lensfun_wrapper as lf
+
+DATABASE = {
+    'mil-sony.xml': '<lensdatabase><camera><maker>SONY</maker><maker lang="en">Sony</maker>'
+                    '<model>ILCE-7M3</model></camera>'
+                    '<lens><maker>Sony</maker><model>FE 24-70mm F2.8 GM</model></lens></lensdatabase>',
+    'mil-sigma.xml': '<lensdatabase><lens><maker>Sigma</maker><model>24-70mm F2.8 DG DN</model></lens>'
+                     '</lensdatabase>',
+    'slr-canon.xml': '<lensdatabase><camera><maker>Canon</maker><model>EOS 5D</model></camera>'
+                     '<lens><maker>Canon</maker><model>EF 50mm f/1.8</model></lens></lensdatabase>',
+    'mounts.xml': '<lensdatabase><mount><name>Sony E</name><compat>M42</compat></mount></lensdatabase>',
+}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / 'db'
+    path.mkdir()
+    for name, content in DATABASE.items():
+        (path / name).write_text(content, encoding='utf-8')
+    (path / 'README').write_text('not a database file', encoding='utf-8')
+    return str(path)
+
+
+def test_build_records_normalized_makers(db_path):
+    files = lf.build_lens_index(db_path)['files']
+    assert sorted(files) == sorted(DATABASE)
+    assert files['mil-sony.xml'] == {'camera_makers': ['sony'], 'lens_makers': ['sony'], 'mounts': False}
+    assert files['mil-sigma.xml']['camera_makers'] == []
+    assert files['mounts.xml']['mounts']
+
+
+def test_select_loads_maker_and_mount_files(db_path):
+    index = lf.build_lens_index(db_path)
+    assert lf.select_xml_files(index, 'SONY', 'Sigma') == ['mil-sigma.xml', 'mil-sony.xml', 'mounts.xml']
+    assert lf.select_xml_files(index, ' sony ', 'SONY') == ['mil-sony.xml', 'mounts.xml']
+    # 厂商未知或索引中不存在时加载整个数据库
+    assert lf.select_xml_files(index, None, 'Sony') is None
+    assert lf.select_xml_files(index, 'Nikon', 'Sony') is None
+    assert lf.select_xml_files(index, 'Sony', 'Tamron') is None
+
+
+def test_index_is_written_once_and_reused(db_path, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    index = lf.load_lens_index(db_path, cache_dir)
+    assert index == lf.build_lens_index(db_path)
+    (index_file,) = os.listdir(cache_dir)
+    assert index_file.endswith('.json')
+
+    # 新进程从磁盘读取的索引与构建结果一致
+    lf._index_cache.clear()
+    assert lf.load_lens_index(db_path, cache_dir) == index
+    assert os.listdir(cache_dir) == [index_file]
+
+
+def test_index_invalidated_when_database_changes(db_path, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    assert lf.select_xml_files(lf.load_lens_index(db_path, cache_dir), 'Sony', 'Tamron') is None
+
+    with open(os.path.join(db_path, 'mil-tamron.xml'), 'w', encoding='utf-8') as f:
+        f.write('<lensdatabase><lens><maker>Tamron</maker><model>28-75mm F/2.8</model></lens></lensdatabase>')
+    index = lf.load_lens_index(db_path, cache_dir)
+    assert lf.select_xml_files(index, 'Sony', 'Tamron') == ['mil-sony.xml', 'mil-tamron.xml', 'mounts.xml']
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_missing_or_broken_database(db_path, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    assert lf.load_lens_index(str(tmp_path / 'missing'), cache_dir) is None
+    with open(os.path.join(db_path, 'broken.xml'), 'w', encoding='utf-8') as f:
+        f.write('<lensdatabase><lens>')
+    assert lf.load_lens_index(db_path, cache_dir) is None
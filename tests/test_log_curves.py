@@ -0,0 +1,26 @@
+"""
+Log 曲线: Numba float32 实现与 colour.cctf_encoding (float64) 对比
+"""
+import numpy as np
+import pytest
+import colour
+
+from raw_alchemy import config
+from raw_alchemy.log_curves import encode_log, LOG_CURVE_TOLERANCE
+
+CURVES = sorted({config.LOG_ENCODING_MAP.get(name, name) for name in config.LOG_TO_WORKING_SPACE})
+
+
+@pytest.mark.parametrize('curve', CURVES)
+def test_encode_log_matches_colour(curve):
+    x = np.exp2(np.linspace(np.log2(1e-6), 10.0, 3 * 4000)).astype(np.float32).reshape(-1, 100, 3)
+    expected = colour.cctf_encoding(x.astype(np.float64), function=curve)
+    actual = encode_log(x.copy(), curve)
+    assert actual.dtype == np.float32
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=LOG_CURVE_TOLERANCE)
+
+
+def test_encode_log_clips_to_floor():
+    x = np.array([[[-1.0, 0.0, 1e-9]]], dtype=np.float32)
+    floor = np.full_like(x, 1e-6)
+    np.testing.assert_array_equal(encode_log(x, 'F-Log2'), encode_log(floor, 'F-Log2'))
@@ -0,0 +1,48 @@
+"""
+LUT 缓存与批处理共享: 工作进程挂载的查表链与单文件读取的 LUT 渲染结果一致
+"""
+import numpy as np
+import pytest
+import colour
+
+from raw_alchemy import core
+from raw_alchemy.lut_cache import attach_shared_lut, load_lut, share_lut
+from raw_alchemy.luts import lut_content_hash
+from conftest import make_linear_image, make_creative_lut, make_shaper_sequence
+
+
+@pytest.fixture
+def lut_file(tmp_path, monkeypatch, request):
+    monkeypatch.setenv('RAW_ALCHEMY_CACHE_DIR', str(tmp_path / 'cache'))
+    path = tmp_path / f'{request.param}.cube'
+    lut = make_shaper_sequence() if request.param == 'shaper' else make_creative_lut()
+    colour.write_LUT(lut, str(path))
+    return str(path)
+
+
+@pytest.mark.parametrize('lut_file', ['cube', 'shaper'], indirect=True)
+@pytest.mark.parametrize('pipeline', ['fused', 'reference'])
+def test_shared_chain_renders_like_single_file(lut_file, pipeline, quiet_logger):
+    img = make_linear_image()
+    direct = core.render_look(img.copy(), 1.5, 'F-Log2', load_lut(lut_file), np.uint16, pipeline, quiet_logger)
+
+    shared = share_lut(lut_file)
+    try:
+        chain = attach_shared_lut(shared.descriptor)
+        batch = core.render_look(img.copy(), 1.5, 'F-Log2', chain, np.uint16, pipeline, quiet_logger)
+        assert lut_content_hash(chain) == lut_content_hash(load_lut(lut_file))
+    finally:
+        shared.close()
+
+    np.testing.assert_array_equal(batch, direct)
+
+
+@pytest.mark.parametrize('lut_file', ['cube'], indirect=True)
+def test_sidecar_matches_parsed_lut(lut_file):
+    from raw_alchemy import lut_cache
+    parsed = load_lut(lut_file)
+    lut_cache._memory_cache.clear()
+    reloaded = load_lut(lut_file)
+    assert reloaded is not parsed
+    np.testing.assert_array_equal(reloaded.table, parsed.table)
+    assert lut_content_hash(reloaded) == lut_content_hash(parsed)
@@ -0,0 +1,65 @@
+"""
+测光策略: 单次遍历统计量与原始 numpy 实现 (utils.auto_expose_*) 的增益对比
+"""
+import numpy as np
+import pytest
+import colour
+
+from raw_alchemy import utils
+from raw_alchemy.metering import get_metering_strategy, smooth_exposure_gains
+from conftest import make_linear_image
+
+PROPHOTO = colour.RGB_COLOURSPACES['ProPhoto RGB']
+
+# 原始实现原位施加增益，增益由输出 / 输入的比值还原
+REFERENCE = {
+    'average': lambda img, logger: utils.auto_expose_linear(img, PROPHOTO, 0.18, logger),
+    'center-weighted': lambda img, logger: utils.auto_expose_center_weighted(img, PROPHOTO, 0.18, logger),
+    'highlight-safe': lambda img, logger: utils.auto_expose_highlight_safe(img, 1.0, logger),
+    'hybrid': lambda img, logger: utils.auto_expose_hybrid(img, PROPHOTO, 0.18, logger),
+    'matrix': lambda img, logger: utils.auto_expose_matrix(img, PROPHOTO, 0.18, logger),
+}
+
+# 高度 x 宽度: 采样步长分别为 1 (小于 1024) 和 2 (长边 2100)
+SHAPES = [(96, 128), (1400, 2100)]
+
+
+def reference_gain(mode, img):
+    out = REFERENCE[mode](img.copy().astype(np.float64), lambda msg: None)
+    return float(np.median(out[img > 1e-3] / img[img > 1e-3]))
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+@pytest.mark.parametrize('mode', [m for m in REFERENCE if m != 'highlight-safe'])
+def test_strategy_matches_reference(mode, shape):
+    img = make_linear_image(*shape)
+    gain = get_metering_strategy(mode).calculate_gain(img, PROPHOTO, 0.18)
+    assert gain == pytest.approx(reference_gain(mode, img), rel=1e-6)
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_highlight_safe_within_histogram_resolution(shape):
+    # p99 由 log2 直方图插值得到，误差小于 1/128 档
+    img = make_linear_image(*shape)
+    gain = get_metering_strategy('highlight-safe').calculate_gain(img, PROPHOTO, 0.18)
+    assert abs(np.log2(gain / reference_gain('highlight-safe', img))) < 1 / 128
+
+
+def test_hybrid_limits_highlights():
+    img = make_linear_image()
+    img[:10, :10] = 50.0
+    gain = get_metering_strategy('hybrid').calculate_gain(img, PROPHOTO, 0.18)
+    assert gain == pytest.approx(reference_gain('hybrid', img), rel=1e-6)
+
+
+def test_unknown_mode_raises():
+    with pytest.raises(ValueError):
+        get_metering_strategy('spot')
+
+
+def test_smooth_exposure_gains_fills_failed_frames():
+    # log2 域平均: 失败帧取相邻帧 (0 档与 2 档) 的平均 1 档
+    assert smooth_exposure_gains([1.0, None, 4.0], 3) == pytest.approx([1.0, 2.0, 4.0])
+    assert smooth_exposure_gains([1.0, 4.0, 1.0], 3) == pytest.approx([2.0, 2.0 ** (2 / 3), 2.0])
+    assert smooth_exposure_gains([None], 3) == [None]
+    assert smooth_exposure_gains([1.0, 2.0], 1) == [1.0, 2.0]
@@ -0,0 +1,94 @@
+"""
+批处理的崩溃重试: 崩溃只记在确定崩溃的任务上，稳定后恢复并发数
+(用替身 process_image 让工作进程直接退出，不需要 RAW 文件)
+
+批处理在新的解释器中运行: 测试进程已执行过 Numba 并行核函数，TBB 线程层在 fork 后
+会使进程退出时挂起。
+"""
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from raw_alchemy.orchestrator import MAX_CRASH_RETRIES
+
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                                reason="the stand-in worker is inherited through fork")
+
+STATE_DIR = None
+
+
+def fake_process_image(raw_path, output_path, **kwargs):
+    """名为 crash_always 的文件每次都使工作进程崩溃，crash_once 只崩溃一次，其他文件正常完成"""
+    name = os.path.splitext(os.path.basename(raw_path))[0]
+    with open(os.path.join(STATE_DIR, f"{name}.{os.getpid()}.{time.monotonic_ns()}"), 'w'):
+        pass
+    marker = os.path.join(STATE_DIR, f"{name}.crashed")
+    if name == 'crash_always' or (name == 'crash_once' and not os.path.exists(marker)):
+        open(marker, 'w').close()
+        os._exit(1)
+    time.sleep(0.2)  # 崩溃时其他任务仍在运行
+    with open(output_path, 'w'):
+        pass
+
+
+def _batch_main(root, jobs):
+    """子进程入口: 用替身 process_image 处理 root/in，把日志打印为 JSON"""
+    global STATE_DIR
+    from raw_alchemy import core, orchestrator
+
+    STATE_DIR = os.path.join(root, 'state')
+    fake_process_image.__module__ = core.__name__
+    fake_process_image.__qualname__ = 'process_image'
+    core.process_image = fake_process_image
+    messages = []
+    orchestrator.process_path(os.path.join(root, 'in'), os.path.join(root, 'out'), 'F-Log2', None, None, False,
+                              None, 'matrix', jobs, messages.append)
+    print(json.dumps(messages))
+
+
+def run_batch(tmp_path, names, jobs):
+    for sub in ('in', 'out', 'state'):
+        (tmp_path / sub).mkdir()
+    for name in names:
+        (tmp_path / 'in' / f"{name}.dng").touch()
+
+    tests_dir = os.path.dirname(os.path.abspath(__file__))
+    src_dir = os.path.join(os.path.dirname(tests_dir), 'src')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([tests_dir, src_dir, os.environ.get('PYTHONPATH', '')]))
+    result = subprocess.run(
+        [sys.executable, '-c', f"import test_orchestrator; test_orchestrator._batch_main({str(tmp_path)!r}, {jobs})"],
+        env=env, capture_output=True, text=True, timeout=120, check=True,
+    )
+    messages = json.loads(result.stdout.strip().splitlines()[-1])
+
+    state = os.listdir(tmp_path / 'state')
+    runs = {name: sum(f.startswith(f"{name}.") and not f.endswith('.crashed') for f in state) for name in names}
+    outputs = {os.path.splitext(f)[0] for f in os.listdir(tmp_path / 'out')}
+    return messages, runs, outputs
+
+
+def test_crash_is_charged_only_to_the_crashing_job(tmp_path):
+    names = ['a', 'b', 'crash_always', 'd', 'e', 'f']
+    messages, runs, outputs = run_batch(tmp_path, names, jobs=4)
+
+    assert outputs == set(names) - {'crash_always'}
+    # 首次崩溃后同批任务逐个重跑，只有单独运行时的崩溃计入重试次数
+    assert runs['crash_always'] == 1 + MAX_CRASH_RETRIES + 1
+    gave_up = [m for m in messages if 'giving up' in m]
+    assert len(gave_up) == 1 and 'crash_always' in gave_up[0]
+    # 同批被牵连的任务各多跑一次，但不计入重试次数
+    assert all(runs[name] <= 2 for name in names if name != 'crash_always')
+
+
+def test_concurrency_recovers_after_successes(tmp_path):
+    names = ['crash_once'] + [f"n{i:02d}" for i in range(12)]
+    messages, runs, outputs = run_batch(tmp_path, names, jobs=4)
+
+    assert outputs == set(names)
+    assert not any('giving up' in m for m in messages)
+    assert any('raising concurrency to 4' in m for m in messages)
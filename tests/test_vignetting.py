@@ -0,0 +1,106 @@
+"""
+暗角校正: 径向增益曲线核函数与逐像素 apply_color_modification 对比
+"""
+import numpy as np
+import pytest
+
+from raw_alchemy import lensfun_wrapper as lf
+from raw_alchemy.half_float import storage_view
+from raw_alchemy.vignetting import PROFILE_TOLERANCE, apply_vignetting_gain, profile_center, radial_profile
+from conftest import distortion_coords, make_linear_image
+
+# 增益曲线按 1 像素间距线性插值，帧太小时曲率带来的插值误差会超过 PROFILE_TOLERANCE
+WIDTH, HEIGHT = 600, 400
+
+
+class FakeVignetteModifier:
+    """Lensfun 暗角模型的替身: 以 (光学中心 + offset) 为圆心的径向多项式增益"""
+
+    def __init__(self, width=WIDTH, height=HEIGHT, offset=(0.0, 0.0), k1=0.6, k2=0.3):
+        self.cx = width / 2.0 + offset[0]
+        self.cy = height / 2.0 + offset[1]
+        self.norm = np.hypot(width / 2.0, height / 2.0)
+        self.k1, self.k2 = k1, k2
+
+    def apply_color_modification(self, pixels, x, y, width, height):
+        yy, xx = np.mgrid[0:height, 0:width]
+        r2 = ((xx + x - self.cx) ** 2 + (yy + y - self.cy) ** 2) / self.norm ** 2
+        pixels *= (1.0 + self.k1 * r2 + self.k2 * r2 * r2).astype(np.float32)[..., None]
+        return True
+
+    def apply_subpixel_geometry_distortion(self, xu, yu, width, height):
+        y, x = np.mgrid[yu:yu + height, xu:xu + width].astype(np.float32)
+        return distortion_coords(x, y, WIDTH, HEIGHT)
+
+
+def per_pixel(modifier, image):
+    expected = image.astype(np.float32)
+    modifier.apply_color_modification(expected, 0.0, 0.0, expected.shape[1], expected.shape[0])
+    return expected
+
+
+def make_corrector(modifier, geometry=False):
+    return lf.LensCorrector(None, modifier, WIDTH, HEIGHT, geometry, geometry, True, logger=lambda msg: None)
+
+
+def test_profile_kernel_matches_per_pixel():
+    modifier = FakeVignetteModifier()
+    profile = radial_profile(modifier, WIDTH, HEIGHT)
+    assert profile.size > 0
+    image = make_linear_image(HEIGHT, WIDTH)
+    expected = per_pixel(modifier, image)
+    cx, cy = profile_center(WIDTH, HEIGHT)
+    apply_vignetting_gain(storage_view(image), profile, cx, cy, 1.0)
+    np.testing.assert_allclose(image, expected, rtol=PROFILE_TOLERANCE)
+
+
+@pytest.mark.parametrize('offset', [(3.0, 0.0), (0.0, -2.0)])
+def test_off_centre_profile_is_rejected(offset):
+    assert radial_profile(FakeVignetteModifier(offset=offset), WIDTH, HEIGHT).size == 0
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float16])
+def test_off_centre_falls_back_to_per_pixel(dtype):
+    modifier = FakeVignetteModifier(offset=(4.0, 3.0))
+    image = make_linear_image(HEIGHT, WIDTH).astype(dtype)
+    expected = per_pixel(modifier, image).astype(dtype)
+    corrector = make_corrector(modifier)
+    assert corrector.apply_vignetting(image, 2.0) is False  # 曝光增益留给调用方
+    np.testing.assert_array_equal(image, expected)
+
+
+def test_off_centre_with_geometry_remaps_without_profile():
+    modifier = FakeVignetteModifier(offset=(4.0, 3.0))
+    image = make_linear_image(HEIGHT, WIDTH)
+    corrector = make_corrector(modifier, geometry=True)
+    corrector.apply_vignetting(image)
+    assert corrector.vignetting_profile() is None
+    reference = make_corrector(FakeVignetteModifier(offset=(4.0, 3.0)), geometry=True)
+    reference.correct_vignetting = False
+    np.testing.assert_array_equal(corrector.remap_rows(image, 0, HEIGHT),
+                                  reference.remap_rows(image, 0, HEIGHT))
+
+
+# 真实 Lensfun 配置 (需要 Lensfun 库和随程序分发的数据库)
+REAL_LENSES = [
+    ('Canon', 'Canon EOS 5D Mark III', 'Canon', 'Canon EF 24-70mm f/2.8L II USM', 24.0, 2.8),
+    ('Sony', 'ILCE-7M3', 'Sony', 'FE 24-70mm F2.8 GM', 24.0, 2.8),
+    ('Nikon Corporation', 'Nikon D850', 'Nikon', 'Nikkor AF-S 24-70mm f/2.8E ED VR', 24.0, 2.8),
+]
+
+
+@pytest.mark.skipif(lf._lensfun is None, reason="Lensfun library not available")
+@pytest.mark.parametrize('camera_maker, camera_model, lens_maker, lens_model, focal, aperture', REAL_LENSES)
+def test_real_profile_matches_apply_color_modification(camera_maker, camera_model, lens_maker, lens_model,
+                                                       focal, aperture):
+    width, height = 600, 400
+    corrector = lf.create_lens_corrector(width, height, camera_maker, camera_model, lens_maker, lens_model,
+                                         focal, aperture, correct_distortion=False, correct_tca=False,
+                                         logger=lambda msg: None)
+    if corrector is None:
+        pytest.skip(f"{lens_model} not in the Lensfun database")
+    image = make_linear_image(height, width)
+    expected = image.copy()
+    assert corrector.modifier.apply_color_modification(expected, 0.0, 0.0, width, height)
+    corrector.apply_vignetting(image)
+    np.testing.assert_allclose(image, expected, rtol=2 * PROFILE_TOLERANCE)